@@ -1,7 +1,12 @@
 import os
+import time
 
 from celery import Celery
 from celery.signals import setup_logging
+from celery.signals import task_failure
+from celery.signals import task_postrun
+from celery.signals import task_prerun
+from celery.signals import worker_init
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
@@ -24,5 +29,45 @@ def config_loggers(*args, **kwargs):
     dictConfig(settings.LOGGING)
 
 
+@worker_init.connect
+def start_metrics_server(*args, **kwargs):
+    from django.conf import settings
+
+    if settings.WORKER_METRICS_PORT:
+        from consultalab.core.metrics import start_worker_metrics_server
+
+        start_worker_metrics_server(settings.WORKER_METRICS_PORT)
+
+
+# Início de cada tarefa em execução neste processo, por task_id
+_task_started = {}
+
+
+@task_prerun.connect
+def mark_task_start(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(sender=None, task_id=None, **kwargs):
+    inicio = _task_started.pop(task_id, None)
+    if sender is None or inicio is None:
+        return
+    from consultalab.core.metrics import TASK_STAGE_DURATION
+
+    TASK_STAGE_DURATION.labels(sender.name, "total").observe(
+        time.perf_counter() - inicio,
+    )
+
+
+@task_failure.connect
+def count_task_failure(sender=None, exception=None, **kwargs):
+    if sender is None:
+        return
+    from consultalab.core.metrics import TASK_FAILURES
+
+    TASK_FAILURES.labels(sender.name, type(exception).__name__).inc()
+
+
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
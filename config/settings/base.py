@@ -5,6 +5,7 @@ import ssl
 from pathlib import Path
 
 import environ
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent.parent
 # consultalab/
@@ -69,6 +70,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -140,6 +142,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "consultalab.core.custom_middlewares.QueryCountHeaderMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -151,10 +154,11 @@ MIDDLEWARE = [
     "allauth.account.middleware.AccountMiddleware",
     # https://django-auditlog.readthedocs.io/en/latest/usage.html#middleware
     "auditlog.middleware.AuditlogMiddleware",
-    "consultalab.core.custom_middlewares.ForceTwoFactorMiddleware",
-    "consultalab.core.custom_middlewares.ForceChangePasswordMiddleware",
+    "consultalab.core.custom_middlewares.ForceAccountSetupMiddleware",
     # https://django-axes.readthedocs.io/en/latest/2_installation.html
     "axes.middleware.AxesMiddleware",
+    "consultalab.core.custom_middlewares.RequestProfilerMiddleware",
+    "consultalab.core.custom_middlewares.QueryBudgetMiddleware",
 ]
 
 # STATIC
@@ -177,6 +181,27 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR / "media")
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
+# Arquivos enviados que não devem ser servidos publicamente (ex.: importações em lote)
+PRIVATE_MEDIA_ROOT = env(
+    "DJANGO_PRIVATE_MEDIA_ROOT",
+    default=str(APPS_DIR / "private_media"),
+)
+
+# STORAGES
+# ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/ref/settings/#storages
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    "private": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": PRIVATE_MEDIA_ROOT},
+    },
+}
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -309,6 +334,19 @@ CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# https://docs.celeryq.dev/en/stable/userguide/periodic-tasks.html#entries
+CELERY_BEAT_SCHEDULE = {
+    # Cria com antecedência as partições mensais da tabela de auditoria
+    "ensure-log-entry-partitions": {
+        "task": "consultalab.audit.tasks.ensure_log_entry_partitions_task",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    # Arquiva os registros de auditoria e de acesso fora da retenção
+    "archive-audit-logs": {
+        "task": "consultalab.audit.tasks.archive_audit_logs_task",
+        "schedule": crontab(hour=3, minute=30),
+    },
+}
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#worker-send-task-events
 CELERY_WORKER_SEND_TASK_EVENTS = True
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std-setting-task_send_sent_event
@@ -360,6 +398,45 @@ BACEN_API_INFORMES = env(
     "BACEN_API_INFORMES",
     default="https://www3.bcb.gov.br/informes/rest",
 )
+# Tamanho máximo (em bytes) do arquivo TXT da importação em lote
+BULK_REQUEST_MAX_FILE_SIZE = env.int(
+    "BULK_REQUEST_MAX_FILE_SIZE",
+    default=5 * 1024 * 1024,
+)
+# Registros de auditoria e de acesso mais antigos que isto (em dias) são
+# movidos para arquivos compactados no storage privado
+AUDIT_LOG_RETENTION_DAYS = env.int("AUDIT_LOG_RETENTION_DAYS", default=365)
+# Cabeçalhos X-DB-Queries/X-DB-Time nas respostas, para o teste de carga
+QUERY_COUNT_HEADER = env.bool("QUERY_COUNT_HEADER", default=False)
+# Permite o teste de carga (manage.py testar_carga), que cria sessões já
+# autenticadas e com 2FA direto no banco; só para ambientes descartáveis
+LOAD_TEST_ENABLED = env.bool("LOAD_TEST_ENABLED", default=False)
+# Websocket (config.websocket): eventos por usuário publicados no Redis
+WEBSOCKET_REDIS_URL = env("WEBSOCKET_REDIS_URL", default=REDIS_URL)
+# Intervalo (em segundos) entre heartbeats e tempo sem mensagens do navegador
+# após o qual a conexão é encerrada
+WEBSOCKET_HEARTBEAT_INTERVAL = env.int("WEBSOCKET_HEARTBEAT_INTERVAL", default=25)
+WEBSOCKET_HEARTBEAT_TIMEOUT = env.int("WEBSOCKET_HEARTBEAT_TIMEOUT", default=60)
+# Mensagens pendentes por conexão; além disso as mais antigas são descartadas
+WEBSOCKET_SEND_QUEUE_SIZE = env.int("WEBSOCKET_SEND_QUEUE_SIZE", default=64)
+# Métricas Prometheus (consultalab.core.metrics). Sem token, /metrics só
+# responde com DEBUG ativo; 0 desativa o servidor de métricas dos workers
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+WORKER_METRICS_PORT = env.int("WORKER_METRICS_PORT", default=0)
+# Rastreamento distribuído (consultalab.core.tracing): "otlp", "arquivo" ou
+# vazio para desativar
+TRACING_EXPORTER = env("TRACING_EXPORTER", default="")
+TRACING_OTLP_ENDPOINT = env("TRACING_OTLP_ENDPOINT", default="")
+TRACING_FILE = env("TRACING_FILE", default=str(BASE_DIR / "traces.jsonl"))
+TRACING_SERVICE_NAME = env("TRACING_SERVICE_NAME", default="consultalab")
+# Perfil sob demanda das requisições pelos administradores
+# (consultalab.audit.profiling) e quantos perfis são mantidos
+REQUEST_PROFILER = env.bool("REQUEST_PROFILER", default=True)
+REQUEST_PROFILER_MAX_PROFILES = env.int("REQUEST_PROFILER_MAX_PROFILES", default=100)
+# Orçamento de consultas SQL das views (consultalab.core.query_budget): "log"
+# registra as violações (homologação), "raise" as transforma em erro (testes)
+# e vazio desativa a verificação
+QUERY_BUDGET = env("QUERY_BUDGET", default="")
 
 # django-axes
 # ------------------------------------------------------------------------------
@@ -74,3 +74,7 @@ INSTALLED_APPS += ["django_extensions"]
 CELERY_TASK_EAGER_PROPAGATES = True
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Views acima do orçamento de consultas SQL são registradas no log
+QUERY_BUDGET = env("QUERY_BUDGET", default="log")
+# O teste de carga roda contra o banco de desenvolvimento
+LOAD_TEST_ENABLED = env.bool("LOAD_TEST_ENABLED", default=True)
@@ -38,3 +38,7 @@ MEDIA_URL = "http://media.testserver/"
 # ------------------------------------------------------------------------------
 BACEN_API_DICT_CPF_TEST = env("BACEN_API_DICT_CPF_TEST", default="94508640044")
 BACEN_API_DICT_CNPJ_TEST = env("BACEN_API_DICT_CNPJ_TEST", default="88557883000186")
+# Sem Redis nos testes: os eventos do websocket não são publicados
+WEBSOCKET_REDIS_URL = ""
+# Views acima do orçamento de consultas SQL falham nos testes
+QUERY_BUDGET = "raise"
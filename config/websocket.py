@@ -1,13 +1,277 @@
-async def websocket_application(scope, receive, send):
+"""
+Websocket de eventos por usuário.
+
+O navegador abre uma conexão autenticada pela sessão do Django e recebe, em
+JSON (``{"event": ..., "data": ...}``), os eventos publicados para o seu
+usuário (ver ``consultalab.core.events``): conclusão de requisições,
+progresso de importações em lote etc.
+
+Cada processo ASGI mantém uma única assinatura no Redis (``UserEventHub``),
+com um canal por usuário conectado, e distribui as mensagens para as conexões
+do usuário. Cada conexão tem uma fila de envio limitada: se o navegador não
+acompanha, as mensagens mais antigas são descartadas em vez de acumular
+memória no servidor. O servidor envia um heartbeat periódico e encerra
+conexões que ficam em silêncio por mais de ``WEBSOCKET_HEARTBEAT_TIMEOUT``.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from importlib import import_module
+from urllib.parse import urlsplit
+
+import redis
+import redis.asyncio
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+from django.http.request import validate_host
+
+from consultalab.core.custom_middlewares import mfa_marked
+from consultalab.core.events import encode_event
+from consultalab.core.events import events_enabled
+from consultalab.core.events import user_channel
+from consultalab.core.events import user_id_from_channel
+
+logger = logging.getLogger(__name__)
+
+# Códigos de fechamento (faixa 4000-4999, reservada para a aplicação)
+CLOSE_HEARTBEAT_TIMEOUT = 4408
+# Espera de cada leitura do Redis e pausa após uma falha de conexão
+HUB_POLL_TIMEOUT = 1.0
+HUB_RETRY_DELAY = 1.0
+
+
+class UserConnection:
+    """Fila de envio limitada de uma conexão websocket."""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.descartadas = 0
+
+    def push(self, message: str) -> None:
+        """Enfileira sem bloquear, descartando a mensagem mais antiga se cheia."""
+        while True:
+            try:
+                self.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+                self.descartadas += 1
+            else:
+                return
+
+
+class UserEventHub:
+    """
+    Assinatura Redis do processo, repassada às conexões de cada usuário.
+
+    O canal de um usuário é assinado na primeira conexão dele e cancelado na
+    última; a leitura roda em uma única tarefa enquanto houver conexões.
+    """
+
+    def __init__(self):
+        self.connections = defaultdict(set)
+        self._pubsub = None
+        self._listener = None
+
+    def _get_pubsub(self):
+        if self._pubsub is None:
+            client = redis.asyncio.Redis.from_url(settings.WEBSOCKET_REDIS_URL)
+            self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        return self._pubsub
+
+    def _discard(self, connection: UserConnection) -> None:
+        user_connections = self.connections.get(connection.user_id, set())
+        user_connections.discard(connection)
+        if not user_connections:
+            self.connections.pop(connection.user_id, None)
+
+    async def subscribe(self, connection: UserConnection) -> None:
+        """
+        Passa a repassar os eventos do usuário à conexão. Sem
+        ``WEBSOCKET_REDIS_URL`` os eventos estão desativados e a conexão não é
+        registrada.
+        """
+        if not events_enabled():
+            return
+        user_connections = self.connections[connection.user_id]
+        user_connections.add(connection)
+        if len(user_connections) == 1:
+            try:
+                await self._get_pubsub().subscribe(user_channel(connection.user_id))
+            except redis.RedisError:
+                self._discard(connection)
+                raise
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, connection: UserConnection) -> None:
+        if connection not in self.connections.get(connection.user_id, ()):
+            return
+        self._discard(connection)
+        if connection.user_id in self.connections:
+            return
+        try:
+            await self._get_pubsub().unsubscribe(user_channel(connection.user_id))
+        except redis.RedisError:
+            # A assinatura não é refeita na reconexão se não houver conexões
+            logger.debug("Falha ao cancelar a assinatura de %s", connection.user_id)
+
+    def dispatch(self, channel, message) -> None:
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        if isinstance(message, bytes):
+            message = message.decode()
+        for connection in self.connections.get(user_id_from_channel(channel), ()):
+            connection.push(message)
+
+    async def _listen(self):
+        pubsub = self._get_pubsub()
+        while self.connections:
+            try:
+                message = await pubsub.get_message(timeout=HUB_POLL_TIMEOUT)
+            except redis.RedisError as e:
+                # O pubsub refaz a conexão e as assinaturas na próxima leitura
+                logger.warning("Falha na assinatura de eventos do websocket: %s", e)
+                await asyncio.sleep(HUB_RETRY_DELAY)
+                continue
+            if message and message["type"] == "message":
+                self.dispatch(message["channel"], message["data"])
+
+
+hub = UserEventHub()
+
+
+def _origin_allowed(scope) -> bool:
+    """
+    Rejeita conexões abertas por páginas de outros domínios (a sessão vai no
+    cookie, então sem isso qualquer site poderia ouvir os eventos do usuário).
+    """
+    headers = dict(scope.get("headers", []))
+    origin = headers.get(b"origin")
+    if origin is None:
+        return True
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        allowed_hosts = [".localhost", "127.0.0.1", "[::1]"]
+    hostname = urlsplit(origin.decode("latin1")).hostname
+    return bool(hostname) and validate_host(hostname, allowed_hosts)
+
+
+@sync_to_async
+def get_user_id(scope):
+    """
+    Usuário autenticado pela sessão do cookie, ou ``None``.
+
+    Usa o mesmo ``get_user`` do ``AuthenticationMiddleware``, incluindo a
+    verificação do hash de sessão (sessões invalidadas pela troca de senha).
+    Usuários que ainda não concluíram a configuração do 2FA não se conectam.
+
+    Roda fora do ciclo de requisição, então as conexões ao banco velhas ou
+    quebradas são fechadas antes e depois, como no ``database_sync_to_async``
+    do Channels.
+    """
+    close_old_connections()
+    try:
+        return _session_user_id(scope)
+    finally:
+        close_old_connections()
+
+
+def _session_user_id(scope):
+    headers = dict(scope.get("headers", []))
+    cookies = parse_cookie(headers.get(b"cookie", b"").decode("latin1"))
+    session_key = cookies.get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return None
+
+    engine = import_module(settings.SESSION_ENGINE)
+    request = HttpRequest()
+    request.session = engine.SessionStore(session_key)
+    user = get_user(request)
+    if not user.is_authenticated:
+        return None
+    if apps.is_installed("allauth.mfa") and not mfa_marked(request.session, user.id):
+        return None
+    return user.id
+
+
+async def _receive_messages(receive, connection, state):
     while True:
         event = await receive()
+        if event["type"] == "websocket.disconnect":
+            return
+        if event["type"] == "websocket.receive":
+            state["last_seen"] = time.monotonic()
+            if event.get("text") == "ping":
+                connection.push("pong!")
 
-        if event["type"] == "websocket.connect":
-            await send({"type": "websocket.accept"})
 
-        if event["type"] == "websocket.disconnect":
-            break
+async def _send_messages(send, connection):
+    while True:
+        message = await connection.queue.get()
+        await send({"type": "websocket.send", "text": message})
 
-        if event["type"] == "websocket.receive":
-            if event["text"] == "ping":
-                await send({"type": "websocket.send", "text": "pong!"})
+
+async def _heartbeat(send, connection, state):
+    while True:
+        await asyncio.sleep(settings.WEBSOCKET_HEARTBEAT_INTERVAL)
+        silencio = time.monotonic() - state["last_seen"]
+        if silencio > settings.WEBSOCKET_HEARTBEAT_TIMEOUT:
+            logger.info("Websocket do usuário %s sem resposta", connection.user_id)
+            await send({"type": "websocket.close", "code": CLOSE_HEARTBEAT_TIMEOUT})
+            return
+        connection.push(encode_event("heartbeat"))
+
+
+async def websocket_application(scope, receive, send):
+    event = await receive()
+    if event["type"] != "websocket.connect":
+        return
+
+    user_id = await get_user_id(scope) if _origin_allowed(scope) else None
+    if user_id is None:
+        # Fechar antes do accept recusa o handshake (HTTP 403)
+        await send({"type": "websocket.close"})
+        return
+
+    await send({"type": "websocket.accept"})
+    connection = UserConnection(user_id, settings.WEBSOCKET_SEND_QUEUE_SIZE)
+    state = {"last_seen": time.monotonic()}
+    try:
+        await hub.subscribe(connection)
+    except redis.RedisError as e:
+        # Sem eventos, a conexão ainda responde ao ping e as telas usam polling
+        logger.warning("Websocket sem assinatura de eventos: %s", e)
+
+    tasks = [
+        asyncio.create_task(_receive_messages(receive, connection, state)),
+        asyncio.create_task(_send_messages(send, connection)),
+        asyncio.create_task(_heartbeat(send, connection, state)),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is not None:
+                logger.warning(
+                    "Websocket do usuário %s encerrado: %s",
+                    user_id,
+                    task.exception(),
+                )
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await hub.unsubscribe(connection)
+        if connection.descartadas:
+            logger.info(
+                "Websocket do usuário %s descartou %d mensagens",
+                user_id,
+                connection.descartadas,
+            )
@@ -1 +1,27 @@
-# Register your models here.
+from django.contrib import admin
+
+from consultalab.audit.models import ArquivoAuditoria
+
+
+@admin.register(ArquivoAuditoria)
+class ArquivoAuditoriaAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "fonte",
+        "mes",
+        "parte",
+        "registros",
+        "inicio",
+        "fim",
+        "created",
+    )
+    list_filter = ("fonte",)
+    ordering = ("-mes", "-parte")
+    date_hierarchy = "mes"
+
+    # Os arquivos são append-only: o manifesto não é editado pelo admin
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,463 @@
+"""
+Arquivamento dos registros de auditoria (``auditlog.LogEntry``) e de acesso
+(``axes.AccessLog``) fora da janela de retenção.
+
+Os meses anteriores à retenção são exportados para arquivos JSONL compactados
+com gzip no storage privado, um arquivo por fonte e mês, descritos por um
+``ArquivoAuditoria`` (o manifesto), e então removidos das tabelas. As telas de
+auditoria continuam a listar esses registros: como os meses arquivados são
+sempre anteriores aos que ficam no banco, a paginação por chave apenas emenda
+a tabela com os arquivos (``ArchiveKeysetPaginator``).
+
+Cada dia (local) de um arquivo é um membro gzip separado, cuja posição e
+tamanho ficam no manifesto (``blocos``): a paginação lê só os dias da página,
+do mais novo para o mais antigo ou o contrário, sem descompactar o mês
+inteiro. Os totais vêm das contagens por dia e por chave do manifesto, sem
+abrir os arquivos.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import tempfile
+from collections import Counter
+from collections import defaultdict
+from datetime import UTC
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db import transaction
+from django.db.models import Max
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from consultalab.audit.models import ArquivoAuditoria
+from consultalab.audit.partitions import add_months
+from consultalab.audit.partitions import drop_log_entry_partition
+from consultalab.audit.partitions import month_bounds
+from consultalab.audit.partitions import month_start
+from consultalab.core.paginator import KeysetPage
+from consultalab.core.paginator import KeysetPaginator
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CHUNK_SIZE = 2000  # Linhas lidas por vez ao exportar um mês
+ARCHIVE_DELETE_BATCH_SIZE = 1000  # Ids removidos por DELETE após exportar
+
+# Fonte -> (model, campo de data, campo usado como chave de busca)
+FONTES = {
+    ArquivoAuditoria.FONTE_LOG_ENTRY: ("auditlog.LogEntry", "timestamp", "actor_id"),
+    ArquivoAuditoria.FONTE_ACCESS_LOG: ("axes.AccessLog", "attempt_time", "username"),
+}
+
+
+def _fonte(fonte):
+    model_label, date_field, key_field = FONTES[fonte]
+    return apps.get_model(model_label), date_field, key_field
+
+
+def _dia(data):
+    """Dia (no fuso horário local) das contagens do manifesto."""
+    return timezone.localtime(data).date().isoformat()
+
+
+class ArchiveCounts:
+    """Contagens do manifesto: registros por dia e por chave e dia."""
+
+    def __init__(self):
+        self.dias = Counter()
+        self.chaves = defaultdict(Counter)
+
+    def add(self, data, chave):
+        dia = _dia(data)
+        self.dias[dia] += 1
+        if chave is not None:
+            self.chaves[str(chave)][dia] += 1
+
+    def as_manifest(self):
+        return {
+            "dias": dict(sorted(self.dias.items())),
+            "chaves": {
+                chave: dict(sorted(dias.items()))
+                for chave, dias in sorted(self.chaves.items())
+            },
+        }
+
+
+class ArchiveWriter:
+    """
+    Grava as linhas de um arquivo em ``fileobj``, um membro gzip por dia, e
+    monta o manifesto (contagens e ``blocos``, como ``{dia: [posição,
+    tamanho]}``). As linhas devem vir em ordem de data.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.contagens = ArchiveCounts()
+        self.blocos = {}
+        self._dia = self._inicio = self._gz = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._close_member()
+
+    def _close_member(self):
+        if self._gz is not None:
+            self._gz.close()
+            self.blocos[self._dia] = [self._inicio, self.fileobj.tell() - self._inicio]
+            self._gz = None
+
+    def write(self, row, data, chave):
+        dia = _dia(data)
+        if dia != self._dia:
+            self._close_member()
+            self._dia = dia
+            self._inicio = self.fileobj.tell()
+            self._gz = gzip.GzipFile(fileobj=self.fileobj, mode="wb", mtime=0)
+        self._gz.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b"\n")
+        self.contagens.add(data, chave)
+
+    def as_manifest(self):
+        return {**self.contagens.as_manifest(), "blocos": self.blocos}
+
+
+def retention_cutoff(now=None):
+    """Primeiro mês (UTC) mantido no banco; os anteriores são arquivados."""
+    now = now or timezone.now()
+    limite = now - timedelta(days=settings.AUDIT_LOG_RETENTION_DAYS)
+    return month_start(limite.astimezone(UTC).date())
+
+
+def archive_audit_logs(cutoff=None):
+    """
+    Arquiva, de todas as fontes, os meses anteriores a ``cutoff``.
+    """
+    cutoff = cutoff or retention_cutoff()
+    limite, _ = month_bounds(cutoff)
+    arquivos = []
+    for fonte in FONTES:
+        model, date_field, _ = _fonte(fonte)
+        primeiro = model.objects.filter(**{f"{date_field}__lt": limite}).aggregate(
+            primeiro=Min(date_field),
+        )["primeiro"]
+        if primeiro is None:
+            continue
+
+        month = month_start(primeiro.astimezone(UTC).date())
+        while month < cutoff:
+            if arquivo := archive_month(fonte, month):
+                arquivos.append(arquivo)
+            month = add_months(month, 1)
+    return arquivos
+
+
+def archive_month(fonte, month):
+    """
+    Exporta os registros do mês para um novo arquivo e os remove da tabela.
+
+    Retorna o manifesto criado, ou ``None`` se o mês não tinha registros.
+    """
+    model, date_field, key_field = _fonte(fonte)
+    inicio, fim = month_bounds(month)
+    queryset = model.objects.filter(
+        **{f"{date_field}__gte": inicio, f"{date_field}__lt": fim},
+    ).order_by(date_field, "id")
+    campos = [field.attname for field in model._meta.concrete_fields]  # noqa: SLF001
+
+    ids = []
+    primeiro = ultimo = None
+    with tempfile.TemporaryFile() as tmp:
+        with ArchiveWriter(tmp) as writer:
+            for row in queryset.values(*campos).iterator(chunk_size=ARCHIVE_CHUNK_SIZE):
+                writer.write(row, row[date_field], row[key_field])
+                ids.append(row["id"])
+                primeiro = primeiro or row[date_field]
+                ultimo = row[date_field]
+        if not ids:
+            return None
+
+        tmp.seek(0)
+        sha256 = hashlib.file_digest(tmp, "sha256").hexdigest()
+        tmp.seek(0)
+        parte = (
+            ArquivoAuditoria.objects.filter(fonte=fonte, mes=month).aggregate(
+                parte=Max("parte"),
+            )["parte"]
+            or 0
+        ) + 1
+        arquivo = ArquivoAuditoria(
+            fonte=fonte,
+            mes=month,
+            parte=parte,
+            registros=len(ids),
+            inicio=primeiro,
+            fim=ultimo,
+            menor_id=min(ids),
+            maior_id=max(ids),
+            sha256=sha256,
+            **writer.as_manifest(),
+        )
+        # O arquivo é gravado antes da transação; se ela falhar, os registros
+        # continuam no banco e o arquivo órfão não aparece no manifesto
+        arquivo.arquivo.save(
+            f"{fonte.replace('.', '_')}_{month:%Y_%m}_{parte:03d}.jsonl.gz",
+            File(tmp),
+            save=False,
+        )
+
+    with transaction.atomic():
+        arquivo.save()
+        for i in range(0, len(ids), ARCHIVE_DELETE_BATCH_SIZE):
+            model.objects.filter(id__in=ids[i : i + ARCHIVE_DELETE_BATCH_SIZE]).delete()
+        if fonte == ArquivoAuditoria.FONTE_LOG_ENTRY:
+            with connection.cursor() as cursor:
+                drop_log_entry_partition(month, cursor)
+
+    logger.info(
+        "Arquivados %d registros de %s de %s em %s",
+        len(ids),
+        fonte,
+        f"{month:%m/%Y}",
+        arquivo.arquivo.name,
+    )
+    return arquivo
+
+
+def iter_rows(arquivo, dias=None):
+    """
+    Linhas (dicionários) de um arquivo, lidas uma a uma. Com ``dias``, lê só
+    os membros desses dias, na ordem dada, a partir dos ``blocos``.
+    """
+    with arquivo.arquivo.open("rb") as f:
+        if dias is None:
+            with gzip.GzipFile(fileobj=f) as gz:
+                yield from map(json.loads, gz)
+            return
+
+        for dia in dias:
+            posicao, tamanho = arquivo.blocos[dia]
+            f.seek(posicao)
+            with gzip.GzipFile(fileobj=io.BytesIO(f.read(tamanho))) as gz:
+                yield from map(json.loads, gz)
+
+
+def _build(model, row):
+    obj = model(
+        **{
+            field.attname: field.to_python(row[field.attname])
+            for field in model._meta.concrete_fields  # noqa: SLF001
+        },
+    )
+    obj.arquivado = True
+    return obj
+
+
+def read_archive(arquivo):
+    """Instâncias (não salvas) dos registros de um arquivo, marcadas como arquivadas."""
+    model, _, _ = _fonte(arquivo.fonte)
+    for row in iter_rows(arquivo):
+        yield _build(model, row)
+
+
+class ArchivedEntries:
+    """
+    Registros arquivados de uma fonte que atendem aos filtros da tela.
+
+    ``inicio``/``fim`` delimitam o intervalo ``[inicio, fim)`` de datas e
+    ``chave`` recebe o valor do campo de busca (id do usuário ou nome de
+    usuário, como texto) e diz se o registro entra no resultado. Os manifestos
+    eliminam os arquivos e os dias que não podem ter registros do filtro; dos
+    demais, só os dias necessários para completar a página são lidos, e só os
+    registros da página são montados como instâncias.
+    """
+
+    def __init__(self, fonte, *, inicio=None, fim=None, chave=None):
+        self.fonte = fonte
+        self.model, self.date_field, self.key_field = _fonte(fonte)
+        self.inicio = inicio
+        self.fim = fim
+        self.chave = chave
+
+    def _key(self, obj):
+        return getattr(obj, self.date_field), obj.id
+
+    def _manifestos(self):
+        queryset = ArquivoAuditoria.objects.filter(fonte=self.fonte)
+        if self.inicio:
+            queryset = queryset.filter(fim__gte=self.inicio)
+        if self.fim:
+            queryset = queryset.filter(inicio__lt=self.fim)
+        return queryset
+
+    def _dias(self, arquivo):
+        """Dias do arquivo que podem ter registros do filtro, pelo manifesto."""
+        if self.chave:
+            dias = {
+                dia
+                for chave, contagens in arquivo.chaves.items()
+                if self.chave(chave)
+                for dia in contagens
+            }
+        else:
+            dias = set(arquivo.dias)
+        # Ao contrário de ``count``, não supõe que o período comece e termine
+        # no início de um dia: os registros são filtrados um a um em ``_rows``
+        if self.inicio:
+            dias = {dia for dia in dias if dia >= _dia(self.inicio)}
+        if self.fim:
+            ultimo = _dia(self.fim - timedelta(microseconds=1))
+            dias = {dia for dia in dias if dia <= ultimo}
+        return dias
+
+    def _blocos(self, manifestos):
+        """Arquivos com registros do filtro em cada dia, como ``{dia: [arquivo]}``."""
+        blocos = defaultdict(list)
+        for arquivo in manifestos:
+            for dia in self._dias(arquivo):
+                blocos[dia].append(arquivo)
+        return blocos
+
+    def _rows(self, dia, arquivos):
+        """
+        ``(chave de paginação, linha)`` dos registros do filtro no dia, lendo
+        só o membro do dia de cada arquivo.
+        """
+        for arquivo in arquivos:
+            for row in iter_rows(arquivo, [dia]):
+                data = parse_datetime(row[self.date_field])
+                valor = row[self.key_field]
+                if self.inicio and data < self.inicio:
+                    continue
+                if self.fim and data >= self.fim:
+                    continue
+                if self.chave and (valor is None or not self.chave(str(valor))):
+                    continue
+                yield (data, row["id"]), row
+
+    def after(self, key, limit):
+        """Até ``limit`` registros antes de ``key`` (ou os mais novos, sem ``key``)."""
+        manifestos = self._manifestos()
+        if key:
+            manifestos = manifestos.filter(inicio__lte=key[0])
+        blocos = self._blocos(manifestos)
+
+        # Os dias são lidos do mais novo para o mais antigo, até completar a
+        # página; todo registro de um dia é mais novo que os dos dias anteriores
+        resultado = []
+        for dia in sorted(blocos, reverse=True):
+            if key and dia > _dia(key[0]):
+                continue
+            rows = [
+                (row_key, row)
+                for row_key, row in self._rows(dia, blocos[dia])
+                if not key or row_key < key
+            ]
+            resultado.extend(sorted(rows, key=lambda item: item[0], reverse=True))
+            if len(resultado) >= limit:
+                break
+        return [_build(self.model, row) for _, row in resultado[:limit]]
+
+    def before(self, key, limit):
+        """Até ``limit`` registros após ``key``, do mais antigo ao mais novo."""
+        blocos = self._blocos(self._manifestos().filter(fim__gte=key[0]))
+
+        resultado = []
+        for dia in sorted(blocos):
+            if dia < _dia(key[0]):
+                continue
+            rows = [
+                (row_key, row)
+                for row_key, row in self._rows(dia, blocos[dia])
+                if row_key > key
+            ]
+            resultado.extend(sorted(rows, key=lambda item: item[0]))
+            if len(resultado) >= limit:
+                break
+        return [_build(self.model, row) for _, row in resultado[:limit]]
+
+    def _no_periodo(self, dia):
+        # Os filtros da tela começam e terminam no início de um dia local
+        if self.inicio and dia < _dia(self.inicio):
+            return False
+        return not (self.fim and dia >= _dia(self.fim))
+
+    def count(self):
+        """
+        Total de arquivados do filtro, pelas contagens por dia (e por chave) dos
+        manifestos, sem abrir os arquivos.
+        """
+        total = 0
+        for arquivo in self._manifestos():
+            if self.chave:
+                contagens = [
+                    dias for chave, dias in arquivo.chaves.items() if self.chave(chave)
+                ]
+            else:
+                contagens = [arquivo.dias]
+            total += sum(
+                n
+                for dias in contagens
+                for dia, n in dias.items()
+                if self._no_periodo(dia)
+            )
+        return total
+
+    def get(self, pk):
+        manifestos = self._manifestos().filter(menor_id__lte=pk, maior_id__gte=pk)
+        for arquivo in manifestos:
+            for row in iter_rows(arquivo):
+                if row["id"] == pk:
+                    return _build(self.model, row)
+        return None
+
+
+class ArchiveKeysetPaginator(KeysetPaginator):
+    """
+    ``KeysetPaginator`` que continua nos registros arquivados quando a tabela
+    acaba. Só funciona porque todo mês arquivado é anterior aos registros que
+    ficaram no banco.
+    """
+
+    def __init__(self, queryset, per_page, archive, date_field):
+        super().__init__(queryset, per_page, date_field=date_field)
+        self.archive = archive
+
+    def _page_after(self, key):
+        page = super()._page_after(key)
+        if page.has_next:
+            return page
+
+        faltam = self.per_page - len(page)
+        if page.object_list:
+            ultimo = page.object_list[-1]
+            key = (getattr(ultimo, self.date_field), ultimo.id)
+        arquivados = self.archive.after(key, faltam + 1)
+        page.object_list = [*page.object_list, *arquivados[:faltam]]
+        page.has_next = len(arquivados) > faltam
+        return page
+
+    def _page_before(self, key):
+        arquivados = self.archive.before(key, self.per_page + 1)
+        if not arquivados:
+            return super()._page_before(key)
+
+        # O cursor está nos arquivos; o restante da página são os registros
+        # mais antigos que ainda estão no banco
+        faltam = max(self.per_page - len(arquivados), 0)
+        recentes = list(self.queryset.reverse()[: faltam + 1])
+        objects = [*arquivados, *recentes][: self.per_page]
+        return KeysetPage(
+            objects[::-1],
+            self,
+            has_next=True,
+            has_previous=len(arquivados) + len(recentes) > self.per_page,
+        )
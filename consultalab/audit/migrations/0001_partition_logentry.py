@@ -0,0 +1,242 @@
+from datetime import UTC
+
+from django.db import migrations
+from django.db import transaction
+from django.utils import timezone
+
+from consultalab.audit.partitions import LOG_ENTRY_DEFAULT_PARTITION
+from consultalab.audit.partitions import LOG_ENTRY_TABLE
+from consultalab.audit.partitions import PARTITION_MONTHS_AHEAD
+from consultalab.audit.partitions import add_months
+from consultalab.audit.partitions import create_log_entry_partition
+from consultalab.audit.partitions import month_start
+
+LEGACY_TABLE = f"{LOG_ENTRY_TABLE}_legacy"
+PARTITIONED_TABLE = f"{LOG_ENTRY_TABLE}_particionada"
+ID_SEQUENCE = f"{LOG_ENTRY_TABLE}_id_seq"
+PRIMARY_KEY = f"{LOG_ENTRY_TABLE}_pkey"
+# Sufixo da chave primária e dos índices da tabela nova até a troca, já que os
+# nomes definitivos ainda estão em uso pela tabela original (os nomes das FKs
+# só precisam ser únicos por tabela)
+TEMPORARY_SUFFIX = "_novo"
+COPY_BATCH_SIZE = 10000  # Registros copiados por transação
+
+# Restrições e índices criados pelas migrações do auditlog, recriados com os
+# mesmos nomes para que migrações futuras do pacote continuem funcionando.
+# Ainda assim, toda nova migração do auditlog que altere auditlog_logentry
+# precisa ser conferida contra a tabela particionada (chave primária
+# (id, timestamp), id sem identity e índices criados em cada partição)
+FOREIGN_KEYS = [
+    (
+        "auditlog_logentry_actor_id_959271d2_fk_users_user_id",
+        "FOREIGN KEY (actor_id) REFERENCES users_user(id) "
+        "DEFERRABLE INITIALLY DEFERRED",
+    ),
+    (
+        "auditlog_logentry_content_type_id_75830218_fk_django_co",
+        "FOREIGN KEY (content_type_id) REFERENCES django_content_type(id) "
+        "DEFERRABLE INITIALLY DEFERRED",
+    ),
+]
+INDEXES = [
+    ("auditlog_logentry_actor_id_959271d2", "(actor_id)"),
+    ("auditlog_logentry_content_type_id_75830218", "(content_type_id)"),
+    ("auditlog_logentry_object_id_09c2eee8", "(object_id)"),
+    ("auditlog_logentry_object_pk_6e3219c0", "(object_pk)"),
+    ("auditlog_logentry_object_pk_6e3219c0_like", "(object_pk varchar_pattern_ops)"),
+    ("auditlog_logentry_action_229afe39", "(action)"),
+    ("auditlog_logentry_timestamp_37867bb0", '("timestamp")'),
+    ("auditlog_logentry_cid_9f467263", "(cid)"),
+    ("auditlog_logentry_cid_9f467263_like", "(cid varchar_pattern_ops)"),
+    # Paginação por chave da aba de auditoria, com e sem filtro por usuário
+    ("auditlog_logentry_ts_id_idx", '("timestamp" DESC, id DESC)'),
+    ("auditlog_logentry_actor_ts_idx", '(actor_id, "timestamp" DESC, id DESC)'),
+]
+
+
+def _create_constraints_and_indexes(
+    cursor,
+    primary_key,
+    table=LOG_ENTRY_TABLE,
+    suffix="",
+):
+    cursor.execute(
+        f'ALTER TABLE "{table}" '
+        f'ADD CONSTRAINT "{PRIMARY_KEY}{suffix}" PRIMARY KEY {primary_key}',
+    )
+    for name, definition in FOREIGN_KEYS:
+        cursor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}',
+        )
+    for name, definition in INDEXES:
+        cursor.execute(f'CREATE INDEX "{name}{suffix}" ON "{table}" {definition}')
+
+
+def _rename_constraints_and_indexes(cursor, suffix):
+    cursor.execute(
+        f'ALTER TABLE "{LOG_ENTRY_TABLE}" '
+        f'RENAME CONSTRAINT "{PRIMARY_KEY}{suffix}" TO "{PRIMARY_KEY}"',
+    )
+    for name, _ in INDEXES:
+        cursor.execute(f'ALTER INDEX "{name}{suffix}" RENAME TO "{name}"')
+
+
+def _copy_from_legacy(cursor):
+    cursor.execute(f'INSERT INTO "{LOG_ENTRY_TABLE}" SELECT * FROM "{LEGACY_TABLE}"')  # noqa: S608
+    cursor.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+
+
+def _copy_to_partitioned(cursor, desde, ate=None):
+    """Copia para a nova tabela os registros com id em ``(desde, ate]``."""
+    filtro, params = "id > %s", [desde]
+    if ate is not None:
+        filtro, params = f"{filtro} AND id <= %s", [desde, ate]
+    cursor.execute(
+        f'INSERT INTO "{PARTITIONED_TABLE}" '  # noqa: S608
+        f'SELECT * FROM "{LOG_ENTRY_TABLE}" WHERE {filtro}',
+        params,
+    )
+
+
+def _rename_to_legacy(cursor):
+    # Sem o default do id, o LIKE não copia a dependência da sequência antiga
+    cursor.execute(f'ALTER TABLE "{LOG_ENTRY_TABLE}" RENAME TO "{LEGACY_TABLE}"')
+    cursor.execute(
+        f'ALTER TABLE "{LEGACY_TABLE}" ALTER COLUMN id DROP IDENTITY IF EXISTS',
+    )
+    cursor.execute(f'ALTER TABLE "{LEGACY_TABLE}" ALTER COLUMN id DROP DEFAULT')
+
+
+def _create_partitioned_table(cursor):
+    """
+    Cria a cópia vazia e particionada da tabela, com as partições, restrições
+    e índices (com nomes temporários). Nada disso trava a tabela original.
+    """
+    cursor.execute(f'DROP TABLE IF EXISTS "{PARTITIONED_TABLE}"')
+    cursor.execute(
+        f'CREATE TABLE "{PARTITIONED_TABLE}" ('
+        f'LIKE "{LOG_ENTRY_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS'
+        ') PARTITION BY RANGE ("timestamp")',
+    )
+    # Um id serial teria o default copiado, apontando para a sequência antiga
+    cursor.execute(
+        f'ALTER TABLE "{PARTITIONED_TABLE}" ALTER COLUMN id DROP DEFAULT',
+    )
+
+    cursor.execute(f'SELECT MIN("timestamp") FROM "{LOG_ENTRY_TABLE}"')  # noqa: S608
+    primeiro = cursor.fetchone()[0] or timezone.now()
+    month = month_start(primeiro.astimezone(UTC).date())
+    last = add_months(
+        month_start(timezone.now().astimezone(UTC).date()),
+        PARTITION_MONTHS_AHEAD,
+    )
+    while month <= last:
+        create_log_entry_partition(month, cursor, table=PARTITIONED_TABLE)
+        month = add_months(month, 1)
+    cursor.execute(
+        f'CREATE TABLE "{LOG_ENTRY_DEFAULT_PARTITION}" '
+        f'PARTITION OF "{PARTITIONED_TABLE}" DEFAULT',
+    )
+    _create_constraints_and_indexes(
+        cursor,
+        '(id, "timestamp")',
+        table=PARTITIONED_TABLE,
+        suffix=TEMPORARY_SUFFIX,
+    )
+
+
+def partition_log_entries(apps, schema_editor):
+    """
+    Converte ``auditlog_logentry`` em uma tabela particionada por mês.
+
+    O id deixa de ser uma coluna identity (não suportada em tabelas
+    particionadas antes do PostgreSQL 17) e passa a usar uma sequência comum;
+    a chave primária inclui o ``timestamp``, como exige o particionamento.
+
+    A migração não é atômica, para não travar a auditoria durante a cópia: os
+    registros são copiados para uma tabela particionada nova em lotes, cada um
+    na sua transação, enquanto a tabela original continua recebendo
+    registros, e só a troca final (a cópia do que chegou nesse meio tempo e a
+    renomeação) acontece com a tabela travada. Os registros do auditlog nunca
+    são alterados, só inseridos; por isso basta copiar pelo id. Se a migração
+    for interrompida, a tabela original continua intacta e a cópia é refeita
+    do início na próxima execução.
+    """
+    connection = schema_editor.connection
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _create_partitioned_table(cursor)
+
+    # Com a tabela em modo SHARE, as transações que já inseriram registros
+    # terminam antes da leitura do maior id, e as seguintes recebem ids maiores
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{LOG_ENTRY_TABLE}" IN SHARE MODE')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{LOG_ENTRY_TABLE}"')  # noqa: S608
+        maior_id = cursor.fetchone()[0]
+
+    copiado = 0
+    while copiado < maior_id:
+        ate = min(copiado + COPY_BATCH_SIZE, maior_id)
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            _copy_to_partitioned(cursor, copiado, ate)
+        copiado = ate
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{LOG_ENTRY_TABLE}" IN ACCESS EXCLUSIVE MODE')
+        _copy_to_partitioned(cursor, copiado)
+        # Verificações de FK adiadas pendentes impedem o ALTER TABLE abaixo
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        # A sequência do id antigo é removida com a tabela
+        cursor.execute(f'DROP TABLE "{LOG_ENTRY_TABLE}"')
+        cursor.execute(
+            f'ALTER TABLE "{PARTITIONED_TABLE}" RENAME TO "{LOG_ENTRY_TABLE}"',
+        )
+        _rename_constraints_and_indexes(cursor, TEMPORARY_SUFFIX)
+        cursor.execute(
+            f'CREATE SEQUENCE "{ID_SEQUENCE}" OWNED BY "{LOG_ENTRY_TABLE}".id',
+        )
+        cursor.execute(
+            f"SELECT setval('\"{ID_SEQUENCE}\"', COALESCE(MAX(id), 0) + 1, false) "  # noqa: S608
+            f'FROM "{LOG_ENTRY_TABLE}"',
+        )
+        cursor.execute(
+            f'ALTER TABLE "{LOG_ENTRY_TABLE}" '
+            f"ALTER COLUMN id SET DEFAULT nextval('\"{ID_SEQUENCE}\"')",
+        )
+
+
+def unpartition_log_entries(apps, schema_editor):
+    # A volta ainda é feita em uma única transação, com a tabela travada
+    connection = schema_editor.connection
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _rename_to_legacy(cursor)
+        cursor.execute(
+            f'CREATE TABLE "{LOG_ENTRY_TABLE}" ('
+            f'LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        )
+        _copy_from_legacy(cursor)
+        cursor.execute(
+            f'ALTER TABLE "{LOG_ENTRY_TABLE}" '
+            "ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY",
+        )
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{LOG_ENTRY_TABLE}', 'id'), "  # noqa: S608
+            f'COALESCE(MAX(id), 0) + 1, false) FROM "{LOG_ENTRY_TABLE}"',
+        )
+        _create_constraints_and_indexes(cursor, "(id)")
+        cursor.execute('DROP INDEX "auditlog_logentry_ts_id_idx"')
+        cursor.execute('DROP INDEX "auditlog_logentry_actor_ts_idx"')
+
+
+class Migration(migrations.Migration):
+    # Cada etapa controla a própria transação (ver partition_log_entries)
+    atomic = False
+
+    dependencies = [
+        ("auditlog", "0017_add_actor_email"),
+        ("users", "0001_initial"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_log_entries, unpartition_log_entries),
+    ]
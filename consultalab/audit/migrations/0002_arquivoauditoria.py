@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:18
+
+import consultalab.bacen.models
+import django.utils.timezone
+import model_utils.fields
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('audit', '0001_partition_logentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArquivoAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_void', models.BooleanField(db_column='inativo', default=False, verbose_name='Inativo')),
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('fonte', models.CharField(choices=[('auditlog.logentry', 'Registros de auditoria'), ('axes.accesslog', 'Registros de acesso')], db_column='fonte', max_length=30, verbose_name='Fonte')),
+                ('mes', models.DateField(db_column='mes', verbose_name='Mês')),
+                ('parte', models.PositiveIntegerField(db_column='parte', default=1, verbose_name='Parte')),
+                ('arquivo', models.FileField(db_column='arquivo', storage=consultalab.bacen.models.private_storage, upload_to='auditoria/', verbose_name='Arquivo')),
+                ('registros', models.PositiveIntegerField(db_column='registros', verbose_name='Registros')),
+                ('inicio', models.DateTimeField(db_column='inicio', verbose_name='Primeiro registro')),
+                ('fim', models.DateTimeField(db_column='fim', verbose_name='Último registro')),
+                ('menor_id', models.BigIntegerField(db_column='menor_id', verbose_name='Menor id')),
+                ('maior_id', models.BigIntegerField(db_column='maior_id', verbose_name='Maior id')),
+                ('chaves', models.JSONField(db_column='chaves', default=list, verbose_name='Chaves de busca')),
+                ('sha256', models.CharField(db_column='sha256', max_length=64, verbose_name='SHA-256')),
+            ],
+            options={
+                'verbose_name': 'Arquivo de Auditoria',
+                'verbose_name_plural': 'Arquivos de Auditoria',
+                'db_table': 'ARQUIVOS_AUDITORIA',
+                'ordering': ['-mes', '-parte'],
+                'indexes': [models.Index(fields=['fonte', 'fim', 'inicio'], name='ARQUIVOS_AU_fonte_5f3fab_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fonte', 'mes', 'parte'), name='arquivo_auditoria_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:52
+
+import consultalab.bacen.models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_arquivoauditoria'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilRequisicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_void', models.BooleanField(db_column='inativo', default=False, verbose_name='Inativo')),
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('metodo', models.CharField(db_column='metodo', max_length=10, verbose_name='Método')),
+                ('caminho', models.CharField(db_column='caminho', max_length=2048, verbose_name='Caminho')),
+                ('status_code', models.PositiveSmallIntegerField(db_column='status_code', verbose_name='Status HTTP')),
+                ('duracao', models.FloatField(db_column='duracao', verbose_name='Duração (s)')),
+                ('tempo_consultas', models.FloatField(db_column='tempo_consultas', verbose_name='Tempo em consultas (s)')),
+                ('consultas', models.JSONField(db_column='consultas', default=list, verbose_name='Consultas')),
+                ('arquivo', models.FileField(db_column='arquivo', storage=consultalab.bacen.models.private_storage, upload_to='perfis/%Y/%m/', verbose_name='Arquivo')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='perfis_requisicao', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Requisição',
+                'verbose_name_plural': 'Perfis de Requisição',
+                'db_table': 'PERFIS_REQUISICAO',
+                'ordering': ['-created'],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+from django.db import models
+from django.utils.dateparse import parse_datetime
+
+from consultalab.audit.archive import FONTES
+from consultalab.audit.archive import ArchiveCounts
+from consultalab.audit.archive import iter_rows
+
+
+def count_archives(apps, schema_editor):
+    """Refaz as chaves de cada manifesto com as contagens por dia, lendo o arquivo."""
+    ArquivoAuditoria = apps.get_model("audit", "ArquivoAuditoria")
+    for arquivo in ArquivoAuditoria.objects.all():
+        _, date_field, key_field = FONTES[arquivo.fonte]
+        contagens = ArchiveCounts()
+        for row in iter_rows(arquivo):
+            contagens.add(parse_datetime(row[date_field]), row[key_field])
+        manifesto = contagens.as_manifest()
+        arquivo.dias = manifesto["dias"]
+        arquivo.chaves = manifesto["chaves"]
+        arquivo.save(update_fields=["dias", "chaves"])
+
+
+def list_keys(apps, schema_editor):
+    ArquivoAuditoria = apps.get_model("audit", "ArquivoAuditoria")
+    for arquivo in ArquivoAuditoria.objects.all():
+        arquivo.chaves = sorted(arquivo.chaves)
+        arquivo.save(update_fields=["chaves"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("audit", "0003_perfilrequisicao"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="arquivoauditoria",
+            name="chaves",
+            field=models.JSONField(
+                db_column="chaves",
+                default=dict,
+                verbose_name="Chaves de busca",
+            ),
+        ),
+        migrations.AddField(
+            model_name="arquivoauditoria",
+            name="dias",
+            field=models.JSONField(
+                db_column="dias",
+                default=dict,
+                verbose_name="Registros por dia",
+            ),
+        ),
+        migrations.RunPython(count_archives, list_keys),
+    ]
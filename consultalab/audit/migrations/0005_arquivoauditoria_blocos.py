@@ -0,0 +1,61 @@
+import hashlib
+import tempfile
+from pathlib import Path
+
+from django.core.files import File
+from django.db import migrations
+from django.db import models
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from consultalab.audit.archive import FONTES
+from consultalab.audit.archive import ArchiveWriter
+from consultalab.audit.archive import iter_rows
+
+
+def split_archives(apps, schema_editor):
+    """
+    Regrava cada arquivo com um membro gzip por dia e guarda a posição de cada
+    um no manifesto. As linhas não mudam; o arquivo antigo só é removido depois
+    que o manifesto aponta para o novo.
+    """
+    ArquivoAuditoria = apps.get_model("audit", "ArquivoAuditoria")
+    for arquivo in ArquivoAuditoria.objects.filter(blocos={}):
+        _, date_field, key_field = FONTES[arquivo.fonte]
+        antigo = arquivo.arquivo.name
+        with tempfile.TemporaryFile() as tmp:
+            with ArchiveWriter(tmp) as writer:
+                for row in iter_rows(arquivo):
+                    writer.write(row, parse_datetime(row[date_field]), row[key_field])
+            tmp.seek(0)
+            arquivo.sha256 = hashlib.file_digest(tmp, "sha256").hexdigest()
+            tmp.seek(0)
+            arquivo.arquivo.save(Path(antigo).name, File(tmp), save=False)
+        arquivo.blocos = writer.blocos
+        with transaction.atomic():
+            arquivo.save(update_fields=["arquivo", "blocos", "sha256"])
+        arquivo.arquivo.storage.delete(antigo)
+
+
+class Migration(migrations.Migration):
+    # Cada arquivo é trocado na sua própria transação, para que uma falha no
+    # meio não deixe manifestos apontando para arquivos já removidos
+    atomic = False
+
+    dependencies = [
+        ("audit", "0004_arquivoauditoria_contagens"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="arquivoauditoria",
+            name="blocos",
+            field=models.JSONField(
+                db_column="blocos",
+                default=dict,
+                verbose_name="Posição de cada dia no arquivo",
+            ),
+        ),
+        # Os arquivos regravados continuam legíveis por inteiro (``iter_rows``)
+        migrations.RunPython(split_archives, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,172 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from consultalab.bacen.models import private_storage
+from consultalab.core.models import AppModel
+
+User = get_user_model()
+
+
+class ArquivoAuditoria(AppModel):
+    """
+    Manifesto de um arquivo de registros de auditoria arquivados.
+
+    Cada arquivo é um JSONL compactado com gzip, com os registros de um mês de
+    uma das tabelas de auditoria, e nunca é reescrito: um novo arquivamento do
+    mesmo mês gera uma nova parte. Os intervalos de data e de id e as chaves de
+    busca (ids dos usuários ou nomes de usuário) permitem descobrir quais
+    arquivos abrir sem lê-los, e as contagens por dia (``dias``) e por chave e
+    dia (``chaves``, como ``{chave: {dia: n}}``) dão os totais dos filtros sem
+    abrir nenhum arquivo. Cada dia é um membro gzip separado, e ``blocos``
+    (``{dia: [posição, tamanho]}``) diz onde ele está no arquivo, para que a
+    paginação leia só os dias de que precisa. Os dias são datas no fuso
+    horário local.
+    """
+
+    FONTE_LOG_ENTRY = "auditlog.logentry"
+    FONTE_ACCESS_LOG = "axes.accesslog"
+    FONTE_CHOICES = [
+        (FONTE_LOG_ENTRY, "Registros de auditoria"),
+        (FONTE_ACCESS_LOG, "Registros de acesso"),
+    ]
+
+    fonte = models.CharField(
+        max_length=30,
+        choices=FONTE_CHOICES,
+        verbose_name="Fonte",
+        db_column="fonte",
+    )
+    mes = models.DateField(
+        verbose_name="Mês",
+        db_column="mes",
+    )
+    parte = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Parte",
+        db_column="parte",
+    )
+    arquivo = models.FileField(
+        upload_to="auditoria/",
+        storage=private_storage,
+        verbose_name="Arquivo",
+        db_column="arquivo",
+    )
+    registros = models.PositiveIntegerField(
+        verbose_name="Registros",
+        db_column="registros",
+    )
+    inicio = models.DateTimeField(
+        verbose_name="Primeiro registro",
+        db_column="inicio",
+    )
+    fim = models.DateTimeField(
+        verbose_name="Último registro",
+        db_column="fim",
+    )
+    menor_id = models.BigIntegerField(
+        verbose_name="Menor id",
+        db_column="menor_id",
+    )
+    maior_id = models.BigIntegerField(
+        verbose_name="Maior id",
+        db_column="maior_id",
+    )
+    chaves = models.JSONField(
+        default=dict,
+        verbose_name="Chaves de busca",
+        db_column="chaves",
+    )
+    dias = models.JSONField(
+        default=dict,
+        verbose_name="Registros por dia",
+        db_column="dias",
+    )
+    blocos = models.JSONField(
+        default=dict,
+        verbose_name="Posição de cada dia no arquivo",
+        db_column="blocos",
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        verbose_name="SHA-256",
+        db_column="sha256",
+    )
+
+    class Meta:
+        verbose_name = "Arquivo de Auditoria"
+        verbose_name_plural = "Arquivos de Auditoria"
+        db_table = "ARQUIVOS_AUDITORIA"
+        ordering = ["-mes", "-parte"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fonte", "mes", "parte"],
+                name="arquivo_auditoria_unico",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["fonte", "fim", "inicio"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_fonte_display()} | {self.mes:%m/%Y} | parte {self.parte}"
+
+
+class PerfilRequisicao(AppModel):
+    """
+    Perfil de uma única requisição HTTP, capturado a pedido de um administrador
+    (ver ``consultalab.audit.profiling``).
+
+    As amostras do profiler ficam no arquivo (sessão do pyinstrument em JSON),
+    de onde o flamegraph é gerado na seção de administração; as consultas ao
+    banco ficam no próprio registro, sem os parâmetros.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="perfis_requisicao",
+        verbose_name="Usuário",
+    )
+    metodo = models.CharField(
+        max_length=10,
+        verbose_name="Método",
+        db_column="metodo",
+    )
+    caminho = models.CharField(
+        max_length=2048,
+        verbose_name="Caminho",
+        db_column="caminho",
+    )
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name="Status HTTP",
+        db_column="status_code",
+    )
+    duracao = models.FloatField(
+        verbose_name="Duração (s)",
+        db_column="duracao",
+    )
+    tempo_consultas = models.FloatField(
+        verbose_name="Tempo em consultas (s)",
+        db_column="tempo_consultas",
+    )
+    consultas = models.JSONField(
+        default=list,
+        verbose_name="Consultas",
+        db_column="consultas",
+    )
+    arquivo = models.FileField(
+        upload_to="perfis/%Y/%m/",
+        storage=private_storage,
+        verbose_name="Arquivo",
+        db_column="arquivo",
+    )
+
+    class Meta:
+        verbose_name = "Perfil de Requisição"
+        verbose_name_plural = "Perfis de Requisição"
+        db_table = "PERFIS_REQUISICAO"
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"{self.metodo} {self.caminho} | {self.created:%d/%m/%Y %H:%M:%S}"
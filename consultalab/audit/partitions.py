@@ -0,0 +1,106 @@
+"""
+Particionamento mensal da tabela de auditoria (``auditlog_logentry``).
+
+A tabela é particionada por intervalo de ``timestamp`` (um mês UTC por
+partição) desde a migração ``audit.0001_partition_logentry``. As partições dos
+próximos meses são criadas antecipadamente pela tarefa
+``ensure_log_entry_partitions``; a partição ``default`` só recebe linhas fora
+dos meses criados e deve permanecer vazia.
+"""
+
+import logging
+from datetime import UTC
+from datetime import date
+from datetime import datetime
+
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LOG_ENTRY_TABLE = "auditlog_logentry"
+LOG_ENTRY_DEFAULT_PARTITION = f"{LOG_ENTRY_TABLE}_default"
+PARTITION_MONTHS_AHEAD = 3  # Meses futuros com partição já criada
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    total = value.year * 12 + value.month - 1 + months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    """Limites ``[início, fim)`` do mês em UTC, os mesmos das partições."""
+    inicio = datetime.combine(month_start(month), datetime.min.time(), tzinfo=UTC)
+    fim = datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=UTC)
+    return inicio, fim
+
+
+def partition_name(month: date) -> str:
+    return f"{LOG_ENTRY_TABLE}_p{month:%Y_%m}"
+
+
+def create_log_entry_partition(
+    month: date,
+    cursor,
+    table: str = LOG_ENTRY_TABLE,
+) -> bool:
+    """
+    Cria a partição do mês, caso ainda não exista. Retorna se ela foi criada.
+
+    ``table`` só muda durante a migração, que particiona uma cópia da tabela.
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    inicio, fim = month_bounds(month)
+    # Os limites são gerados aqui (não vêm do usuário); DDL não aceita parâmetros
+    cursor.execute(
+        f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{fim.isoformat()}')",
+    )
+    return True
+
+
+def ensure_log_entry_partitions(
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    reference: date | None = None,
+) -> list[str]:
+    """
+    Garante as partições do mês de referência e dos ``months_ahead`` seguintes.
+    """
+    reference = month_start(reference or timezone.now().astimezone(UTC).date())
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(reference, offset)
+            if create_log_entry_partition(month, cursor):
+                created.append(partition_name(month))
+
+    if created:
+        logger.info("Partições de auditoria criadas: %s", ", ".join(created))
+    return created
+
+
+def drop_log_entry_partition(month: date, cursor) -> bool:
+    """
+    Remove a partição do mês se ela existir e estiver vazia (já arquivada).
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is None:
+        return False
+
+    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{name}")')  # noqa: S608
+    if cursor.fetchone()[0]:
+        return False
+
+    # Verificações de FK adiadas pendentes impedem o DROP na mesma transação
+    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    cursor.execute(f'DROP TABLE "{name}"')
+    return True
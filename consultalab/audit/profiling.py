@@ -0,0 +1,102 @@
+"""
+Profiler sob demanda de requisições, para administradores.
+
+Um usuário com ``users.access_admin_section`` pede o perfil de uma requisição
+enviando o cabeçalho ``X-Profile: 1`` ou o parâmetro ``_perfil=1`` na query
+string (ver ``RequestProfilerMiddleware``). A requisição roda sob o profiler
+por amostragem do pyinstrument e com as consultas ao banco registradas; o
+resultado é gravado em ``PerfilRequisicao`` e aparece na aba "Perfis" da
+administração, com o flamegraph. O id do perfil volta no cabeçalho
+``X-Profile-Id``.
+
+Respostas em streaming são medidas apenas até a view devolver a resposta; o
+``FileResponse`` do relatório PDF já recebe o arquivo pronto, então a geração
+aparece inteira no perfil.
+"""
+
+import json
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer
+from pyinstrument.session import Session
+
+from consultalab.audit.models import PerfilRequisicao
+from consultalab.core.query_budget import QueryStats
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "_perfil"
+PROFILE_PERMISSION = "users.access_admin_section"
+SAMPLE_INTERVAL = 0.001  # Segundos entre as amostras do profiler
+SQL_MAX_LENGTH = 5000  # Caracteres do SQL guardados de cada consulta
+
+
+def profile_requested(request) -> bool:
+    """O pedido de perfil só vale para quem acessa a administração."""
+    requested = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+    return (
+        bool(requested)
+        and request.user.is_authenticated
+        and request.user.has_perm(PROFILE_PERMISSION)
+    )
+
+
+class QueryLog(QueryStats):
+    """``QueryStats`` que guarda o SQL e a duração de cada consulta."""
+
+    def record(self, sql, duracao):
+        self.queries.append({"sql": sql[:SQL_MAX_LENGTH], "duracao": duracao})
+        self.time += duracao
+
+
+def profile_request(request, get_response):
+    """Executa a requisição sob o profiler e grava o perfil."""
+    query_log = QueryLog()
+    profiler = Profiler(interval=SAMPLE_INTERVAL)
+    inicio = time.perf_counter()
+    with connection.execute_wrapper(query_log):
+        profiler.start()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.stop()
+    duracao = time.perf_counter() - inicio
+
+    perfil = PerfilRequisicao(
+        user=request.user,
+        metodo=request.method,
+        caminho=request.get_full_path()[:2048],
+        status_code=response.status_code,
+        duracao=duracao,
+        tempo_consultas=query_log.time,
+        consultas=query_log.queries,
+    )
+    perfil.arquivo.save(
+        f"perfil_{perfil.uuid}.json",
+        ContentFile(json.dumps(profiler.last_session.to_json()).encode()),
+        save=False,
+    )
+    perfil.save()
+    prune_profiles()
+    response["X-Profile-Id"] = perfil.id
+    return response
+
+
+def prune_profiles(keep=None):
+    """Remove os perfis mais antigos (e seus arquivos) além dos ``keep`` mais
+    recentes."""
+    keep = settings.REQUEST_PROFILER_MAX_PROFILES if keep is None else keep
+    antigos = PerfilRequisicao.objects.order_by("-created", "-id")[keep:]
+    for perfil in antigos:
+        perfil.arquivo.delete(save=False)
+        perfil.delete()
+
+
+def render_flamegraph(perfil: PerfilRequisicao) -> str:
+    """Página HTML (autocontida) do pyinstrument com o flamegraph do perfil."""
+    with perfil.arquivo.open("rb") as arquivo:
+        session = Session.from_json(json.load(arquivo))
+    return HTMLRenderer().render(session)
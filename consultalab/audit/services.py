@@ -0,0 +1,386 @@
+"""
+Consultas das abas da seção de Administração & Auditoria.
+
+Cada aba (usuários, registros de auditoria e registros de acesso) tem uma
+classe ``AuditQuery`` que monta os filtros uma única vez a partir dos
+parâmetros da requisição, usada tanto pela view de listagem (GET) quanto pela
+de busca (POST). Os totais ficam em cache por um curto período, com a chave
+derivada dos filtros, e buscas idênticas simultâneas (várias abas ou teclas
+digitadas em sequência) recebem o último total calculado em vez de repetir a
+consulta ou esperar por ela. As páginas (instâncias dos models) não vão para o
+cache.
+"""
+
+import abc
+import hashlib
+from collections.abc import Callable
+from datetime import datetime
+from datetime import timedelta
+from typing import ClassVar
+from urllib.parse import urlencode
+
+from auditlog.models import LogEntry
+from axes.models import AccessLog
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.db.models import Value
+from django.db.models import prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.db.models.functions import NullIf
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+
+from consultalab.audit.archive import ArchivedEntries
+from consultalab.audit.archive import ArchiveKeysetPaginator
+from consultalab.audit.models import ArquivoAuditoria
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.bacen.querysets import ETAPAS_PROCESSAMENTO
+
+User = get_user_model()
+
+AUDIT_PAGE_SIZE = 10
+AUDIT_COUNT_CACHE_TIMEOUT = 30  # Segundos com o total de uma busca em cache
+SEARCH_LOCK_TIMEOUT = 30  # Validade da trava de uma busca em andamento
+SEARCH_STALE_TIMEOUT = 300  # Segundos em que um valor vencido ainda é servido
+DESEMPENHO_CACHE_TIMEOUT = 60  # Segundos com os percentis de um período em cache
+DESEMPENHO_DIAS_PADRAO = 7  # Dias exibidos quando o período não é informado
+DESEMPENHO_PERCENTIS = (50, 95)
+
+
+def single_flight(key, timeout, compute):
+    """
+    Retorna o valor em cache para ``key`` ou o calcula com ``compute``.
+
+    Nenhuma requisição espera por outra: enquanto uma delas recalcula um valor
+    vencido, as demais com a mesma chave recebem o último valor calculado
+    (guardado por ``SEARCH_STALE_TIMEOUT``), e só calculam por conta própria
+    se não houver nenhum.
+    """
+    if (cached := cache.get(key)) is not None:
+        return cached[0]
+
+    stale_key = f"{key}:anterior"
+    lock_key = f"{key}:trava"
+    locked = cache.add(lock_key, 1, SEARCH_LOCK_TIMEOUT)
+    if not locked and (stale := cache.get(stale_key)) is not None:
+        return stale[0]
+
+    try:
+        value = compute()
+        # Em uma tupla, para que um resultado None também fique em cache
+        cache.set(key, (value,), timeout)
+        cache.set(stale_key, (value,), SEARCH_STALE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def _day_start(value):
+    """Início do dia ``value`` no fuso horário atual, como datetime aware."""
+    return timezone.make_aware(datetime.combine(value, datetime.min.time()))
+
+
+def _parse_date(value):
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+
+def _seconds(duracao):
+    return duracao.total_seconds() if duracao is not None else None
+
+
+class AuditQuery(abc.ABC):
+    """
+    Filtros, página e total de uma aba da auditoria.
+
+    ``name`` compõe as chaves de cache da aba; ``filter_params`` são os nomes
+    dos parâmetros de filtro e ``context_names`` os nomes com que cada um é
+    exposto aos templates. As subclasses definem os três e ``get_queryset``.
+    """
+
+    name: ClassVar[str]
+    filter_params: ClassVar[tuple[str, ...]]
+    context_names: ClassVar[dict[str, str]]
+    page_size: ClassVar[int] = AUDIT_PAGE_SIZE
+
+    def __init__(self, params):
+        self.filters: dict[str, str] = {
+            param: params.get(param, "").strip() for param in self.filter_params
+        }
+
+    @property
+    def has_filters(self):
+        return any(self.filters.values())
+
+    @cached_property
+    def signature(self):
+        filtros = urlencode(sorted(self.filters.items()))
+        return hashlib.md5(filtros.encode(), usedforsecurity=False).hexdigest()
+
+    def cache_key(self, *parts):
+        return ":".join(["auditoria", self.name, self.signature, *map(str, parts)])
+
+    @abc.abstractmethod
+    def get_queryset(self):
+        """Registros da aba, já com os filtros aplicados."""
+
+    def count(self):
+        return single_flight(
+            self.cache_key("total"),
+            AUDIT_COUNT_CACHE_TIMEOUT,
+            self.get_queryset().count,
+        )
+
+    def get_context(self):
+        return {
+            self.context_names[param]: value for param, value in self.filters.items()
+        }
+
+
+class UserQuery(AuditQuery):
+    name = "usuarios"
+    filter_params = ("search",)
+    context_names = {"search": "search_term"}
+
+    def get_queryset(self):
+        search_term = self.filters["search"]
+        users_list = User.objects.all()
+        if search_term:
+            users_list = users_list.filter(
+                Q(name__icontains=search_term) | Q(email__icontains=search_term),
+            )
+        return users_list.order_by("-date_joined")
+
+    def page(self, page_number):
+        paginator = Paginator(self.get_queryset(), self.page_size)
+        # O Paginator guarda o total em uma cached_property
+        paginator.count = self.count()
+        users = paginator.get_page(page_number)
+        # Permissões da página inteira em duas consultas, para os badges
+        users.object_list = User.objects.prefetch_permissions(users.object_list)
+        return users
+
+
+class ArchivedAuditQuery(AuditQuery):
+    """
+    Abas de registros com período e arquivamento (``ArchivedEntries``).
+
+    O período filtra intervalos sobre o campo de data (``>=`` início do
+    primeiro dia e ``<`` início do dia seguinte ao último) em vez de
+    ``__date``, para que o PostgreSQL use os índices e descarte as partições
+    mensais fora do intervalo.
+    """
+
+    fonte: ClassVar[str]
+    date_field: ClassVar[str]
+
+    @cached_property
+    def period(self):
+        inicio = fim = None
+        if parsed_date_from := _parse_date(self.filters["date_from"]):
+            inicio = _day_start(parsed_date_from)
+        if parsed_date_to := _parse_date(self.filters["date_to"]):
+            fim = _day_start(parsed_date_to + timedelta(days=1))
+        return inicio, fim
+
+    def filter_period(self, queryset):
+        inicio, fim = self.period
+        if inicio:
+            queryset = queryset.filter(**{f"{self.date_field}__gte": inicio})
+        if fim:
+            queryset = queryset.filter(**{f"{self.date_field}__lt": fim})
+        return queryset
+
+    def get_archive_key(self) -> Callable[[str], bool] | None:
+        """Função que filtra a chave de busca dos arquivados, ou ``None``."""
+        return None
+
+    def get_archive(self):
+        inicio, fim = self.period
+        return ArchivedEntries(
+            self.fonte,
+            inicio=inicio,
+            fim=fim,
+            chave=self.get_archive_key(),
+        )
+
+    def count(self):
+        """
+        Total da tabela mais o dos arquivados. Os arquivados são contados pelos
+        manifestos, sem abrir os arquivos, e por isso ficam fora do
+        ``single_flight``.
+        """
+        arquivados = cache.get_or_set(
+            self.cache_key("arquivados"),
+            self.get_archive().count,
+            AUDIT_COUNT_CACHE_TIMEOUT,
+        )
+        return super().count() + arquivados
+
+    def page(self, after=None, before=None):
+        """Página pelos cursores ``after``/``before``, emendando os arquivados."""
+        paginator = ArchiveKeysetPaginator(
+            self.get_queryset(),
+            self.page_size,
+            self.get_archive(),
+            date_field=self.date_field,
+        )
+
+        return paginator.page(after=after, before=before)
+
+
+class LogEntryQuery(ArchivedAuditQuery):
+    name = "logs"
+    fonte = ArquivoAuditoria.FONTE_LOG_ENTRY
+    date_field = "timestamp"
+    filter_params = ("actor", "date_from", "date_to")
+    context_names = {
+        "actor": "actor_search",
+        "date_from": "date_from",
+        "date_to": "date_to",
+    }
+
+    @cached_property
+    def actors(self):
+        """Usuários da busca por nome ou e-mail, como subconsulta."""
+        actor_search = self.filters["actor"]
+        return User.objects.filter(
+            Q(name__icontains=actor_search) | Q(email__icontains=actor_search),
+        ).values("id")
+
+    def get_queryset(self):
+        log_entries_list = LogEntry.objects.select_related("actor", "content_type")
+        # O usuário é resolvido em uma subconsulta, sem JOIN com a auditoria
+        if self.filters["actor"]:
+            log_entries_list = log_entries_list.filter(actor_id__in=self.actors)
+        return self.filter_period(log_entries_list)
+
+    def get_archive_key(self):
+        if not self.filters["actor"]:
+            return None
+        return {str(actor["id"]) for actor in self.actors}.__contains__
+
+    def page(self, after=None, before=None):
+        log_entries = super().page(after=after, before=before)
+        # Os arquivados não vêm do select_related
+        prefetch_related_objects(
+            [log for log in log_entries if getattr(log, "arquivado", False)],
+            "actor",
+            "content_type",
+        )
+        return log_entries
+
+
+class AccessLogQuery(ArchivedAuditQuery):
+    name = "acessos"
+    fonte = ArquivoAuditoria.FONTE_ACCESS_LOG
+    date_field = "attempt_time"
+    filter_params = ("username", "date_from", "date_to")
+    context_names = {
+        "username": "username_search",
+        "date_from": "date_from",
+        "date_to": "date_to",
+    }
+
+    def get_queryset(self):
+        access_logs_list = AccessLog.objects.all()
+        if username_search := self.filters["username"]:
+            access_logs_list = access_logs_list.filter(
+                username__icontains=username_search,
+            )
+        return self.filter_period(access_logs_list)
+
+    def get_archive_key(self):
+        if not self.filters["username"]:
+            return None
+        termo = self.filters["username"].casefold()
+        return lambda username: termo in username.casefold()
+
+
+class DesempenhoQuery(AuditQuery):
+    """
+    Percentis dos tempos de cada etapa do processamento das requisições
+    concluídas no período, por dia ou por unidade do usuário (ver
+    ``RequisicaoBacenQuerySet.etapas_percentis``).
+    """
+
+    name = "desempenho"
+    filter_params = ("date_from", "date_to", "agrupamento")
+    context_names = {
+        "date_from": "date_from",
+        "date_to": "date_to",
+        "agrupamento": "agrupamento",
+    }
+    agrupamentos = {
+        "dia": TruncDate("persistida_em"),
+        "unidade": Coalesce(
+            NullIf("user__department__abbreviation", Value("")),
+            NullIf("user__department__name", Value("")),
+            Value("Sem unidade"),
+        ),
+    }
+
+    @property
+    def agrupamento(self):
+        agrupamento = self.filters["agrupamento"]
+        return agrupamento if agrupamento in self.agrupamentos else "dia"
+
+    @cached_property
+    def period(self):
+        """Dias inteiros do período; por padrão, os últimos dias até hoje."""
+        fim = _parse_date(self.filters["date_to"]) or timezone.localdate()
+        inicio = _parse_date(self.filters["date_from"]) or fim - timedelta(
+            days=DESEMPENHO_DIAS_PADRAO - 1,
+        )
+        return _day_start(inicio), _day_start(fim + timedelta(days=1))
+
+    def get_queryset(self):
+        inicio, fim = self.period
+        return RequisicaoBacen.objects.filter(
+            persistida_em__gte=inicio,
+            persistida_em__lt=fim,
+        ).etapas_percentis(
+            self.agrupamentos[self.agrupamento],
+            percentis=DESEMPENHO_PERCENTIS,
+        )
+
+    def rows(self):
+        """Uma linha por grupo, com os percentis de cada etapa em segundos."""
+
+        def compute():
+            return [
+                {
+                    "grupo": linha["grupo"],
+                    "requisicoes": linha["requisicoes"],
+                    "etapas": [
+                        [
+                            _seconds(linha[f"{etapa}_p{percentil}"])
+                            for percentil in DESEMPENHO_PERCENTIS
+                        ]
+                        for etapa in ETAPAS_PROCESSAMENTO
+                    ],
+                }
+                for linha in self.get_queryset()
+            ]
+
+        return single_flight(
+            self.cache_key("linhas", self.agrupamento),
+            DESEMPENHO_CACHE_TIMEOUT,
+            compute,
+        )
+
+    def get_context(self):
+        inicio, fim = self.period
+        return {
+            **super().get_context(),
+            "date_from": inicio.date().isoformat(),
+            "date_to": (fim - timedelta(days=1)).date().isoformat(),
+            "agrupamento": self.agrupamento,
+        }
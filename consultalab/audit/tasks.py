@@ -0,0 +1,16 @@
+from celery import shared_task
+
+from consultalab.audit.archive import archive_audit_logs
+from consultalab.audit.partitions import ensure_log_entry_partitions
+
+
+@shared_task()
+def ensure_log_entry_partitions_task():
+    """Cria as partições de auditoria do mês atual e dos próximos meses."""
+    return ensure_log_entry_partitions()
+
+
+@shared_task()
+def archive_audit_logs_task():
+    """Arquiva os registros de auditoria e de acesso fora da retenção."""
+    return [arquivo.arquivo.name for arquivo in archive_audit_logs()]
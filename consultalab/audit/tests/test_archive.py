@@ -0,0 +1,255 @@
+import gzip
+import hashlib
+import json
+from datetime import UTC
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from auditlog.models import LogEntry
+from axes.models import AccessLog
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from consultalab.audit.archive import ArchivedEntries
+from consultalab.audit.archive import ArchiveKeysetPaginator
+from consultalab.audit.archive import archive_audit_logs
+from consultalab.audit.archive import archive_month
+from consultalab.audit.archive import read_archive
+from consultalab.audit.models import ArquivoAuditoria
+from consultalab.audit.partitions import ensure_log_entry_partitions
+from consultalab.audit.partitions import partition_name
+from consultalab.audit.services import AccessLogQuery
+from consultalab.audit.views import LogEntryDetailView
+from consultalab.users.models import User
+from consultalab.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+ARCHIVED_MONTH = date(2020, 1, 1)
+ARCHIVED_ENTRIES = 3
+PER_PAGE = 2
+
+
+def _log_entry(actor, timestamp):
+    return LogEntry.objects.create(
+        content_type=ContentType.objects.get_for_model(User),
+        object_pk=str(actor.pk),
+        object_repr=str(actor),
+        action=LogEntry.Action.UPDATE,
+        actor=actor,
+        timestamp=timestamp,
+    )
+
+
+def _access_log(username, attempt_time):
+    access_log = AccessLog.objects.create(
+        username=username,
+        ip_address="127.0.0.1",
+        user_agent="pytest",
+        http_accept="*/*",
+        path_info="/contas/login/",
+    )
+    # attempt_time é auto_now_add
+    AccessLog.objects.filter(id=access_log.id).update(attempt_time=attempt_time)
+    access_log.refresh_from_db()
+    return access_log
+
+
+@pytest.fixture
+def archived_entries(user: User):
+    ensure_log_entry_partitions(months_ahead=0, reference=ARCHIVED_MONTH)
+    inicio = datetime(2020, 1, 10, tzinfo=UTC)
+    return [
+        _log_entry(user, inicio + timedelta(days=i)) for i in range(ARCHIVED_ENTRIES)
+    ]
+
+
+def test_archive_month_moves_rows_to_file(archived_entries, user: User):
+    arquivo = archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+
+    assert not LogEntry.objects.filter(id__in=[e.id for e in archived_entries])
+    assert arquivo.registros == ARCHIVED_ENTRIES
+    assert arquivo.inicio == archived_entries[0].timestamp
+    assert arquivo.fim == archived_entries[-1].timestamp
+    assert arquivo.chaves == {
+        str(user.id): {f"2020-01-{dia}": 1 for dia in ("09", "10", "11")},
+    }
+    assert sum(arquivo.dias.values()) == ARCHIVED_ENTRIES
+    assert arquivo.blocos.keys() == arquivo.dias.keys()
+
+    with arquivo.arquivo.open("rb") as f:
+        conteudo = f.read()
+    assert hashlib.sha256(conteudo).hexdigest() == arquivo.sha256
+    linhas = gzip.decompress(conteudo).splitlines()
+    assert [json.loads(linha)["id"] for linha in linhas] == [
+        e.id for e in archived_entries
+    ]
+
+    # A partição do mês, agora vazia, é removida
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [partition_name(ARCHIVED_MONTH)])
+        assert cursor.fetchone()[0] is None
+
+
+def test_read_archive_rebuilds_instances(archived_entries, user: User):
+    arquivo = archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+
+    objetos = list(read_archive(arquivo))
+
+    assert [obj.id for obj in objetos] == [e.id for e in archived_entries]
+    assert all(obj.arquivado for obj in objetos)
+    assert objetos[0].timestamp == archived_entries[0].timestamp
+    assert objetos[0].actor == user
+    assert objetos[0].changes_dict == archived_entries[0].changes_dict
+
+
+def test_archive_is_append_only(archived_entries, user: User):
+    primeiro = archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+    atrasado = _log_entry(user, datetime(2020, 1, 20, tzinfo=UTC))
+
+    segundo = archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+
+    assert (primeiro.parte, segundo.parte) == (1, 2)
+    assert segundo.arquivo.name != primeiro.arquivo.name
+    assert [obj.id for obj in read_archive(segundo)] == [atrasado.id]
+    assert archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH) is None
+
+
+def test_archive_audit_logs_respects_retention(settings, user: User):
+    settings.AUDIT_LOG_RETENTION_DAYS = 90
+    agora = timezone.now()
+    antigo = _log_entry(user, agora - timedelta(days=200))
+    recente = _log_entry(user, agora - timedelta(days=10))
+    acesso_antigo = _access_log(user.email, agora - timedelta(days=200))
+
+    arquivos = archive_audit_logs()
+
+    assert {a.fonte for a in arquivos} == {
+        ArquivoAuditoria.FONTE_LOG_ENTRY,
+        ArquivoAuditoria.FONTE_ACCESS_LOG,
+    }
+    assert list(LogEntry.objects.filter(id__in=[antigo.id, recente.id])) == [recente]
+    assert not AccessLog.objects.filter(id=acesso_antigo.id).exists()
+
+
+def test_paginator_continues_into_archive(archived_entries, user: User):
+    archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+    agora = timezone.now()
+    recentes = [_log_entry(user, agora - timedelta(minutes=i)) for i in range(3)]
+    esperado = [e.id for e in recentes] + [e.id for e in reversed(archived_entries)]
+
+    paginator = ArchiveKeysetPaginator(
+        LogEntry.objects.all(),
+        PER_PAGE,
+        ArchivedEntries(ArquivoAuditoria.FONTE_LOG_ENTRY),
+        date_field="timestamp",
+    )
+    pages = [paginator.page()]
+    while pages[-1].has_next:
+        pages.append(paginator.page(after=pages[-1].next_cursor))
+
+    assert [obj.id for page in pages for obj in page] == esperado
+    assert [len(page) for page in pages] == [2, 2, 2]
+
+    # Voltando a partir das páginas só com arquivados
+    anterior = paginator.page(before=pages[-1].previous_cursor)
+    assert [obj.id for obj in anterior] == esperado[2:4]
+    assert anterior.has_previous
+    primeira = paginator.page(before=anterior.previous_cursor)
+    assert [obj.id for obj in primeira] == esperado[:2]
+    assert not primeira.has_previous
+
+
+def test_archived_entries_read_only_needed_days(archived_entries, user: User):
+    arquivo = archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+    # Corrompe o membro do dia mais antigo: as páginas que não chegam a ele
+    # não podem lê-lo
+    posicao, tamanho = arquivo.blocos[min(arquivo.blocos)]
+    with arquivo.arquivo.open("r+b") as f:
+        f.seek(posicao)
+        f.write(b"\0" * tamanho)
+    entries = ArchivedEntries(ArquivoAuditoria.FONTE_LOG_ENTRY)
+    mais_novo, meio, _ = reversed(archived_entries)
+
+    assert [obj.id for obj in entries.after(None, 2)] == [mais_novo.id, meio.id]
+    cursor = (meio.timestamp, meio.id)
+    assert [obj.id for obj in entries.before(cursor, 10)] == [mais_novo.id]
+    with pytest.raises(gzip.BadGzipFile):
+        entries.after(cursor, 1)
+
+
+def test_archived_entries_filters(archived_entries, user: User):
+    outro = UserFactory()
+    _log_entry(outro, datetime(2020, 1, 11, 12, tzinfo=UTC))
+    archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+
+    por_usuario = ArchivedEntries(
+        ArquivoAuditoria.FONTE_LOG_ENTRY,
+        chave={str(user.id)}.__contains__,
+    )
+    por_periodo = ArchivedEntries(
+        ArquivoAuditoria.FONTE_LOG_ENTRY,
+        inicio=datetime(2020, 1, 11, tzinfo=UTC),
+        fim=datetime(2020, 1, 12, tzinfo=UTC),
+    )
+    sem_resultado = ArchivedEntries(
+        ArquivoAuditoria.FONTE_LOG_ENTRY,
+        chave={"0"}.__contains__,
+    )
+
+    assert [obj.actor_id for obj in por_usuario.after(None, 10)] == [user.id] * 3
+    assert len(por_periodo.after(None, 10)) == 2  # noqa: PLR2004
+    assert sem_resultado.after(None, 10) == []
+
+
+def test_archived_entries_count_uses_manifest(archived_entries, user: User):
+    outro = UserFactory()
+    _log_entry(outro, datetime(2020, 1, 11, 12, tzinfo=UTC))
+    arquivo = archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+    # Os totais não abrem os arquivos
+    arquivo.arquivo.delete(save=False)
+
+    por_usuario = ArchivedEntries(
+        ArquivoAuditoria.FONTE_LOG_ENTRY,
+        chave={str(user.id)}.__contains__,
+    )
+    por_periodo = ArchivedEntries(
+        ArquivoAuditoria.FONTE_LOG_ENTRY,
+        inicio=timezone.make_aware(datetime(2020, 1, 11)),  # noqa: DTZ001
+        fim=timezone.make_aware(datetime(2020, 1, 12)),  # noqa: DTZ001
+        chave={str(outro.id)}.__contains__,
+    )
+
+    assert ArchivedEntries(ArquivoAuditoria.FONTE_LOG_ENTRY).count() == 4  # noqa: PLR2004
+    assert por_usuario.count() == ARCHIVED_ENTRIES
+    assert por_periodo.count() == 1
+
+
+def test_access_logs_search_reaches_archive(user: User):
+    arquivado = _access_log("Fulano@Example.com", datetime(2020, 1, 5, tzinfo=UTC))
+    _access_log("outro@example.com", datetime(2020, 1, 6, tzinfo=UTC))
+    arquivo = archive_month(ArquivoAuditoria.FONTE_ACCESS_LOG, ARCHIVED_MONTH)
+
+    query = AccessLogQuery(
+        {"username": "fulano", "date_from": "2020-01-01", "date_to": "2020-01-31"},
+    )
+
+    assert not query.get_queryset().exists()
+    assert [obj.id for obj in query.page()] == [arquivado.id]
+    # O total dos arquivados vem do manifesto
+    arquivo.arquivo.delete(save=False)
+    assert query.count() == 1
+
+
+def test_detail_view_reads_archived_entry(archived_entries, rf: RequestFactory):
+    archive_month(ArquivoAuditoria.FONTE_LOG_ENTRY, ARCHIVED_MONTH)
+
+    request = rf.get("/")
+    request.user = UserFactory(is_superuser=True)
+    response = LogEntryDetailView.as_view()(request, log_id=archived_entries[1].id)
+
+    assert "Detalhes" in response.content.decode()
@@ -0,0 +1,76 @@
+from datetime import UTC
+from datetime import date
+from datetime import datetime
+
+import pytest
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+
+from consultalab.audit.partitions import LOG_ENTRY_TABLE
+from consultalab.audit.partitions import PARTITION_MONTHS_AHEAD
+from consultalab.audit.partitions import add_months
+from consultalab.audit.partitions import ensure_log_entry_partitions
+from consultalab.audit.partitions import month_bounds
+from consultalab.audit.partitions import partition_name
+from consultalab.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+FUTURE_MONTH = date(2100, 11, 1)
+
+
+def _partition_of(log_entry):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT tableoid::regclass::text FROM "{LOG_ENTRY_TABLE}" WHERE id = %s',  # noqa: S608
+            [log_entry.id],
+        )
+        return cursor.fetchone()[0]
+
+
+def test_add_months_wraps_year():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_month_bounds_are_utc():
+    assert month_bounds(date(2024, 2, 15)) == (
+        datetime(2024, 2, 1, tzinfo=UTC),
+        datetime(2024, 3, 1, tzinfo=UTC),
+    )
+
+
+def test_log_entry_table_is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE relname = %s",
+            [LOG_ENTRY_TABLE],
+        )
+        assert cursor.fetchone()[0] == "p"
+
+
+def test_ensure_partitions_is_idempotent():
+    created = ensure_log_entry_partitions(reference=FUTURE_MONTH)
+
+    assert created == [
+        partition_name(add_months(FUTURE_MONTH, offset))
+        for offset in range(PARTITION_MONTHS_AHEAD + 1)
+    ]
+    assert ensure_log_entry_partitions(reference=FUTURE_MONTH) == []
+
+
+def test_log_entry_is_routed_to_its_month(user: User):
+    ensure_log_entry_partitions(months_ahead=0, reference=FUTURE_MONTH)
+
+    log_entry = LogEntry.objects.create(
+        content_type=ContentType.objects.get_for_model(User),
+        object_pk=str(user.pk),
+        object_repr=str(user),
+        action=LogEntry.Action.UPDATE,
+        actor=user,
+        timestamp=datetime(2100, 11, 30, 23, 59, tzinfo=UTC),
+    )
+
+    assert _partition_of(log_entry) == partition_name(FUTURE_MONTH)
+    assert LogEntry.objects.get(id=log_entry.id).actor == user
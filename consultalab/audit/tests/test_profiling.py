@@ -0,0 +1,104 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from consultalab.audit.models import PerfilRequisicao
+from consultalab.audit.profiling import prune_profiles
+from consultalab.audit.profiling import render_flamegraph
+from consultalab.audit.views import PerfilDetailView
+from consultalab.audit.views import PerfilFlamegraphView
+from consultalab.audit.views import PerfisView
+from consultalab.core.custom_middlewares import RequestProfilerMiddleware
+from consultalab.users.models import User
+from consultalab.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+PERFIS_MANTIDOS = 2
+
+
+def slow_view(request):
+    # Uma consulta e algum trabalho em Python para aparecer nas amostras
+    User.objects.count()
+    sum(i * i for i in range(100_000))
+    return HttpResponse("ok")
+
+
+@pytest.fixture
+def admin_user():
+    return UserFactory(is_superuser=True)
+
+
+@pytest.fixture
+def perfil(admin_user, rf: RequestFactory) -> PerfilRequisicao:
+    request = rf.get("/requisicoes/", {"_perfil": "1"})
+    request.user = admin_user
+    RequestProfilerMiddleware(slow_view)(request)
+    return PerfilRequisicao.objects.get()
+
+
+def test_profile_requested_by_header(admin_user, rf: RequestFactory):
+    request = rf.get("/requisicoes/", headers={"X-Profile": "1"})
+    request.user = admin_user
+
+    response = RequestProfilerMiddleware(slow_view)(request)
+
+    perfil = PerfilRequisicao.objects.get()
+    assert response["X-Profile-Id"] == str(perfil.id)
+    assert perfil.user == admin_user
+    assert perfil.metodo == "GET"
+    assert perfil.caminho == "/requisicoes/"
+    assert perfil.status_code == HTTPStatus.OK
+    assert perfil.duracao >= perfil.tempo_consultas > 0
+    assert [consulta["sql"] for consulta in perfil.consultas] == [
+        'SELECT COUNT(*) AS "__count" FROM "users_user"',
+    ]
+
+
+@pytest.mark.parametrize("usuario", ["anonimo", "sem_permissao"])
+def test_profile_requires_admin_permission(rf: RequestFactory, usuario):
+    request = rf.get("/", {"_perfil": "1"})
+    request.user = AnonymousUser() if usuario == "anonimo" else UserFactory()
+
+    response = RequestProfilerMiddleware(slow_view)(request)
+
+    assert "X-Profile-Id" not in response
+    assert not PerfilRequisicao.objects.exists()
+
+
+def test_render_flamegraph(perfil):
+    html = render_flamegraph(perfil)
+
+    assert html.startswith("<!DOCTYPE html>")
+    assert "slow_view" in html
+
+
+def test_prune_profiles(admin_user, rf: RequestFactory):
+    for _ in range(PERFIS_MANTIDOS + 1):
+        request = rf.get("/", {"_perfil": "1"})
+        request.user = admin_user
+        RequestProfilerMiddleware(slow_view)(request)
+    mais_recentes = list(PerfilRequisicao.objects.order_by("-created", "-id"))[:2]
+    removido = PerfilRequisicao.objects.order_by("created", "id").first()
+
+    prune_profiles(keep=PERFIS_MANTIDOS)
+
+    assert list(PerfilRequisicao.objects.order_by("-created", "-id")) == mais_recentes
+    assert not removido.arquivo.storage.exists(removido.arquivo.name)
+
+
+def test_perfis_views(perfil, admin_user, rf: RequestFactory):
+    request = rf.get("/")
+    request.user = admin_user
+
+    lista = PerfisView.as_view()(request).content.decode()
+    detalhe = PerfilDetailView.as_view()(request, perfil_id=perfil.id)
+    flamegraph = PerfilFlamegraphView.as_view()(request, perfil_id=perfil.id)
+
+    assert "GET /requisicoes/?_perfil=1" in lista
+    assert "users_user" in detalhe.content.decode()
+    assert flamegraph.status_code == HTTPStatus.OK
+    assert flamegraph["X-Frame-Options"] == "SAMEORIGIN"
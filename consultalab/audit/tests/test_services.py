@@ -0,0 +1,201 @@
+from datetime import datetime
+from datetime import timedelta
+from unittest.mock import Mock
+
+import pytest
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from consultalab.audit.partitions import ensure_log_entry_partitions
+from consultalab.audit.partitions import partition_name
+from consultalab.audit.services import AccessLogQuery
+from consultalab.audit.services import DesempenhoQuery
+from consultalab.audit.services import LogEntryQuery
+from consultalab.audit.services import UserQuery
+from consultalab.audit.services import single_flight
+from consultalab.bacen.tests.factories import RequisicaoBacenFactory
+from consultalab.users.models import Department
+from consultalab.users.models import User
+from consultalab.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+TOTAL_LOG_ENTRIES = 3
+USER_PAGE_QUERIES = 3
+TEMPOS_CONSULTA = (1, 2, 3, 4, 5)
+
+
+def _log_entry(actor, timestamp):
+    return LogEntry.objects.create(
+        content_type=ContentType.objects.get_for_model(User),
+        object_pk=str(actor.pk),
+        object_repr=str(actor),
+        action=LogEntry.Action.UPDATE,
+        actor=actor,
+        timestamp=timestamp,
+    )
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+
+
+def test_filter_by_local_day_includes_the_whole_last_day(user: User):
+    # 23h30 no fuso local já é o dia seguinte em UTC
+    fim_do_dia = datetime(2024, 3, 10, 23, 30, tzinfo=timezone.get_current_timezone())
+    dentro = _log_entry(user, fim_do_dia)
+    _log_entry(user, fim_do_dia + timedelta(hours=1))
+    _log_entry(user, fim_do_dia - timedelta(days=1))
+
+    resultado = LogEntryQuery(
+        {"date_from": "2024-03-10", "date_to": "2024-03-10"},
+    ).get_queryset()
+
+    assert list(resultado) == [dentro]
+
+
+def test_filter_by_actor(user: User):
+    esperado = _log_entry(user, timezone.now())
+    _log_entry(UserFactory(), timezone.now())
+
+    resultado = LogEntryQuery({"actor": user.email.upper()}).get_queryset()
+
+    assert list(resultado) == [esperado]
+
+
+def test_invalid_dates_are_ignored(user: User):
+    _log_entry(user, timezone.now())
+
+    resultado = LogEntryQuery(
+        {"date_from": "2024-02-31", "date_to": "ontem"},
+    ).get_queryset()
+
+    assert resultado.count() == 1
+
+
+def test_date_range_prunes_partitions(user: User):
+    mes = timezone.now().date().replace(day=1)
+    ensure_log_entry_partitions(months_ahead=0, reference=mes)
+    _log_entry(user, timezone.now())
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    hoje = timezone.localdate().isoformat()
+    resultado = LogEntryQuery({"date_from": hoje, "date_to": hoje}).get_queryset()
+    plano = resultado.explain()
+
+    assert partition_name(mes) in plano
+    assert "_default" not in plano
+
+
+def test_same_filters_share_signature():
+    assert LogEntryQuery({"actor": " a ", "after": "x"}).signature == (
+        LogEntryQuery({"actor": "a"}).signature
+    )
+    assert LogEntryQuery({"actor": "a"}).signature != (
+        AccessLogQuery({"username": "a"}).signature
+    )
+
+
+def test_count_is_cached(user: User, django_assert_num_queries):
+    for _ in range(TOTAL_LOG_ENTRIES):
+        _log_entry(user, timezone.now())
+
+    assert LogEntryQuery({}).count() == TOTAL_LOG_ENTRIES
+    _log_entry(user, timezone.now())
+
+    # Mesmo filtro: o total vem do cache, sem consultas
+    with django_assert_num_queries(0):
+        assert LogEntryQuery({}).count() == TOTAL_LOG_ENTRIES
+
+
+def test_user_query_page_uses_cached_count(user: User, django_assert_num_queries):
+    UserFactory.create_batch(TOTAL_LOG_ENTRIES - 1)
+    UserQuery({}).count()
+
+    # Página e permissões dos usuários, sem COUNT
+    with django_assert_num_queries(USER_PAGE_QUERIES):
+        page = UserQuery({}).page(1)
+        assert page.paginator.count == TOTAL_LOG_ENTRIES
+        assert len(page) == TOTAL_LOG_ENTRIES
+
+
+def test_single_flight_caches_none():
+    compute = Mock(return_value=None)
+
+    assert single_flight("chave", 10, compute) is None
+    assert single_flight("chave", 10, compute) is None
+    compute.assert_called_once()
+
+
+def test_single_flight_serves_stale_value_during_recompute():
+    # Outra requisição já está recalculando o valor vencido
+    cache.set("chave:anterior", (42,))
+    cache.add("chave:trava", 1)
+    compute = Mock(return_value=0)
+
+    assert single_flight("chave", 10, compute) == 42  # noqa: PLR2004
+    compute.assert_not_called()
+
+
+def test_single_flight_computes_without_waiting():
+    cache.add("chave:trava", 1)
+    compute = Mock(return_value=7)
+
+    assert single_flight("chave", 10, compute) == 7  # noqa: PLR2004
+    # A trava de outra requisição não é removida
+    assert cache.get("chave:trava") == 1
+    assert cache.get("chave:anterior") == (7,)
+
+
+def _requisicao_processada(user, persistida_em, consulta):
+    enfileirada_em = persistida_em - timedelta(seconds=consulta + 2)
+    iniciada_em = enfileirada_em + timedelta(seconds=1)
+    consulta_concluida_em = iniciada_em + timedelta(seconds=consulta)
+    return RequisicaoBacenFactory(
+        user=user,
+        enfileirada_em=enfileirada_em,
+        iniciada_em=iniciada_em,
+        consulta_concluida_em=consulta_concluida_em,
+        participantes_resolvidos_em=consulta_concluida_em,
+        persistida_em=persistida_em,
+    )
+
+
+def test_desempenho_percentiles_by_department(user: User):
+    user.department = Department.objects.create(name="Delegacia", abbreviation="DL")
+    user.save()
+    agora = timezone.now()
+    for consulta in TEMPOS_CONSULTA:
+        _requisicao_processada(user, agora, consulta)
+    # Fora do período padrão e ainda não concluída
+    _requisicao_processada(user, agora - timedelta(days=30), consulta=60)
+    RequisicaoBacenFactory(user=user, enfileirada_em=agora)
+
+    (linha,) = DesempenhoQuery({"agrupamento": "unidade"}).rows()
+
+    fila, consulta, participantes, persistencia, total = linha["etapas"]
+    assert linha["grupo"] == "DL"
+    assert linha["requisicoes"] == len(TEMPOS_CONSULTA)
+    assert fila == [1, 1]
+    assert consulta == [3, pytest.approx(4.8)]
+    assert participantes == [0, 0]
+    assert persistencia == [1, 1]
+    assert total[0] == 3 + 2
+
+
+def test_desempenho_groups_by_day(user: User):
+    ontem = timezone.now() - timedelta(days=1)
+    _requisicao_processada(user, ontem, consulta=1)
+    _requisicao_processada(user, timezone.now(), consulta=1)
+
+    linhas = DesempenhoQuery({}).rows()
+
+    assert [linha["grupo"] for linha in linhas] == [
+        timezone.localdate(ontem),
+        timezone.localdate(),
+    ]
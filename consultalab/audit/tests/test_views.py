@@ -0,0 +1,186 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from auditlog.models import LogEntry
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.utils import timezone
+
+from consultalab.audit.services import AUDIT_PAGE_SIZE
+from consultalab.audit.services import LogEntryQuery
+from consultalab.audit.views import AccessLogsSearchView
+from consultalab.audit.views import AccessLogsView
+from consultalab.audit.views import DesempenhoView
+from consultalab.audit.views import LogEntriesSearchView
+from consultalab.audit.views import LogEntriesView
+from consultalab.audit.views import UsersSearchView
+from consultalab.audit.views import UsersView
+from consultalab.core.query_budget import assert_query_budget
+from consultalab.users.models import User
+from consultalab.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+TOTAL_LOG_ENTRIES = AUDIT_PAGE_SIZE + 3
+USERS_VIEW_QUERIES = 4
+
+
+def _log_entry(actor, timestamp):
+    return LogEntry.objects.create(
+        content_type=ContentType.objects.get_for_model(User),
+        object_pk=str(actor.pk),
+        object_repr=str(actor),
+        action=LogEntry.Action.UPDATE,
+        actor=actor,
+        timestamp=timestamp,
+    )
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def admin_user():
+    return UserFactory(is_superuser=True)
+
+
+def test_keyset_pages(admin_user, rf: RequestFactory):
+    agora = timezone.now()
+    entries = [
+        _log_entry(admin_user, agora - timedelta(minutes=i))
+        for i in range(TOTAL_LOG_ENTRIES)
+    ]
+
+    primeira = LogEntryQuery({}).page()
+    segunda = LogEntryQuery({}).page(after=primeira.next_cursor)
+
+    assert list(primeira) == entries[:AUDIT_PAGE_SIZE]
+    assert list(segunda) == entries[AUDIT_PAGE_SIZE:]
+    assert not segunda.has_next
+
+    request = rf.get("/", {"after": primeira.next_cursor})
+    request.user = admin_user
+    request.headers = {"HX-Request": "true"}
+    response = LogEntriesView.as_view()(request)
+    content = response.content.decode()
+
+    # Apenas a tabela, com o link para a página anterior
+    assert 'id="actor-search"' not in content
+    assert f"before={segunda.previous_cursor}" in content
+
+
+def test_search_view_renders_table(admin_user, rf: RequestFactory):
+    _log_entry(admin_user, timezone.now())
+
+    request = rf.post("/", {"actor": admin_user.email})
+    request.user = admin_user
+    response = LogEntriesSearchView.as_view()(request)
+
+    assert str(admin_user) in response.content.decode()
+
+
+def test_log_entries_total(admin_user, rf: RequestFactory):
+    for _ in range(TOTAL_LOG_ENTRIES):
+        _log_entry(admin_user, timezone.now())
+
+    request = rf.get("/")
+    request.user = admin_user
+    response = LogEntriesView.as_view()(request)
+
+    assert f"de {TOTAL_LOG_ENTRIES} entradas" in response.content.decode()
+
+
+def test_users_search_view(admin_user, rf: RequestFactory):
+    outro = UserFactory()
+
+    request = rf.post("/", {"search": outro.email})
+    request.user = admin_user
+    response = UsersSearchView.as_view()(request)
+    content = response.content.decode()
+
+    assert outro.email in content
+    assert admin_user.email not in content
+
+
+def test_users_view_rejects_post(admin_user, rf: RequestFactory):
+    request = rf.post("/")
+    request.user = admin_user
+
+    assert UsersView.as_view()(request).status_code == HTTPStatus.METHOD_NOT_ALLOWED
+
+
+def test_access_logs_search_view(admin_user, rf: RequestFactory):
+    request = rf.post("/", {"username": "ninguem"})
+    request.user = admin_user
+    response = AccessLogsSearchView.as_view()(request)
+
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize("total_users", [1, AUDIT_PAGE_SIZE - 1])
+def test_users_view_queries_do_not_grow_with_rows(
+    admin_user,
+    rf: RequestFactory,
+    django_assert_num_queries,
+    total_users,
+):
+    grupo = Group.objects.create(name="Administração")
+    grupo.permissions.add(Permission.objects.get(codename="access_admin_section"))
+    for user in UserFactory.create_batch(total_users):
+        user.groups.add(grupo)
+
+    request = rf.get("/")
+    request.user = admin_user
+    # Total, página e as duas consultas de permissões
+    with django_assert_num_queries(USERS_VIEW_QUERIES):
+        response = UsersView.as_view()(request)
+
+    # O superusuário da requisição também aparece na lista
+    assert response.content.decode().count(">admin</span>") == total_users + 1
+
+
+def test_desempenho_view(admin_user, rf: RequestFactory):
+    request = rf.get("/", {"agrupamento": "unidade"})
+    request.user = admin_user
+    request.headers = {"HX-Request": "true"}
+    response = DesempenhoView.as_view()(request)
+    content = response.content.decode()
+
+    # Apenas a tabela, agrupada por unidade
+    assert response.status_code == HTTPStatus.OK
+    assert 'id="desempenho-agrupamento"' not in content
+    assert "Unidade" in content
+    assert "Nenhuma requisição concluída no período." in content
+
+
+@pytest.mark.parametrize(
+    ("view", "params"),
+    [
+        (UsersView, {}),
+        (LogEntriesView, {}),
+        (LogEntriesView, {"actor": "admin"}),
+        (AccessLogsView, {}),
+        (AccessLogsView, {"username": "admin"}),
+    ],
+)
+def test_views_within_query_budget(rf: RequestFactory, view, params):
+    grupo = Group.objects.create(name="Administração")
+    grupo.permissions.add(Permission.objects.get(codename="access_admin_section"))
+    admin = UserFactory()
+    admin.groups.add(grupo)
+    for user in UserFactory.create_batch(3):
+        user.groups.add(grupo)
+        _log_entry(user, timezone.now())
+
+    request = rf.get("/", params)
+    request.user = User.objects.get(pk=admin.pk)
+    with assert_query_budget(view):
+        response = view.as_view()(request)
+
+    assert response.status_code == HTTPStatus.OK
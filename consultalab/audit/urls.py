@@ -3,9 +3,13 @@ from django.urls import path
 from consultalab.audit.views import AccessLogsSearchView
 from consultalab.audit.views import AccessLogsView
 from consultalab.audit.views import AdminSectionView
+from consultalab.audit.views import DesempenhoView
 from consultalab.audit.views import LogEntriesSearchView
 from consultalab.audit.views import LogEntriesView
 from consultalab.audit.views import LogEntryDetailView
+from consultalab.audit.views import PerfilDetailView
+from consultalab.audit.views import PerfilFlamegraphView
+from consultalab.audit.views import PerfisView
 from consultalab.audit.views import UsersSearchView
 from consultalab.audit.views import UsersView
 
@@ -29,5 +33,17 @@ htmx_urlpatterns = [
         AccessLogsSearchView.as_view(),
         name="access_logs_search",
     ),
+    path("tab4/desempenho/", DesempenhoView.as_view(), name="desempenho"),
+    path("tab5/perfis/", PerfisView.as_view(), name="perfis"),
+    path(
+        "tab5/perfis/<int:perfil_id>/detalhes/",
+        PerfilDetailView.as_view(),
+        name="perfil_detail",
+    ),
+    path(
+        "tab5/perfis/<int:perfil_id>/flamegraph/",
+        PerfilFlamegraphView.as_view(),
+        name="perfil_flamegraph",
+    ),
 ]
 urlpatterns += htmx_urlpatterns
@@ -1,16 +1,24 @@
 from auditlog.models import LogEntry
-from axes.models import AccessLog
-from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.mixins import PermissionRequiredMixin
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
 from django.shortcuts import render
-from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.clickjacking import xframe_options_sameorigin
 from django.views.generic import TemplateView
 from django.views.generic import View
 
-User = get_user_model()
+from consultalab.audit.archive import ArchivedEntries
+from consultalab.audit.models import ArquivoAuditoria
+from consultalab.audit.models import PerfilRequisicao
+from consultalab.audit.profiling import render_flamegraph
+from consultalab.audit.services import AccessLogQuery
+from consultalab.audit.services import DesempenhoQuery
+from consultalab.audit.services import LogEntryQuery
+from consultalab.audit.services import UserQuery
+from consultalab.bacen.querysets import ETAPAS_PROCESSAMENTO
+from consultalab.core.query_budget import QueryBudget
 
 
 class AdminSectionView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
@@ -18,194 +26,89 @@ class AdminSectionView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView
     permission_required = "users.access_admin_section"
 
 
-class UsersView(LoginRequiredMixin, PermissionRequiredMixin, View):
-    permission_required = "users.access_admin_section"
+class AuditQueryViewMixin(LoginRequiredMixin, PermissionRequiredMixin):
+    """
+    Listagem (GET) e busca (POST) de uma aba da auditoria.
 
-    def get(self, request, *args, **kwargs):
-        search_term = request.GET.get("search", "")
-
-        if search_term:
-            users_list = User.objects.filter(
-                Q(name__icontains=search_term) | Q(email__icontains=search_term),
-            ).order_by("-date_joined")
-        else:
-            users_list = User.objects.all().order_by("-date_joined")
-
-        paginator = Paginator(users_list, 10)  # 10 usuários por página
-        page_number = request.GET.get("page")
-        users = paginator.get_page(page_number)
-
-        # Se há um termo de busca, retorna apenas a tabela com paginação
-        if search_term and request.headers.get("HX-Request"):
-            return render(
-                request,
-                "audit/partials/includes/users_table_with_pagination.html",
-                {"users": users, "search_term": search_term},
-            )
+    Os filtros vêm da query string no GET e do formulário no POST; em ambos os
+    casos a página é indicada na query string. O GET devolve a aba completa,
+    exceto nas requisições HTMX com filtros ou de navegação entre páginas, que
+    recebem apenas a tabela, como a busca.
+    """
 
-        # Caso contrário, retorna a página completa
-        return render(
-            request,
-            "audit/partials/users_list.html",
-            {"users": users, "search_term": search_term},
+    permission_required = "users.access_admin_section"
+    query_class = None
+    context_object_name = None
+    template_name = None
+    table_template_name = None
+    page_params = ("after", "before")
+
+    def get_page(self, query):
+        return query.page(
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
         )
 
+    def get_context_data(self, query):
+        page = self.get_page(query)
+        return {
+            self.context_object_name: page,
+            f"{self.context_object_name}_total": query.count(),
+            **query.get_context(),
+        }
 
-class UsersSearchView(LoginRequiredMixin, PermissionRequiredMixin, View):
-    permission_required = "users.access_admin_section"
+    def get(self, request, *args, **kwargs):
+        query = self.query_class(request.GET)
+        paginando = any(request.GET.get(param) for param in self.page_params)
+        template_name = self.template_name
+        if (query.has_filters or paginando) and request.headers.get("HX-Request"):
+            template_name = self.table_template_name
+        return render(request, template_name, self.get_context_data(query))
 
     def post(self, request, *args, **kwargs):
-        search_term = request.POST.get("search", "").strip()
-
-        if search_term:
-            users_list = User.objects.filter(
-                Q(name__icontains=search_term) | Q(email__icontains=search_term),
-            ).order_by("-date_joined")
-        else:
-            users_list = User.objects.all().order_by("-date_joined")
-
-        paginator = Paginator(users_list, 10)  # 10 usuários por página
-        page_number = request.GET.get("page", 1)
-        users = paginator.get_page(page_number)
-
+        query = self.query_class(request.POST)
         return render(
             request,
-            "audit/partials/includes/users_table_with_pagination.html",
-            {"users": users, "search_term": search_term},
+            self.table_template_name,
+            self.get_context_data(query),
         )
 
 
-class LogEntriesView(LoginRequiredMixin, PermissionRequiredMixin, View):
-    permission_required = "users.access_admin_section"
-
-    def get(self, request, *args, **kwargs):
-        # Obter parâmetros de filtro
-        actor_search = request.GET.get("actor", "").strip()
-        date_from = request.GET.get("date_from", "").strip()
-        date_to = request.GET.get("date_to", "").strip()
-
-        # Começar com todos os logs
-        log_entries_list = LogEntry.objects.all()
-
-        # Filtrar por usuário (actor)
-        if actor_search:
-            log_entries_list = log_entries_list.filter(
-                Q(actor__name__icontains=actor_search)
-                | Q(actor__email__icontains=actor_search),
-            )
+class UsersView(AuditQueryViewMixin, View):
+    query_class = UserQuery
+    context_object_name = "users"
+    template_name = "audit/partials/users_list.html"
+    table_template_name = "audit/partials/includes/users_table_with_pagination.html"
+    # A navegação entre páginas sem busca recarrega a aba inteira
+    page_params = ()
+    # Permissões (2) + total + página + permissões diretas e dos grupos dos
+    # usuários listados
+    query_budget = QueryBudget(queries=6, time=0.2)
+    http_method_names = ["get"]
 
-        # Filtrar por período de data
-        if date_from:
-            try:
-                parsed_date_from = parse_date(date_from)
-                if parsed_date_from:
-                    log_entries_list = log_entries_list.filter(
-                        timestamp__date__gte=parsed_date_from,
-                    )
-            except ValueError:
-                pass
-
-        if date_to:
-            try:
-                parsed_date_to = parse_date(date_to)
-                if parsed_date_to:
-                    log_entries_list = log_entries_list.filter(
-                        timestamp__date__lte=parsed_date_to,
-                    )
-            except ValueError:
-                pass
-
-        log_entries_list = log_entries_list.order_by("-timestamp")
-
-        paginator = Paginator(log_entries_list, 10)  # 10 entradas por página
-        page_number = request.GET.get("page")
-        log_entries = paginator.get_page(page_number)
-
-        # Se há filtros aplicados e é uma requisição HTMX, retorna apenas a tabela
-        if (actor_search or date_from or date_to) and request.headers.get("HX-Request"):
-            return render(
-                request,
-                "audit/partials/includes/log_entries_table_with_pagination.html",
-                {
-                    "log_entries": log_entries,
-                    "actor_search": actor_search,
-                    "date_from": date_from,
-                    "date_to": date_to,
-                },
-            )
+    def get_page(self, query):
+        return query.page(self.request.GET.get("page"))
 
-        return render(
-            request,
-            "audit/partials/log_entries_list.html",
-            {
-                "log_entries": log_entries,
-                "actor_search": actor_search,
-                "date_from": date_from,
-                "date_to": date_to,
-            },
-        )
 
+class UsersSearchView(UsersView):
+    http_method_names = ["post"]
 
-class LogEntriesSearchView(LoginRequiredMixin, PermissionRequiredMixin, View):
-    permission_required = "users.access_admin_section"
 
-    def post(self, request, *args, **kwargs):
-        # Obter parâmetros de filtro
-        actor_search = request.POST.get("actor", "").strip()
-        date_from = request.POST.get("date_from", "").strip()
-        date_to = request.POST.get("date_to", "").strip()
-
-        # Começar com todos os logs
-        log_entries_list = LogEntry.objects.all()
-
-        # Filtrar por usuário (actor)
-        if actor_search:
-            log_entries_list = log_entries_list.filter(
-                Q(actor__name__icontains=actor_search)
-                | Q(actor__email__icontains=actor_search),
-            )
+class LogEntriesView(AuditQueryViewMixin, View):
+    query_class = LogEntryQuery
+    context_object_name = "log_entries"
+    template_name = "audit/partials/log_entries_list.html"
+    table_template_name = (
+        "audit/partials/includes/log_entries_table_with_pagination.html"
+    )
+    http_method_names = ["get"]
+    # Permissões (2) + usuários da busca + página + total + arquivos consultados
+    # para a página e para o total
+    query_budget = QueryBudget(queries=7, time=0.5)
 
-        # Filtrar por período de data
-        if date_from:
-            try:
-                from django.utils.dateparse import parse_date
-
-                parsed_date_from = parse_date(date_from)
-                if parsed_date_from:
-                    log_entries_list = log_entries_list.filter(
-                        timestamp__date__gte=parsed_date_from,
-                    )
-            except ValueError:
-                pass
-
-        if date_to:
-            try:
-                from django.utils.dateparse import parse_date
-
-                parsed_date_to = parse_date(date_to)
-                if parsed_date_to:
-                    log_entries_list = log_entries_list.filter(
-                        timestamp__date__lte=parsed_date_to,
-                    )
-            except ValueError:
-                pass
-
-        log_entries_list = log_entries_list.order_by("-timestamp")
-
-        paginator = Paginator(log_entries_list, 10)  # 10 entradas por página
-        page_number = request.GET.get("page", 1)
-        log_entries = paginator.get_page(page_number)
 
-        return render(
-            request,
-            "audit/partials/includes/log_entries_table_with_pagination.html",
-            {
-                "log_entries": log_entries,
-                "actor_search": actor_search,
-                "date_from": date_from,
-                "date_to": date_to,
-            },
-        )
+class LogEntriesSearchView(LogEntriesView):
+    http_method_names = ["post"]
 
 
 class LogEntryDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
@@ -215,6 +118,12 @@ class LogEntryDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
         log_entry_id = kwargs.get("log_id")
         log_entry = LogEntry.objects.filter(id=log_entry_id).first()
 
+        # Entradas fora da retenção são buscadas nos arquivos
+        if not log_entry:
+            log_entry = ArchivedEntries(ArquivoAuditoria.FONTE_LOG_ENTRY).get(
+                log_entry_id,
+            )
+
         if not log_entry:
             return render(request, "audit/partials/log_entry_not_found.html")
 
@@ -225,134 +134,84 @@ class LogEntryDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
         )
 
 
-class AccessLogsView(LoginRequiredMixin, PermissionRequiredMixin, View):
-    permission_required = "users.access_admin_section"
+class AccessLogsView(AuditQueryViewMixin, View):
+    query_class = AccessLogQuery
+    context_object_name = "access_logs"
+    template_name = "audit/partials/access_logs_list.html"
+    table_template_name = (
+        "audit/partials/includes/access_logs_table_with_pagination.html"
+    )
+    http_method_names = ["get"]
+    # Permissões (2) + página + total + arquivos consultados para a página e
+    # para o total
+    query_budget = QueryBudget(queries=6, time=0.5)
 
-    def get(self, request, *args, **kwargs):
-        # Obter parâmetros de filtro
-        username_search = request.GET.get("username", "").strip()
-        date_from = request.GET.get("date_from", "").strip()
-        date_to = request.GET.get("date_to", "").strip()
-
-        # Começar com todos os logs de acesso
-        access_logs_list = AccessLog.objects.all()
-
-        # Filtrar por usuário (username)
-        if username_search:
-            access_logs_list = access_logs_list.filter(
-                username__icontains=username_search,
-            )
 
-        # Filtrar por período de data
-        if date_from:
-            try:
-                parsed_date_from = parse_date(date_from)
-                if parsed_date_from:
-                    access_logs_list = access_logs_list.filter(
-                        attempt_time__date__gte=parsed_date_from,
-                    )
-            except ValueError:
-                pass
-
-        if date_to:
-            try:
-                parsed_date_to = parse_date(date_to)
-                if parsed_date_to:
-                    access_logs_list = access_logs_list.filter(
-                        attempt_time__date__lte=parsed_date_to,
-                    )
-            except ValueError:
-                pass
-
-        access_logs_list = access_logs_list.order_by("-attempt_time")
-
-        paginator = Paginator(access_logs_list, 10)  # 10 entradas por página
-        page_number = request.GET.get("page")
-        access_logs = paginator.get_page(page_number)
-
-        # Se há filtros aplicados e é uma requisição HTMX, retorna apenas a tabela
-        if (username_search or date_from or date_to) and request.headers.get(
-            "HX-Request",
-        ):
-            return render(
-                request,
-                "audit/partials/includes/access_logs_table_with_pagination.html",
-                {
-                    "access_logs": access_logs,
-                    "username_search": username_search,
-                    "date_from": date_from,
-                    "date_to": date_to,
-                },
-            )
+class AccessLogsSearchView(AccessLogsView):
+    http_method_names = ["post"]
+
 
+class DesempenhoView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Percentis dos tempos de processamento das requisições, por etapa."""
+
+    permission_required = "users.access_admin_section"
+    http_method_names = ["get"]
+    etapas = {
+        "fila": "Fila",
+        "consulta": "Consulta ao Bacen",
+        "participantes": "Participantes",
+        "persistencia": "Gravação",
+        "total": "Total",
+    }
+
+    def get(self, request, *args, **kwargs):
+        query = DesempenhoQuery(request.GET)
+        template_name = "audit/partials/desempenho.html"
+        if query.has_filters and request.headers.get("HX-Request"):
+            template_name = "audit/partials/includes/desempenho_table.html"
         return render(
             request,
-            "audit/partials/access_logs_list.html",
+            template_name,
             {
-                "access_logs": access_logs,
-                "username_search": username_search,
-                "date_from": date_from,
-                "date_to": date_to,
+                "linhas": query.rows(),
+                "etapas": [self.etapas[etapa] for etapa in ETAPAS_PROCESSAMENTO],
+                **query.get_context(),
             },
         )
 
 
-class AccessLogsSearchView(LoginRequiredMixin, PermissionRequiredMixin, View):
+class PerfisView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Perfis de requisições pedidos pelos administradores, mais recentes
+    primeiro."""
+
     permission_required = "users.access_admin_section"
+    http_method_names = ["get"]
 
-    def post(self, request, *args, **kwargs):
-        # Obter parâmetros de filtro
-        username_search = request.POST.get("username", "").strip()
-        date_from = request.POST.get("date_from", "").strip()
-        date_to = request.POST.get("date_to", "").strip()
-
-        # Começar com todos os logs de acesso
-        access_logs_list = AccessLog.objects.all()
-
-        # Filtrar por usuário (username)
-        if username_search:
-            access_logs_list = access_logs_list.filter(
-                username__icontains=username_search,
-            )
+    def get(self, request, *args, **kwargs):
+        perfis = PerfilRequisicao.objects.select_related("user").defer("consultas")
+        return render(request, "audit/partials/perfis.html", {"perfis": perfis})
 
-        # Filtrar por período de data
-        if date_from:
-            try:
-                from django.utils.dateparse import parse_date
-
-                parsed_date_from = parse_date(date_from)
-                if parsed_date_from:
-                    access_logs_list = access_logs_list.filter(
-                        attempt_time__date__gte=parsed_date_from,
-                    )
-            except ValueError:
-                pass
-
-        if date_to:
-            try:
-                from django.utils.dateparse import parse_date
-
-                parsed_date_to = parse_date(date_to)
-                if parsed_date_to:
-                    access_logs_list = access_logs_list.filter(
-                        attempt_time__date__lte=parsed_date_to,
-                    )
-            except ValueError:
-                pass
-
-        access_logs_list = access_logs_list.order_by("-attempt_time")
-
-        paginator = Paginator(access_logs_list, 10)  # 10 entradas por página
-        page_number = request.GET.get("page", 1)
-        access_logs = paginator.get_page(page_number)
 
+class PerfilDetailView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = "users.access_admin_section"
+    http_method_names = ["get"]
+
+    def get(self, request, *args, **kwargs):
+        perfil = get_object_or_404(PerfilRequisicao, id=kwargs.get("perfil_id"))
         return render(
             request,
-            "audit/partials/includes/access_logs_table_with_pagination.html",
-            {
-                "access_logs": access_logs,
-                "username_search": username_search,
-                "date_from": date_from,
-                "date_to": date_to,
-            },
+            "audit/partials/perfil_detail.html",
+            {"perfil": perfil},
         )
+
+
+@method_decorator(xframe_options_sameorigin, name="dispatch")
+class PerfilFlamegraphView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Flamegraph do perfil, exibido em um iframe no detalhe do perfil."""
+
+    permission_required = "users.access_admin_section"
+    http_method_names = ["get"]
+
+    def get(self, request, *args, **kwargs):
+        perfil = get_object_or_404(PerfilRequisicao, id=kwargs.get("perfil_id"))
+        return HttpResponse(render_flamegraph(perfil))
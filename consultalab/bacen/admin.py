@@ -1,7 +1,9 @@
 from django.contrib import admin
 
 from consultalab.bacen.models import ChavePix
+from consultalab.bacen.models import ErroImportacaoLote
 from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.models import ImportacaoLote
 from consultalab.bacen.models import RequisicaoBacen
 
 
@@ -55,3 +57,31 @@ class EventoVinculoAdmin(admin.ModelAdmin):
     list_filter = ("tipo_evento",)
     ordering = ("-created",)
     date_hierarchy = "created"
+
+
+class ErroImportacaoLoteInline(admin.TabularInline):
+    model = ErroImportacaoLote
+    fields = ("linha", "conteudo", "erro")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = False
+    max_num = 0
+
+
+@admin.register(ImportacaoLote)
+class ImportacaoLoteAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "user",
+        "status",
+        "total_linhas",
+        "requisicoes_validas",
+        "requisicoes_invalidas",
+        "created",
+    )
+    search_fields = ("user__username", "task_id")
+    list_filter = ("status", "processar_imediatamente")
+    ordering = ("-created",)
+    date_hierarchy = "created"
+    inlines = (ErroImportacaoLoteInline,)
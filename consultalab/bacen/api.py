@@ -1,7 +1,17 @@
 import logging
+import time
 
 import requests
 from django.conf import settings
+from django.utils import timezone
+from opentelemetry.trace import SpanKind
+
+from consultalab.bacen.metrics import API_LATENCY
+from consultalab.bacen.metrics import API_RESPONSES
+from consultalab.bacen.metrics import EVENTOS_POR_RESPOSTA
+from consultalab.bacen.metrics import PARTICIPANTE_CACHE
+from consultalab.bacen.metrics import VINCULOS_POR_RESPOSTA
+from consultalab.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -22,27 +32,57 @@ class BacenRequestApi:
         self.pix_chave_endpoint = "/consultar-vinculo-pix"
 
         self.bank_infos = {}
+        # Fim de cada etapa da última consulta (ver RequisicaoBacen)
+        self.etapas = {}
 
         self.TIMEOUT_REQUEST = 60  # seconds
         self.STATUS_CODE_SUCCESS = 200
+        # Respostas que indicam indisponibilidade temporária do Bacen
+        self.TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def _get(self, url: str, metric_endpoint: str, **kwargs) -> requests.Response:
+        """GET registrando a latência e o status da resposta por endpoint."""
+        inicio = time.perf_counter()
+        with tracer.start_as_current_span(
+            f"GET {metric_endpoint}",
+            kind=SpanKind.CLIENT,
+            attributes={"http.request.method": "GET", "url.full": url},
+        ) as span:
+            try:
+                response = requests.get(url, timeout=self.TIMEOUT_REQUEST, **kwargs)
+            except requests.exceptions.RequestException as e:
+                API_RESPONSES.labels(metric_endpoint, type(e).__name__).inc()
+                raise
+            finally:
+                API_LATENCY.labels(metric_endpoint).observe(
+                    time.perf_counter() - inicio,
+                )
+            span.set_attribute("http.response.status_code", response.status_code)
+        API_RESPONSES.labels(metric_endpoint, str(response.status_code)).inc()
+        return response
 
     def _execute_pix_request(self, endpoint: str, payload: dict) -> dict:
         url = f"{self.base_url}{endpoint}"
+        metric_endpoint = endpoint.strip("/")
+        self.etapas = {}
         try:
-            response = requests.get(
+            response = self._get(
                 url,
+                metric_endpoint,
                 headers=self.headers,
                 params=payload,
                 auth=(self.username, self.password),
-                timeout=self.TIMEOUT_REQUEST,
             )
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
             return {
                 "status": "error",
                 "message": str(e),
+                "transient": self._is_transient(e),
             }
 
+        self.etapas["consulta_concluida_em"] = timezone.now()
+
         if response.status_code == self.STATUS_CODE_SUCCESS:
             data = response.json()
 
@@ -62,11 +102,26 @@ class BacenRequestApi:
                         self._save_bank_info(participante_evento)
                         evento["participante"] = self.bank_infos[participante_evento]
 
+            self.etapas["participantes_resolvidos_em"] = timezone.now()
+            VINCULOS_POR_RESPOSTA.labels(metric_endpoint).observe(len(chaves))
+            EVENTOS_POR_RESPOSTA.labels(metric_endpoint).observe(
+                sum(len(chave.get("eventosVinculo", [])) for chave in chaves),
+            )
+
         return {
             "status": "success",
             "data": chaves,
         }
 
+    def _is_transient(self, error: requests.exceptions.RequestException) -> bool:
+        """Falhas de rede e respostas de indisponibilidade podem ser repetidas."""
+        if isinstance(error, requests.exceptions.HTTPError):
+            return error.response.status_code in self.TRANSIENT_STATUS_CODES
+        return isinstance(
+            error,
+            (requests.exceptions.ConnectionError, requests.exceptions.Timeout),
+        )
+
     def get_pix_by_cpf_cnpj(self, cpf_cnpj: str, reason: str) -> dict:
         payload = {"cpfCnpj": cpf_cnpj, "motivo": reason}
         return self._execute_pix_request(self.pix_cpfcnpj_endpoint, payload)
@@ -80,10 +135,10 @@ class BacenRequestApi:
         Obtém informações bancárias de um CNPJ usando a API de Informes do Bacen.
         """
         try:
-            response = requests.get(
+            response = self._get(
                 f"{self.informes_url}/pessoasJuridicas",
+                "pessoasJuridicas",
                 params={"cnpj": cnpj},
-                timeout=self.TIMEOUT_REQUEST,
             )
             response.raise_for_status()
         except requests.exceptions.RequestException:
@@ -93,7 +148,10 @@ class BacenRequestApi:
         return response.json()
 
     def _save_bank_info(self, participante: str) -> dict:
-        if participante not in self.bank_infos:
+        if participante in self.bank_infos:
+            PARTICIPANTE_CACHE.labels("hit").inc()
+        else:
+            PARTICIPANTE_CACHE.labels("miss").inc()
             bank_info = self.get_bank_info(participante)
             self.bank_infos[participante] = {
                 "cnpj": bank_info.get("cnpj", None),
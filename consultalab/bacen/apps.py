@@ -1,3 +1,5 @@
+import contextlib
+
 from django.apps import AppConfig
 
 
@@ -5,3 +7,7 @@ class PixConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "consultalab.bacen"
     verbose_name = "Requisições Bacen"
+
+    def ready(self):
+        with contextlib.suppress(ImportError):
+            import consultalab.bacen.signals  # noqa: F401
@@ -1,5 +1,4 @@
 import django_filters
-from django.db.models import Q
 from django.forms import TextInput
 
 from consultalab.bacen.models import RequisicaoBacen
@@ -31,8 +30,4 @@ class RequisicaoBacenFilter(django_filters.FilterSet):
         fields = ["created", "busca"]
 
     def filter_busca(self, queryset, name, value):
-        return queryset.filter(
-            Q(termo_busca__icontains=value)
-            | Q(motivo__icontains=value)
-            | Q(referencia__icontains=value),
-        )
+        return queryset.busca(value)
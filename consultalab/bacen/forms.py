@@ -1,3 +1,7 @@
+import codecs
+import time
+from itertools import batched
+
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import HTML
 from crispy_forms.layout import Column
@@ -5,15 +9,20 @@ from crispy_forms.layout import Field
 from crispy_forms.layout import Layout
 from crispy_forms.layout import Row
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from validate_docbr import CNPJ
 from validate_docbr import CPF
 
+from consultalab.bacen.helpers import BULK_VALIDATION_BATCH_SIZE
+from consultalab.bacen.helpers import CNPJ_LENGTH
+from consultalab.bacen.helpers import CPF_LENGTH
+from consultalab.bacen.helpers import validate_cpf_cnpj
+from consultalab.bacen.helpers import validate_cpf_cnpj_batch
 from consultalab.bacen.models import RequisicaoBacen
 
 # Constantes
 MIN_CAMPOS_LINHA = 3
-CPF_LENGTH = 11
-CNPJ_LENGTH = 14
 CAMPO_REFERENCIA_INDEX = 3
 
 
@@ -160,6 +169,24 @@ class BulkRequestForm(forms.Form):
             },
         ),
     )
+    processar_imediatamente = forms.BooleanField(
+        label="Processar imediatamente",
+        help_text=(
+            "Envia as requisições válidas para consulta logo após a importação, "
+            "sem a necessidade de processá-las uma a uma"
+        ),
+        required=False,
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._documentos_validados = {}
+        self.linhas_validadas = 0
+        self.tempo_validacao = 0.0
+
+    @property
+    def max_file_size(self):
+        return settings.BULK_REQUEST_MAX_FILE_SIZE
 
     def clean_arquivo_txt(self):
         arquivo = self.cleaned_data.get("arquivo_txt")
@@ -173,9 +200,12 @@ class BulkRequestForm(forms.Form):
             msg = "O arquivo deve ter extensão .txt"
             raise forms.ValidationError(msg)
 
-        # Verifica o tamanho do arquivo (máximo 5MB)
-        if arquivo.size > 5 * 1024 * 1024:
-            msg = "O arquivo não pode ser maior que 5MB."
+        # Verifica o tamanho do arquivo
+        if arquivo.size > self.max_file_size:
+            msg = (
+                "O arquivo não pode ser maior que "
+                f"{filesizeformat(self.max_file_size)}."
+            )
             raise forms.ValidationError(msg)
 
         return arquivo
@@ -229,23 +259,7 @@ class BulkRequestForm(forms.Form):
             }
 
         # Verifica se é CPF (11 dígitos) ou CNPJ (14 dígitos)
-        if len(termo_limpo) == CPF_LENGTH:
-            cpf_validator = CPF()
-            if not cpf_validator.validate(termo_limpo):
-                return None, {
-                    "linha": num_linha,
-                    "conteudo": linha,
-                    "erro": "CPF inválido",
-                }
-        elif len(termo_limpo) == CNPJ_LENGTH:
-            cnpj_validator = CNPJ()
-            if not cnpj_validator.validate(termo_limpo):
-                return None, {
-                    "linha": num_linha,
-                    "conteudo": linha,
-                    "erro": "CNPJ inválido",
-                }
-        else:
+        if len(termo_limpo) not in (CPF_LENGTH, CNPJ_LENGTH):
             msg = (
                 "Para Pix CPF/CNPJ, o termo deve ter 11 dígitos (CPF) "
                 "ou 14 dígitos (CNPJ)"
@@ -256,6 +270,19 @@ class BulkRequestForm(forms.Form):
                 "erro": msg,
             }
 
+        # Usa o resultado da validação em lote, quando disponível
+        valido = self._documentos_validados.get(termo_limpo)
+        if valido is None:
+            valido = validate_cpf_cnpj(termo_limpo)
+
+        if not valido:
+            tipo_documento = "CPF" if len(termo_limpo) == CPF_LENGTH else "CNPJ"
+            return None, {
+                "linha": num_linha,
+                "conteudo": linha,
+                "erro": f"{tipo_documento} inválido",
+            }
+
         return termo_limpo, None
 
     def _validate_user_permissions(self, tipo_requisicao, user, num_linha, linha):
@@ -268,17 +295,29 @@ class BulkRequestForm(forms.Form):
             }
         return None
 
+    def _split_line(self, linha):
+        """Divide a linha por vírgula ou ponto e vírgula."""
+        separador = ";" if ";" in linha else ","
+        return [campo.strip() for campo in linha.split(separador)]
+
+    def _extract_documento(self, linha):
+        """Retorna o CPF/CNPJ (apenas dígitos) de uma linha do tipo 1, se houver."""
+        campos = self._split_line(linha.strip())
+        if len(campos) < MIN_CAMPOS_LINHA or campos[0] != "1":
+            return None
+
+        documento = "".join(filter(str.isdigit, campos[1]))
+        if len(documento) not in (CPF_LENGTH, CNPJ_LENGTH):
+            return None
+        return documento
+
     def _process_single_line(self, linha_original, num_linha, user):
         """Processa uma única linha do arquivo."""
         linha = linha_original.strip()
         if not linha:  # Pula linhas vazias
             return None, None
 
-        # Divide a linha por vírgula ou ponto e vírgula
-        if ";" in linha:
-            campos = [campo.strip() for campo in linha.split(";")]
-        else:
-            campos = [campo.strip() for campo in linha.split(",")]
+        campos = self._split_line(linha)
 
         # Executa todas as validações em sequência
         erro = (
@@ -331,40 +370,101 @@ class BulkRequestForm(forms.Form):
 
         return requisicao_valida, None
 
-    def process_file(self, user):
+    def _iter_lines(self, arquivo):
         """
-        Processa o arquivo TXT e retorna uma lista de requisições válidas e inválidas.
+        Lê o arquivo em chunks e devolve uma linha decodificada por vez.
+
+        O arquivo é decodificado como UTF-8; se um byte inválido aparecer antes
+        de qualquer caractere não ASCII, a leitura passa para Latin-1 (o que é
+        seguro, já que o trecho lido até então é idêntico nas duas codificações).
+        O trecho do próprio chunk antes do byte inválido também é verificado,
+        para que um texto UTF-8 não ASCII no mesmo chunk não seja relido como
+        Latin-1.
         """
-        arquivo = self.cleaned_data["arquivo_txt"]
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        apenas_ascii = True
+        pendente = ""
 
-        # Lê o conteúdo do arquivo
-        try:
-            conteudo = arquivo.read().decode("utf-8")
-        except UnicodeDecodeError:
+        for chunk in arquivo.chunks():
             try:
-                conteudo = arquivo.read().decode("latin-1")
+                texto = decoder.decode(chunk)
             except UnicodeDecodeError as err:
-                msg = (
-                    "Não foi possível decodificar o arquivo. "
-                    "Certifique-se de que está em formato UTF-8 ou Latin-1."
-                )
-                raise forms.ValidationError(msg) from err
+                # err.object são os bytes pendentes do decoder mais o chunk
+                if not (apenas_ascii and err.object[: err.start].isascii()):
+                    msg = (
+                        "Não foi possível decodificar o arquivo. "
+                        "Certifique-se de que está em formato UTF-8 ou Latin-1."
+                    )
+                    raise forms.ValidationError(msg) from err
+                decoder = codecs.getincrementaldecoder("latin-1")()
+                texto = decoder.decode(err.object)
+
+            apenas_ascii = apenas_ascii and texto.isascii()
+            linhas = (pendente + texto).split("\n")
+            pendente = linhas.pop()
+            yield from linhas
+
+        pendente += decoder.decode(b"", final=True)
+        if pendente:
+            yield pendente
+
+    def iter_file(self, user):
+        """
+        Processa o arquivo TXT linha a linha, sem carregá-lo inteiro em memória.
 
-        linhas = conteudo.strip().split("\n")
-        requisicoes_validas = []
-        requisicoes_invalidas = []
+        Gera tuplas ``(requisicao_valida, erro)`` em que apenas um dos itens é
+        preenchido; linhas vazias são ignoradas. As linhas são lidas em lotes de
+        ``BULK_VALIDATION_BATCH_SIZE`` para que os CPFs/CNPJs de cada lote sejam
+        validados de uma só vez, no próprio processo (ver
+        ``validate_cpf_cnpj_batch``).
+        """
+        arquivo = self.cleaned_data["arquivo_txt"]
+        linhas = enumerate(self._iter_lines(arquivo), 1)
 
-        # Processa cada linha
-        for num_linha, linha_original in enumerate(linhas, 1):
-            requisicao_valida, erro = self._process_single_line(
-                linha_original,
-                num_linha,
-                user,
+        for lote in batched(linhas, BULK_VALIDATION_BATCH_SIZE):
+            inicio = time.perf_counter()
+
+            documentos = list(
+                {self._extract_documento(linha) for _, linha in lote} - {None},
+            )
+            self._documentos_validados = dict(
+                zip(
+                    documentos,
+                    validate_cpf_cnpj_batch(documentos),
+                    strict=True,
+                ),
             )
+            resultados = [
+                self._process_single_line(linha, num_linha, user)
+                for num_linha, linha in lote
+            ]
+
+            self.linhas_validadas += len(lote)
+            self.tempo_validacao += time.perf_counter() - inicio
+
+            for requisicao_valida, erro in resultados:
+                if erro or requisicao_valida:
+                    yield requisicao_valida, erro
 
+        self._documentos_validados = {}
+
+    @property
+    def linhas_por_segundo(self):
+        if not self.tempo_validacao:
+            return None
+        return self.linhas_validadas / self.tempo_validacao
+
+    def process_file(self, user):
+        """
+        Processa o arquivo TXT e retorna uma lista de requisições válidas e inválidas.
+        """
+        requisicoes_validas = []
+        requisicoes_invalidas = []
+
+        for requisicao_valida, erro in self.iter_file(user):
             if erro:
                 requisicoes_invalidas.append(erro)
-            elif requisicao_valida:
+            else:
                 requisicoes_validas.append(requisicao_valida)
 
         return requisicoes_validas, requisicoes_invalidas
@@ -1,14 +1,55 @@
 import logging
+import time
 from datetime import datetime
+from operator import mul
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
 
 LIST_PAGE_SIZE = 10  # Default page size for "requisicoes" list views
+BULK_CREATE_BATCH_SIZE = 1000  # Rows per INSERT when creating "requisicoes" in bulk
+BULK_DISPATCH_BATCH_SIZE = 100  # Tasks sent per group when dispatching in bulk
+BULK_VALIDATION_BATCH_SIZE = 50_000  # Lines validated together in bulk uploads
+BULK_ERRORS_PAGE_SIZE = 50  # Default page size for bulk upload error lists
+REQUISICOES_COUNT_CACHE_TIMEOUT = 60  # Seconds a cached list total is reused
+REQUEST_PIX_MAX_RETRIES = 5  # Automatic retries of a query after transient errors
+
+CPF_LENGTH = 11
+CNPJ_LENGTH = 14
+# Pesos dos dígitos verificadores (o map() para no menor dos iteráveis)
+CPF_WEIGHTS_DV1 = tuple(range(10, 1, -1))
+CPF_WEIGHTS_DV2 = tuple(range(11, 1, -1))
+CNPJ_WEIGHTS_DV1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+CNPJ_WEIGHTS_DV2 = (6, *CNPJ_WEIGHTS_DV1)
+ZERO = ord("0")
+CPF_OFFSET_DV1 = ZERO * sum(CPF_WEIGHTS_DV1)
+CPF_OFFSET_DV2 = ZERO * sum(CPF_WEIGHTS_DV2)
+CNPJ_OFFSET_DV1 = ZERO * sum(CNPJ_WEIGHTS_DV1)
+CNPJ_OFFSET_DV2 = ZERO * sum(CNPJ_WEIGHTS_DV2)
+
+
+def requisicoes_cache_version(user_id: int) -> int:
+    """
+    Versão atual dos dados em cache das requisições do usuário.
+
+    A versão compõe as chaves de cache por usuário (como o total da listagem),
+    de forma que ``invalidate_requisicoes_cache`` descarta todas de uma vez.
+    """
+    return cache.get_or_set(f"requisicoes_versao:{user_id}", time.time_ns, None)
+
+
+def invalidate_requisicoes_cache(user_id: int) -> None:
+    # Após o commit, para que nenhuma outra requisição guarde em cache, na nova
+    # versão, dados anteriores à alteração
+    transaction.on_commit(
+        lambda: cache.set(f"requisicoes_versao:{user_id}", time.time_ns(), None),
+    )
 
 
 def has_object(classmodel, **kwargs) -> bool:
@@ -20,6 +61,43 @@ def has_object(classmodel, **kwargs) -> bool:
         return True
 
 
+def validate_cpf_cnpj(documento: str) -> bool:
+    """
+    Valida os dígitos verificadores de um CPF (11 dígitos) ou CNPJ (14 dígitos).
+
+    Espera apenas dígitos; documentos com todos os dígitos iguais são inválidos.
+    """
+    if not (documento.isascii() and documento.isdigit()):
+        return False
+    if documento.count(documento[0]) == len(documento):
+        return False
+
+    # Soma ponderada sobre os códigos ASCII, descontando o deslocamento de "0"
+    codigos = documento.encode()
+    if len(codigos) == CPF_LENGTH:
+        dv1 = (sum(map(mul, codigos, CPF_WEIGHTS_DV1)) - CPF_OFFSET_DV1) * 10 % 11
+        dv2 = (sum(map(mul, codigos, CPF_WEIGHTS_DV2)) - CPF_OFFSET_DV2) * 10 % 11
+    elif len(codigos) == CNPJ_LENGTH:
+        dv1 = (CNPJ_OFFSET_DV1 - sum(map(mul, codigos, CNPJ_WEIGHTS_DV1))) % 11
+        dv2 = (CNPJ_OFFSET_DV2 - sum(map(mul, codigos, CNPJ_WEIGHTS_DV2))) % 11
+    else:
+        return False
+
+    return dv1 % 10 == codigos[-2] - ZERO and dv2 % 10 == codigos[-1] - ZERO
+
+
+def validate_cpf_cnpj_batch(documentos) -> list[bool]:
+    """
+    Valida uma sequência de CPFs/CNPJs, na mesma ordem recebida.
+
+    A validação roda no próprio processo: a importação em lote é validada na
+    tarefa do Celery, e os processos prefork dos workers são daemon e não podem
+    abrir um pool de processos. Um lote de ``BULK_VALIDATION_BATCH_SIZE``
+    linhas é validado de uma só vez, sem documentos repetidos.
+    """
+    return [validate_cpf_cnpj(documento) for documento in documentos]
+
+
 def parse_datetime_br(date_str: str) -> datetime | None:
     if not date_str:
         return None
@@ -0,0 +1,82 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django_celery_results.models import TaskResult
+
+from consultalab.bacen.helpers import invalidate_requisicoes_cache
+from consultalab.bacen.models import ChavePix
+from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.bacen.synthetic import SYNTHETIC_BATCH_SIZE
+from consultalab.bacen.synthetic import SyntheticDataGenerator
+
+User = get_user_model()
+
+SYNTHETIC_EMAIL = "sintetico-{}@consultalab.local"
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera requisições, chaves Pix, eventos de vínculo e resultados de tarefas "
+        "sintéticos em volume de produção (via COPY), para benchmarks. Não use "
+        "em produção."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requisicoes", type=int, default=1_000_000)
+        parser.add_argument(
+            "--usuarios",
+            type=int,
+            default=50,
+            help="Analistas sintéticos entre os quais as requisições são divididas.",
+        )
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=365,
+            help="Período (até hoje) em que as requisições são distribuídas.",
+        )
+        parser.add_argument("--lote", type=int, default=SYNTHETIC_BATCH_SIZE)
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        users = [
+            User.objects.get_or_create(
+                email=SYNTHETIC_EMAIL.format(i),
+                defaults={"name": f"Analista sintético {i}"},
+            )[0]
+            for i in range(options["usuarios"])
+        ]
+        generator = SyntheticDataGenerator(
+            users,
+            random.Random(options["seed"]),  # noqa: S311
+            dias=options["dias"],
+            batch_size=options["lote"],
+        )
+
+        def progress(totais):
+            self.stdout.write(
+                f"{totais['requisicoes']}/{options['requisicoes']} requisições, "
+                f"{totais['chaves']} chaves, {totais['eventos']} eventos",
+            )
+
+        totais = generator.generate(options["requisicoes"], progress=progress)
+
+        # Estatísticas atualizadas para que os planos dos benchmarks reflitam
+        # o novo volume
+        with connection.cursor() as cursor:
+            for model in (RequisicaoBacen, ChavePix, EventoVinculo, TaskResult):
+                table = connection.ops.quote_name(model._meta.db_table)  # noqa: SLF001
+                cursor.execute(f"ANALYZE {table}")
+        for user in users:
+            invalidate_requisicoes_cache(user.id)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Gerados {totais['requisicoes']} requisições, {totais['chaves']} "
+                f"chaves Pix, {totais['eventos']} eventos e {totais['tarefas']} "
+                "resultados de tarefas.",
+            ),
+        )
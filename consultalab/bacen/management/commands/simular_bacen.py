@@ -0,0 +1,67 @@
+import uvicorn
+from django.core.management.base import BaseCommand
+
+from consultalab.bacen.simulator import BacenSimulator
+
+
+class Command(BaseCommand):
+    help = (
+        "Inicia o simulador local das APIs do DICT e de Informes do Bacen. "
+        "Aponte BACEN_API_DICT_BASEURL e BACEN_API_INFORMES para "
+        "http://<host>:<porta>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--porta", type=int, default=8100)
+        parser.add_argument(
+            "--latencia-mediana",
+            type=float,
+            default=0.05,
+            help="Mediana da latência das respostas, em segundos.",
+        )
+        parser.add_argument(
+            "--latencia-dispersao",
+            type=float,
+            default=0.5,
+            help="Sigma da distribuição log-normal da latência (0 = fixa).",
+        )
+        parser.add_argument(
+            "--taxa-erro",
+            type=float,
+            default=0.0,
+            help="Fração das respostas com erro 500.",
+        )
+        parser.add_argument(
+            "--taxa-429",
+            type=float,
+            default=0.0,
+            help="Fração das respostas 429 (limite de requisições).",
+        )
+        parser.add_argument(
+            "--escala",
+            type=float,
+            default=1.0,
+            help="Multiplicador do número de vínculos por CPF/CNPJ.",
+        )
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        simulator = BacenSimulator(
+            latencia_mediana=options["latencia_mediana"],
+            latencia_dispersao=options["latencia_dispersao"],
+            taxa_erro=options["taxa_erro"],
+            taxa_429=options["taxa_429"],
+            escala=options["escala"],
+            seed=options["seed"],
+        )
+        self.stdout.write(
+            f"Simulador do Bacen em http://{options['host']}:{options['porta']}",
+        )
+        uvicorn.run(
+            simulator,
+            host=options["host"],
+            port=options["porta"],
+            log_level="warning",
+            ws="none",
+        )
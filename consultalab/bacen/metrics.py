@@ -0,0 +1,39 @@
+"""
+Métricas Prometheus das consultas às APIs do Bacen (ver
+``consultalab.core.metrics``).
+"""
+
+from prometheus_client import Counter
+from prometheus_client import Histogram
+
+ITEMS_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+API_LATENCY = Histogram(
+    "consultalab_bacen_api_request_seconds",
+    "Latência das chamadas às APIs do Bacen, por endpoint.",
+    ["endpoint"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+)
+API_RESPONSES = Counter(
+    "consultalab_bacen_api_responses",
+    "Respostas das APIs do Bacen, por endpoint e status HTTP (ou classe do "
+    "erro quando não há resposta).",
+    ["endpoint", "status"],
+)
+VINCULOS_POR_RESPOSTA = Histogram(
+    "consultalab_bacen_vinculos_por_resposta",
+    "Chaves Pix retornadas por consulta ao DICT.",
+    ["endpoint"],
+    buckets=ITEMS_BUCKETS,
+)
+EVENTOS_POR_RESPOSTA = Histogram(
+    "consultalab_bacen_eventos_por_resposta",
+    "Eventos de vínculo retornados por consulta ao DICT.",
+    ["endpoint"],
+    buckets=ITEMS_BUCKETS,
+)
+PARTICIPANTE_CACHE = Counter(
+    "consultalab_bacen_participante_cache",
+    "Buscas dos dados do participante no cache da consulta (hit/miss).",
+    ["resultado"],
+)
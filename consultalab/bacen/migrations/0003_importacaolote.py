@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:57
+
+import consultalab.bacen.models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bacen', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_void', models.BooleanField(db_column='inativo', default=False, verbose_name='Inativo')),
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('arquivo', models.FileField(db_column='arquivo', storage=consultalab.bacen.models.private_storage, upload_to='importacoes/%Y/%m/', verbose_name='Arquivo')),
+                ('processar_imediatamente', models.BooleanField(db_column='processar_imediatamente', default=False, verbose_name='Processar imediatamente')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('PROCESSANDO', 'Processando'), ('CONCLUIDA', 'Concluída'), ('FALHOU', 'Falhou')], db_column='status', default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('total_linhas', models.PositiveIntegerField(db_column='total_linhas', default=0, verbose_name='Linhas processadas')),
+                ('requisicoes_validas', models.PositiveIntegerField(db_column='requisicoes_validas', default=0, verbose_name='Requisições criadas')),
+                ('requisicoes_invalidas', models.PositiveIntegerField(db_column='requisicoes_invalidas', default=0, verbose_name='Linhas com erro')),
+                ('tempo_validacao', models.FloatField(blank=True, db_column='tempo_validacao', null=True, verbose_name='Tempo de validação (s)')),
+                ('linhas_por_segundo', models.FloatField(blank=True, db_column='linhas_por_segundo', null=True, verbose_name='Linhas validadas por segundo')),
+                ('mensagem_erro', models.TextField(blank=True, db_column='mensagem_erro', verbose_name='Mensagem de erro')),
+                ('task_id', models.CharField(blank=True, db_column='task_id', max_length=255, verbose_name='ID da Tarefa')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='importacoes_lote', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Importação em Lote',
+                'verbose_name_plural': 'Importações em Lote',
+                'db_table': 'IMPORTACOES_LOTE',
+            },
+        ),
+        migrations.CreateModel(
+            name='ErroImportacaoLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_void', models.BooleanField(db_column='inativo', default=False, verbose_name='Inativo')),
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('linha', models.PositiveIntegerField(db_column='linha', verbose_name='Linha')),
+                ('conteudo', models.TextField(blank=True, db_column='conteudo', verbose_name='Conteúdo')),
+                ('erro', models.CharField(db_column='erro', max_length=255, verbose_name='Erro')),
+                ('importacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='erros', to='bacen.importacaolote', verbose_name='Importação em Lote')),
+            ],
+            options={
+                'verbose_name': 'Erro de Importação em Lote',
+                'verbose_name_plural': 'Erros de Importação em Lote',
+                'db_table': 'ERROS_IMPORTACAO_LOTE',
+                'ordering': ['linha'],
+                'indexes': [models.Index(fields=['importacao', 'linha'], name='ERROS_IMPOR_importa_23779b_idx')],
+            },
+        ),
+    ]
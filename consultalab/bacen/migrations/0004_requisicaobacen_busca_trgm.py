@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:59
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Os índices são criados com CONCURRENTLY para não bloquear a tabela
+    atomic = False
+
+    dependencies = [
+        ('bacen', '0003_importacaolote'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='requisicaobacen',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('termo_busca'), name='gin_trgm_ops'), name='req_bacen_termo_busca_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='requisicaobacen',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('motivo'), name='gin_trgm_ops'), name='req_bacen_motivo_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='requisicaobacen',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('referencia'), name='gin_trgm_ops'), name='req_bacen_referencia_trgm'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:04
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # O índice é criado com CONCURRENTLY para não bloquear a tabela
+    atomic = False
+
+    dependencies = [
+        ('bacen', '0004_requisicaobacen_busca_trgm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='requisicaobacen',
+            index=models.Index(fields=['user', '-created', '-id'], name='req_bacen_user_created_idx'),
+        ),
+    ]
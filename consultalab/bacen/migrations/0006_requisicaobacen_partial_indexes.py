@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:07
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Os índices são criados com CONCURRENTLY para não bloquear a tabela
+    atomic = False
+
+    dependencies = [
+        ('bacen', '0005_requisicaobacen_user_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='requisicaobacen',
+            index=models.Index(condition=models.Q(('processada', False)), fields=['-created'], name='req_bacen_pendentes_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='requisicaobacen',
+            index=models.Index(condition=models.Q(('task_id', ''), _negated=True), fields=['task_id'], name='req_bacen_task_id_idx'),
+        ),
+    ]
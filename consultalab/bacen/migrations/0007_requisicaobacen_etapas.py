@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:44
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # O índice é criado com CONCURRENTLY para não bloquear a tabela
+    atomic = False
+
+    dependencies = [
+        ('bacen', '0006_requisicaobacen_partial_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requisicaobacen',
+            name='consulta_concluida_em',
+            field=models.DateTimeField(blank=True, db_column='consulta_concluida_em', null=True, verbose_name='Consulta ao Bacen concluída em'),
+        ),
+        migrations.AddField(
+            model_name='requisicaobacen',
+            name='enfileirada_em',
+            field=models.DateTimeField(blank=True, db_column='enfileirada_em', null=True, verbose_name='Enviada para processamento em'),
+        ),
+        migrations.AddField(
+            model_name='requisicaobacen',
+            name='iniciada_em',
+            field=models.DateTimeField(blank=True, db_column='iniciada_em', null=True, verbose_name='Processamento iniciado em'),
+        ),
+        migrations.AddField(
+            model_name='requisicaobacen',
+            name='participantes_resolvidos_em',
+            field=models.DateTimeField(blank=True, db_column='participantes_resolvidos_em', null=True, verbose_name='Participantes resolvidos em'),
+        ),
+        migrations.AddField(
+            model_name='requisicaobacen',
+            name='persistida_em',
+            field=models.DateTimeField(blank=True, db_column='persistida_em', null=True, verbose_name='Resultado gravado em'),
+        ),
+        AddIndexConcurrently(
+            model_name='requisicaobacen',
+            index=models.Index(condition=models.Q(('persistida_em__isnull', False)), fields=['persistida_em'], name='req_bacen_persistida_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:58
+
+from django.db import migrations, models
+
+# Remove as duplicatas gravadas por tarefas repetidas antes de criar as
+# restrições, mantendo a primeira gravação (menor id) de cada chave natural.
+# Os eventos das chaves removidas são apagados antes, já que o Django não cria
+# ON DELETE CASCADE no banco.
+REMOVE_DUPLICATES = """
+DELETE FROM "EVENTOS_VINCULO_PIX" e
+USING "CHAVES_PIX" a, "CHAVES_PIX" b
+WHERE e.chave_pix_id = a.id
+  AND a.requisicao_bacen_id = b.requisicao_bacen_id
+  AND a.chave = b.chave
+  AND a.id > b.id;
+
+DELETE FROM "CHAVES_PIX" a
+USING "CHAVES_PIX" b
+WHERE a.requisicao_bacen_id = b.requisicao_bacen_id
+  AND a.chave = b.chave
+  AND a.id > b.id;
+
+DELETE FROM "EVENTOS_VINCULO_PIX" a
+USING "EVENTOS_VINCULO_PIX" b
+WHERE a.chave_pix_id = b.chave_pix_id
+  AND a.tipo_evento = b.tipo_evento
+  AND a.motivo_evento = b.motivo_evento
+  AND a.data_evento IS NOT DISTINCT FROM b.data_evento
+  AND a.id > b.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bacen', '0007_requisicaobacen_etapas'),
+    ]
+
+    operations = [
+        migrations.RunSQL(REMOVE_DUPLICATES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='chavepix',
+            constraint=models.UniqueConstraint(fields=('requisicao_bacen', 'chave'), name='chave_pix_requisicao_chave_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventovinculo',
+            constraint=models.UniqueConstraint(fields=('chave_pix', 'tipo_evento', 'motivo_evento', 'data_evento'), name='evento_vinculo_unico', nulls_distinct=False),
+        ),
+    ]
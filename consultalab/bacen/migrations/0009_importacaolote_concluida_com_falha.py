@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bacen', '0008_chaves_naturais'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importacaolote',
+            name='status',
+            field=models.CharField(choices=[('PENDENTE', 'Pendente'), ('PROCESSANDO', 'Processando'), ('CONCLUIDA', 'Concluída'), ('CONCLUIDA_COM_FALHA', 'Concluída com falha'), ('FALHOU', 'Falhou')], db_column='status', default='PENDENTE', max_length=20, verbose_name='Status'),
+        ),
+    ]
@@ -1,10 +1,16 @@
 from auditlog.models import AuditlogHistoryField
 from auditlog.registry import auditlog
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import OpClass
+from django.core.files.storage import storages
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Upper
 from django_celery_results.models import TaskResult
 
-from consultalab.bacen.helpers import has_object
+from consultalab.bacen.querysets import NaturalKeyQuerySet
+from consultalab.bacen.querysets import RequisicaoBacenQuerySet
 from consultalab.core.models import AppModel
 
 User = get_user_model()
@@ -57,13 +63,86 @@ class RequisicaoBacen(AppModel):
         db_column="referencia",
         blank=True,
     )
+    # Etapas do processamento (request_bacen_pix), para medir onde o tempo de
+    # cada consulta foi gasto
+    enfileirada_em = models.DateTimeField(
+        verbose_name="Enviada para processamento em",
+        db_column="enfileirada_em",
+        null=True,
+        blank=True,
+    )
+    iniciada_em = models.DateTimeField(
+        verbose_name="Processamento iniciado em",
+        db_column="iniciada_em",
+        null=True,
+        blank=True,
+    )
+    consulta_concluida_em = models.DateTimeField(
+        verbose_name="Consulta ao Bacen concluída em",
+        db_column="consulta_concluida_em",
+        null=True,
+        blank=True,
+    )
+    participantes_resolvidos_em = models.DateTimeField(
+        verbose_name="Participantes resolvidos em",
+        db_column="participantes_resolvidos_em",
+        null=True,
+        blank=True,
+    )
+    persistida_em = models.DateTimeField(
+        verbose_name="Resultado gravado em",
+        db_column="persistida_em",
+        null=True,
+        blank=True,
+    )
 
     history = AuditlogHistoryField()
 
+    objects = RequisicaoBacenQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Requisição Bacen"
         verbose_name_plural = "Requisições Bacen"
         db_table = "REQUISICOES_BACEN"
+        indexes = [
+            # Mesma ordenação da paginação por chave da listagem (KeysetPaginator)
+            models.Index(
+                fields=["user", "-created", "-id"],
+                name="req_bacen_user_created_idx",
+            ),
+            # Requisições ainda não enviadas para processamento
+            models.Index(
+                fields=["-created"],
+                name="req_bacen_pendentes_idx",
+                condition=Q(processada=False),
+            ),
+            # Busca da requisição a partir do TaskResult
+            models.Index(
+                fields=["task_id"],
+                name="req_bacen_task_id_idx",
+                condition=~Q(task_id=""),
+            ),
+            # Período do detalhamento dos tempos de processamento (Administração)
+            models.Index(
+                fields=["persistida_em"],
+                name="req_bacen_persistida_idx",
+                condition=Q(persistida_em__isnull=False),
+            ),
+            # Índices trigram (pg_trgm) sobre UPPER(coluna), a mesma expressão
+            # gerada pelo lookup icontains no PostgreSQL, usados na busca
+            GinIndex(
+                OpClass(Upper("termo_busca"), name="gin_trgm_ops"),
+                name="req_bacen_termo_busca_trgm",
+            ),
+            GinIndex(
+                OpClass(Upper("motivo"), name="gin_trgm_ops"),
+                name="req_bacen_motivo_trgm",
+            ),
+            GinIndex(
+                OpClass(Upper("referencia"), name="gin_trgm_ops"),
+                name="req_bacen_referencia_trgm",
+            ),
+        ]
 
     def __str__(self):
         return f"Requisição {self.tipo_requisicao} | {self.user} | {self.created}"
@@ -113,9 +192,18 @@ class RequisicaoBacen(AppModel):
                 "finished": False,
             },
         }
-        if has_object(TaskResult, task_id=self.task_id):
-            task_result = TaskResult.objects.get(task_id=self.task_id)
-            return task_status[task_result.status]
+        # O status pode vir anotado pelo queryset (with_task_status); senão é
+        # consultado uma única vez e reaproveitado nas chamadas seguintes
+        if not hasattr(self, "task_status"):
+            self.task_status = (
+                TaskResult.objects.filter(task_id=self.task_id)
+                .values_list("status", flat=True)
+                .first()
+                if self.task_id
+                else None
+            )
+        if self.task_status:
+            return task_status[self.task_status]
 
         return {"text": "Aguardando", "icon": "bi bi-clock-history", "finished": False}
 
@@ -244,10 +332,21 @@ class ChavePix(AppModel):
         blank=True,
     )
 
+    # Uma chave aparece uma única vez na resposta de cada requisição
+    natural_key_fields = ("requisicao_bacen", "chave")
+
+    objects = NaturalKeyQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Chave Pix"
         verbose_name_plural = "Chaves Pix"
         db_table = "CHAVES_PIX"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["requisicao_bacen", "chave"],
+                name="chave_pix_requisicao_chave_unica",
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -381,10 +480,22 @@ class EventoVinculo(AppModel):
         blank=True,
     )
 
+    natural_key_fields = ("chave_pix", "tipo_evento", "motivo_evento", "data_evento")
+
+    objects = NaturalKeyQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Evento Vinculo Pix CPF/CNPJ"
         verbose_name_plural = "Eventos Vinculo Pix CPF/CNPJ"
         db_table = "EVENTOS_VINCULO_PIX"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["chave_pix", "tipo_evento", "motivo_evento", "data_evento"],
+                name="evento_vinculo_unico",
+                # Eventos sem data também são considerados repetidos
+                nulls_distinct=False,
+            ),
+        ]
 
     def __str__(self):
         return f"Evento Vinculo - {self.chave_pix} | Tipo: {self.tipo_evento}"
@@ -422,6 +533,149 @@ class EventoVinculo(AppModel):
         return "Desconhecido"
 
 
+def private_storage():
+    return storages["private"]
+
+
+class ImportacaoLote(AppModel):
+    STATUS_PENDENTE = "PENDENTE"
+    STATUS_PROCESSANDO = "PROCESSANDO"
+    STATUS_CONCLUIDA = "CONCLUIDA"
+    # Falhou depois de criar as requisições dos primeiros lotes, que são mantidas
+    STATUS_CONCLUIDA_COM_FALHA = "CONCLUIDA_COM_FALHA"
+    STATUS_FALHOU = "FALHOU"
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, "Pendente"),
+        (STATUS_PROCESSANDO, "Processando"),
+        (STATUS_CONCLUIDA, "Concluída"),
+        (STATUS_CONCLUIDA_COM_FALHA, "Concluída com falha"),
+        (STATUS_FALHOU, "Falhou"),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="importacoes_lote",
+        verbose_name="Usuário",
+    )
+    arquivo = models.FileField(
+        upload_to="importacoes/%Y/%m/",
+        storage=private_storage,
+        verbose_name="Arquivo",
+        db_column="arquivo",
+    )
+    processar_imediatamente = models.BooleanField(
+        default=False,
+        verbose_name="Processar imediatamente",
+        db_column="processar_imediatamente",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDENTE,
+        verbose_name="Status",
+        db_column="status",
+    )
+    total_linhas = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Linhas processadas",
+        db_column="total_linhas",
+    )
+    requisicoes_validas = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Requisições criadas",
+        db_column="requisicoes_validas",
+    )
+    requisicoes_invalidas = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Linhas com erro",
+        db_column="requisicoes_invalidas",
+    )
+    tempo_validacao = models.FloatField(
+        verbose_name="Tempo de validação (s)",
+        db_column="tempo_validacao",
+        blank=True,
+        null=True,
+    )
+    linhas_por_segundo = models.FloatField(
+        verbose_name="Linhas validadas por segundo",
+        db_column="linhas_por_segundo",
+        blank=True,
+        null=True,
+    )
+    mensagem_erro = models.TextField(
+        verbose_name="Mensagem de erro",
+        db_column="mensagem_erro",
+        blank=True,
+    )
+    task_id = models.CharField(
+        max_length=255,
+        verbose_name="ID da Tarefa",
+        db_column="task_id",
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = "Importação em Lote"
+        verbose_name_plural = "Importações em Lote"
+        db_table = "IMPORTACOES_LOTE"
+
+    def __str__(self):
+        return f"Importação {self.arquivo.name} | {self.user} | {self.created}"
+
+    @property
+    def finalizada(self):
+        return self.status in [
+            self.STATUS_CONCLUIDA,
+            self.STATUS_CONCLUIDA_COM_FALHA,
+            self.STATUS_FALHOU,
+        ]
+
+
+class ErroImportacaoLote(AppModel):
+    importacao = models.ForeignKey(
+        ImportacaoLote,
+        on_delete=models.CASCADE,
+        related_name="erros",
+        verbose_name="Importação em Lote",
+    )
+    linha = models.PositiveIntegerField(
+        verbose_name="Linha",
+        db_column="linha",
+    )
+    conteudo = models.TextField(
+        verbose_name="Conteúdo",
+        db_column="conteudo",
+        blank=True,
+    )
+    erro = models.CharField(
+        max_length=255,
+        verbose_name="Erro",
+        db_column="erro",
+    )
+
+    class Meta:
+        verbose_name = "Erro de Importação em Lote"
+        verbose_name_plural = "Erros de Importação em Lote"
+        db_table = "ERROS_IMPORTACAO_LOTE"
+        ordering = ["linha"]
+        indexes = [
+            models.Index(fields=["importacao", "linha"]),
+        ]
+
+    def __str__(self):
+        return f"Linha {self.linha} | {self.erro}"
+
+
 # Auditlog registries
 # ------------------------------------------------------------------------------
-auditlog.register(RequisicaoBacen)
+auditlog.register(
+    RequisicaoBacen,
+    exclude_fields=[
+        "enfileirada_em",
+        "iniciada_em",
+        "consulta_concluida_em",
+        "participantes_resolvidos_em",
+        "persistida_em",
+    ],
+)
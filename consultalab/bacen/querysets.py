@@ -0,0 +1,195 @@
+from auditlog.cid import get_cid
+from auditlog.context import auditlog_disabled
+from auditlog.context import auditlog_value
+from auditlog.diff import model_instance_diff
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Aggregate
+from django.db.models import Count
+from django.db.models import DurationField
+from django.db.models import ExpressionWrapper
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.db.models import Subquery
+from django.utils.encoding import smart_str
+from django_celery_results.models import TaskResult
+
+from consultalab.bacen.helpers import BULK_CREATE_BATCH_SIZE
+from consultalab.bacen.helpers import invalidate_requisicoes_cache
+from consultalab.core.querysets import AppModelCustomQuerySet
+
+# Etapas do processamento de uma requisição: campos de início e de fim
+ETAPAS_PROCESSAMENTO = {
+    "fila": ("enfileirada_em", "iniciada_em"),
+    "consulta": ("iniciada_em", "consulta_concluida_em"),
+    "participantes": ("consulta_concluida_em", "participantes_resolvidos_em"),
+    "persistencia": ("participantes_resolvidos_em", "persistida_em"),
+    "total": ("enfileirada_em", "persistida_em"),
+}
+
+
+class Percentile(Aggregate):
+    """``percentile_cont`` do PostgreSQL; ``fraction`` entre 0 e 1."""
+
+    function = "PERCENTILE_CONT"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+class RequisicaoBacenQuerySet(AppModelCustomQuerySet):
+    BUSCA_FIELDS = ("termo_busca", "motivo", "referencia")
+
+    def with_task_status(self):
+        """
+        Anota o status do TaskResult de cada requisição em ``task_status``, usado
+        por ``RequisicaoBacen.get_status`` sem uma consulta por linha.
+        """
+        return self.annotate(
+            task_status=Subquery(
+                TaskResult.objects.filter(task_id=OuterRef("task_id")).values(
+                    "status",
+                )[:1],
+            ),
+        )
+
+    def busca(self, termo):
+        """
+        Filtra as requisições cujo termo de busca, motivo ou referência contém
+        ``termo``, sem diferenciar maiúsculas de minúsculas.
+
+        No PostgreSQL o ``icontains`` é gerado como ``UPPER(coluna) LIKE
+        UPPER('%termo%')``, expressão coberta pelos índices GIN trigram de
+        ``RequisicaoBacen``; cada predicado vira um Bitmap Index Scan combinado
+        por BitmapOr, em vez de uma varredura sequencial da tabela.
+        """
+        termo = termo.strip()
+        if not termo:
+            return self
+
+        predicado = Q()
+        for field in self.BUSCA_FIELDS:
+            predicado |= Q(**{f"{field}__icontains": termo})
+        return self.filter(predicado)
+
+    def etapas_percentis(self, grupo, percentis=(50, 95)):
+        """
+        Percentis da duração de cada etapa do processamento (ver
+        ``ETAPAS_PROCESSAMENTO``) das requisições concluídas, agrupadas pela
+        expressão ``grupo``.
+
+        Cada linha traz ``grupo``, ``requisicoes`` e ``<etapa>_p<percentil>``
+        (timedelta, ou ``None`` quando nenhuma requisição tem a etapa).
+        """
+        percentis_etapas = {}
+        for etapa, (inicio, fim) in ETAPAS_PROCESSAMENTO.items():
+            duracao = ExpressionWrapper(
+                F(fim) - F(inicio),
+                output_field=DurationField(),
+            )
+            for percentil in percentis:
+                percentis_etapas[f"{etapa}_p{percentil}"] = Percentile(
+                    duracao,
+                    percentil / 100,
+                )
+        return (
+            self.filter(persistida_em__isnull=False)
+            .annotate(grupo=grupo)
+            .values("grupo")
+            .annotate(requisicoes=Count("id"), **percentis_etapas)
+            .order_by("grupo")
+        )
+
+    def bulk_create_with_audit(
+        self,
+        objs,
+        actor=None,
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    ):
+        """
+        Cria as requisições em lote e registra os respectivos LogEntry do auditlog.
+
+        O ``bulk_create`` não dispara os sinais usados pelo auditlog, então as
+        entradas de criação são montadas aqui, da mesma forma que o auditlog faria
+        em ``LogEntry.objects.log_create``, e inseridas também em lote.
+        """
+        with transaction.atomic(using=self.db):
+            objs = self.bulk_create(objs, batch_size=batch_size)
+            if not auditlog_disabled.get():
+                LogEntry.objects.bulk_create(
+                    self._build_create_log_entries(objs, actor),
+                    batch_size=batch_size,
+                )
+        # O bulk_create não dispara post_save
+        for user_id in {obj.user_id for obj in objs}:
+            invalidate_requisicoes_cache(user_id)
+        return objs
+
+    def _build_create_log_entries(self, objs, actor):
+        content_type = ContentType.objects.get_for_model(self.model)
+        try:
+            context = auditlog_value.get()
+        except LookupError:
+            context = {}
+        cid = get_cid()
+
+        return [
+            LogEntry(
+                content_type=content_type,
+                object_pk=str(obj.pk),
+                object_id=obj.pk,
+                object_repr=smart_str(obj),
+                action=LogEntry.Action.CREATE,
+                changes=model_instance_diff(None, obj),
+                actor=actor,
+                actor_email=getattr(actor, "email", None),
+                remote_addr=context.get("remote_addr"),
+                remote_port=context.get("remote_port"),
+                cid=cid,
+            )
+            for obj in objs
+        ]
+
+
+class NaturalKeyQuerySet(AppModelCustomQuerySet):
+    """
+    QuerySet dos models identificados por uma chave natural
+    (``natural_key_fields``, com a restrição de unicidade correspondente).
+    """
+
+    # Mantidos da primeira gravação
+    UPSERT_KEEP_FIELDS = ("created", "uuid")
+
+    def upsert(self, objs, batch_size=BULK_CREATE_BATCH_SIZE):
+        """
+        Grava ``objs`` com ``INSERT ... ON CONFLICT DO UPDATE`` pela chave
+        natural e preenche as pks. Gravar de novo os mesmos dados (nova
+        tentativa de uma tarefa) atualiza as linhas em vez de duplicá-las.
+
+        Objetos com a mesma chave natural ficam com a última ocorrência: o
+        PostgreSQL não atualiza a mesma linha duas vezes no mesmo comando.
+        """
+        opts = self.model._meta  # noqa: SLF001
+        natural_key = self.model.natural_key_fields
+        key_fields = [opts.get_field(name) for name in natural_key]
+        unicos = {
+            tuple(getattr(obj, field.attname) for field in key_fields): obj
+            for obj in objs
+        }
+        update_fields = [
+            field.name
+            for field in opts.concrete_fields
+            if not field.primary_key
+            and field.name not in natural_key
+            and field.name not in self.UPSERT_KEEP_FIELDS
+        ]
+        return self.bulk_create(
+            unicos.values(),
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=natural_key,
+            update_fields=update_fields,
+        )
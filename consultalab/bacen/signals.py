@@ -0,0 +1,46 @@
+from celery.signals import task_postrun
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from consultalab.bacen.helpers import invalidate_requisicoes_cache
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.core.events import events_enabled
+from consultalab.core.events import publish_user_event
+
+
+@receiver(post_save, sender=RequisicaoBacen)
+def invalidate_cache_on_create(sender, instance, created, **kwargs):
+    """
+    Invalida o cache das requisições do usuário quando uma nova é criada.
+    """
+    if created:
+        invalidate_requisicoes_cache(instance.user_id)
+
+
+@receiver(post_delete, sender=RequisicaoBacen)
+def invalidate_cache_on_delete(sender, instance, **kwargs):
+    """
+    Invalida o cache das requisições do usuário quando uma é removida.
+    """
+    invalidate_requisicoes_cache(instance.user_id)
+
+
+@task_postrun.connect
+def notify_requisicao_finished(sender=None, task_id=None, args=None, state=None, **kw):
+    """
+    Avisa o usuário (pelo websocket) que a consulta terminou e o relatório já
+    pode ser gerado. Roda após o resultado ser gravado no backend, então a
+    linha atualizada pelo navegador já mostra o status final.
+    """
+    if sender is None or sender.name != "request_bacen_pix" or not events_enabled():
+        return
+    requisicao = (
+        RequisicaoBacen.objects.filter(id=args[0]).values("id", "user_id").first()
+    )
+    if requisicao:
+        publish_user_event(
+            requisicao["user_id"],
+            "requisicao",
+            {"requisicao": requisicao["id"], "status": state},
+        )
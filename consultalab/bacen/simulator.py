@@ -0,0 +1,217 @@
+"""
+Simulador local das APIs do DICT e de Informes do Bacen.
+
+Aplicação ASGI que responde ``/consultar-vinculos-pix``,
+``/consultar-vinculo-pix`` e ``/pessoasJuridicas`` a partir das respostas de
+exemplo em ``samples/response_pix_*.json``, para medir a vazão e a latência
+de ``BacenRequestApi`` e do worker sem depender dos serviços reais. Iniciado
+pelo comando ``simular_bacen``; basta apontar ``BACEN_API_DICT_BASEURL`` e
+``BACEN_API_INFORMES`` para ele.
+
+A latência de cada resposta segue uma distribuição log-normal (mediana e
+dispersão configuráveis, o que produz a cauda longa típica de APIs
+externas), uma fração das requisições pode falhar com 500 ou 429 e o número
+de vínculos por CPF/CNPJ pode ser multiplicado para simular respostas
+maiores. ``/estatisticas`` devolve os contadores acumulados.
+"""
+
+import asyncio
+import copy
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from django.conf import settings
+
+CNPJ_LENGTH = 14
+RETRY_AFTER_SECONDS = 1
+
+
+def load_samples(samples_dir=None) -> dict:
+    samples_dir = Path(samples_dir or Path(settings.BASE_DIR) / "samples")
+    samples = {}
+    for nome in ("cpf", "cnpj", "chave"):
+        with (samples_dir / f"response_pix_{nome}.json").open() as f:
+            samples[nome] = json.load(f)
+    return samples
+
+
+class BacenSimulator:
+    """
+    Aplicação ASGI do simulador.
+
+    ``latencia_mediana`` (segundos) e ``latencia_dispersao`` (sigma da
+    log-normal; 0 para latência fixa) definem o atraso de cada resposta;
+    ``taxa_erro`` e ``taxa_429`` são as frações de respostas 500 e 429; e
+    ``escala`` multiplica o número de vínculos de uma consulta por CPF/CNPJ.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        latencia_mediana=0.05,
+        latencia_dispersao=0.5,
+        taxa_erro=0.0,
+        taxa_429=0.0,
+        escala=1.0,
+        seed=None,
+        samples=None,
+    ):
+        self.latencia_mediana = latencia_mediana
+        self.latencia_dispersao = latencia_dispersao
+        self.taxa_erro = taxa_erro
+        self.taxa_429 = taxa_429
+        self.escala = escala
+        self.random = random.Random(seed)  # noqa: S311
+        self.samples = samples or load_samples()
+        self.routes = {
+            "/consultar-vinculos-pix": self.vinculos_pix,
+            "/consultar-vinculo-pix": self.vinculo_pix,
+            "/pessoasJuridicas": self.pessoas_juridicas,
+        }
+        self.estatisticas = Counter()
+        self.inicio = time.monotonic()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"]
+        params = {
+            key: values[0]
+            for key, values in parse_qs(scope["query_string"].decode()).items()
+        }
+        if path.endswith("/estatisticas"):
+            await self._respond(send, HTTPStatus.OK, self.get_estatisticas())
+            return
+
+        handler = next(
+            (handler for route, handler in self.routes.items() if path.endswith(route)),
+            None,
+        )
+        if handler is None:
+            await self._respond(send, HTTPStatus.NOT_FOUND, {"erro": "Não encontrado"})
+            return
+
+        await asyncio.sleep(self.sample_latency())
+        status, body, headers = self.choose_failure() or (
+            HTTPStatus.OK,
+            handler(params),
+            [],
+        )
+        self.estatisticas[f"{path.rsplit('/', 1)[-1]} {status.value}"] += 1
+        await self._respond(send, status, body, headers)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _respond(send, status, body, headers=()):
+        content = json.dumps(body).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(content)).encode()),
+                    *headers,
+                ],
+            },
+        )
+        await send({"type": "http.response.body", "body": content})
+
+    def sample_latency(self) -> float:
+        if self.latencia_mediana <= 0:
+            return 0
+        if self.latencia_dispersao <= 0:
+            return self.latencia_mediana
+        return self.random.lognormvariate(
+            math.log(self.latencia_mediana),
+            self.latencia_dispersao,
+        )
+
+    def choose_failure(self):
+        """Sorteia uma falha (status, corpo, cabeçalhos) ou ``None``."""
+        sorteio = self.random.random()
+        if sorteio < self.taxa_429:
+            return (
+                HTTPStatus.TOO_MANY_REQUESTS,
+                {"erro": "Limite de requisições excedido"},
+                [(b"retry-after", str(RETRY_AFTER_SECONDS).encode())],
+            )
+        if sorteio < self.taxa_429 + self.taxa_erro:
+            return (
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"erro": "Erro interno simulado"},
+                [],
+            )
+        return None
+
+    def vinculos_pix(self, params) -> dict:
+        cpf_cnpj = params.get("cpfCnpj", "")
+        sample = self.samples["cnpj" if len(cpf_cnpj) == CNPJ_LENGTH else "cpf"]
+        modelos = sample["vinculosPix"]
+        total = max(1, round(len(modelos) * self.escala))
+
+        vinculos = []
+        for i in range(total):
+            vinculo = copy.deepcopy(modelos[i % len(modelos)])
+            if i >= len(modelos):
+                # Cópias extras recebem chaves aleatórias novas
+                vinculo["chave"] = str(uuid.UUID(int=self.random.getrandbits(128)))
+                vinculo["tipoChave"] = "CHAVE_ALEATORIA"
+            self._set_titular(vinculo, cpf_cnpj)
+            vinculos.append(vinculo)
+        return {"vinculosPix": vinculos}
+
+    def vinculo_pix(self, params) -> dict:
+        vinculo = copy.deepcopy(self.samples["chave"])
+        if chave := params.get("chave"):
+            vinculo["chave"] = chave
+            for evento in vinculo.get("eventosVinculo", []):
+                evento["chave"] = chave
+        return vinculo
+
+    @staticmethod
+    def pessoas_juridicas(params) -> dict:
+        cnpj = params.get("cnpj", "")
+        return {
+            "cnpj": cnpj,
+            "nome": f"INSTITUICAO SIMULADA {cnpj}",
+            "codigoCompensacao": int(cnpj[-3:]) if cnpj[-3:].isdigit() else None,
+        }
+
+    @staticmethod
+    def _set_titular(vinculo, cpf_cnpj):
+        if not cpf_cnpj:
+            return
+        vinculo["cpfCnpj"] = cpf_cnpj
+        for evento in vinculo.get("eventosVinculo", []):
+            evento["cpfCnpj"] = cpf_cnpj
+            evento["chave"] = vinculo["chave"]
+            evento["tipoChave"] = vinculo["tipoChave"]
+
+    def get_estatisticas(self) -> dict:
+        total = sum(self.estatisticas.values())
+        duracao = time.monotonic() - self.inicio
+        return {
+            "requisicoes": total,
+            "por_segundo": round(total / duracao, 2) if duracao else 0,
+            "respostas": dict(self.estatisticas),
+        }
@@ -0,0 +1,419 @@
+"""
+Geração de dados sintéticos em volume de produção, para benchmarks.
+
+Gera ``RequisicaoBacen``, ``ChavePix``, ``EventoVinculo`` e os ``TaskResult``
+das requisições processadas com distribuições próximas às reais:
+
+- poucos analistas concentram a maior parte das requisições;
+- parte das buscas repete documentos muito consultados;
+- o número de chaves por CPF/CNPJ tem cauda longa (Pareto), com CNPJs
+  concentrando mais chaves, e parte das buscas não encontra nada;
+- cada chave tem o evento de criação e, às vezes, trocas de conta
+  (pares EXCLUIDO/CRIADO);
+- os participantes seguem a participação aproximada das instituições no Pix;
+- as etapas do processamento têm durações log-normais.
+
+As linhas são inseridas com ``COPY`` em lotes, com os ids reservados nas
+sequências das tabelas antes, para que as chaves estrangeiras já sejam
+conhecidas ao montar os lotes. Os ``LogEntry`` de criação não são gerados.
+"""
+
+import functools
+import itertools
+import json
+import math
+import uuid
+from datetime import timedelta
+
+from django.db import connection
+from django.db import models
+from django.db import transaction
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+from consultalab.bacen.models import ChavePix
+from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.models import RequisicaoBacen
+
+SYNTHETIC_BATCH_SIZE = 5000  # Requisições por lote (e por transação)
+SYNTHETIC_MOTIVO = "Dados sintéticos"
+CNPJ_LENGTH = 14
+
+# (ISPB, código de compensação, nome, peso)
+PARTICIPANTES = [
+    ("18236120", 260, "NU PAGAMENTOS S.A.", 30),
+    ("60701190", 341, "ITAU UNIBANCO S.A.", 12),
+    ("00000000", 1, "BANCO DO BRASIL S.A.", 11),
+    ("00360305", 104, "CAIXA ECONOMICA FEDERAL", 11),
+    ("60746948", 237, "BANCO BRADESCO S.A.", 9),
+    ("90400888", 33, "BANCO SANTANDER (BRASIL) S.A.", 6),
+    ("00416968", 77, "BANCO INTER S.A.", 6),
+    ("22896431", 380, "PICPAY", 5),
+    ("10573521", 323, "MERCADO PAGO IP LTDA.", 5),
+    ("31872495", 336, "BANCO C6 S.A.", 4),
+    ("92894922", 212, "BANCO ORIGINAL S.A.", 1),
+]
+TIPOS_CHAVE_CPF = [
+    ("CHAVE_ALEATORIA", 45),
+    ("CPF", 25),
+    ("EMAIL", 18),
+    ("TELEFONE", 12),
+]
+TIPOS_CHAVE_CNPJ = [
+    ("CHAVE_ALEATORIA", 60),
+    ("CNPJ", 25),
+    ("EMAIL", 10),
+    ("TELEFONE", 5),
+]
+TIPOS_CONTA = [("CONTA_CORRENTE", 55), ("CONTA_PAGAMENTO", 35), ("CONTA_POUPANCA", 10)]
+MOTIVOS_TROCA = ["MUDANCA_AGENCIA", "RECONCILIACAO"]
+NOMES = ["MARIA", "JOSE", "ANA", "JOAO", "ANTONIO", "FRANCISCA", "CARLOS", "PAULO"]
+SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "RODRIGUES", "FERREIRA", "ALVES"]
+
+PROPORCAO_CNPJ = 0.15  # Buscas por CPF/CNPJ que são de CNPJ
+PROPORCAO_CHAVE = 0.15  # Requisições de busca por chave (tipo "2")
+PROPORCAO_REPETIDA = 0.3  # Buscas que repetem um documento muito consultado
+PROPORCAO_SEM_RESULTADO = 0.1  # Buscas por CPF/CNPJ sem nenhuma chave
+PROPORCAO_PROCESSADA = 0.9
+PROPORCAO_FALHA = 0.05  # Requisições processadas cuja tarefa falhou
+DOCUMENTOS_QUENTES = 1000  # Tamanho do conjunto de documentos muito consultados
+ALPHA_ANALISTAS = 1.2  # Pareto da escolha do analista (menor = mais concentrado)
+ALPHA_CHAVES_CPF = 1.3  # Pareto do número de chaves por CPF
+ALPHA_CHAVES_CNPJ = 0.9
+MAX_CHAVES_CPF = 50
+MAX_CHAVES_CNPJ = 200
+PROB_TROCA_CONTA = 0.3  # Chance de cada nova troca de conta de uma chave
+# Mediana e sigma (log-normal), em segundos, de cada etapa do processamento
+ETAPAS = [
+    ("iniciada_em", 0.5, 1.2),
+    ("consulta_concluida_em", 1.5, 0.6),
+    ("participantes_resolvidos_em", 0.2, 0.8),
+    ("persistida_em", 0.1, 1.0),
+]
+
+
+def _digito(numeros, pesos):
+    resto = sum(n * p for n, p in zip(numeros, pesos, strict=False)) % 11
+    return 11 - resto if resto > 1 else 0
+
+
+def generate_cpf(rng) -> str:
+    numeros = [rng.randrange(10) for _ in range(9)]
+    numeros.append(_digito(numeros, range(10, 1, -1)))
+    numeros.append(_digito(numeros, range(11, 1, -1)))
+    return "".join(map(str, numeros))
+
+
+def generate_cnpj(rng) -> str:
+    numeros = [rng.randrange(10) for _ in range(8)] + [0, 0, 0, 1]
+    numeros.append(_digito(numeros, [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+    numeros.append(_digito(numeros, [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+    return "".join(map(str, numeros))
+
+
+def _weighted(rng, opcoes):
+    valores, pesos = zip(*opcoes, strict=True)
+    return rng.choices(valores, weights=pesos)[0]
+
+
+def _pareto(rng, alpha, maximo):
+    return min(int(rng.paretovariate(alpha)), maximo)
+
+
+def reserve_ids(model, quantidade) -> list[int]:
+    """Reserva ``quantidade`` ids na sequência da tabela do model."""
+    if not quantidade:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+            "FROM generate_series(1, %s)",
+            [connection.ops.quote_name(model._meta.db_table), quantidade],  # noqa: SLF001
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def assign_ids(model, rows) -> None:
+    for row, pk in zip(rows, reserve_ids(model, len(rows)), strict=True):
+        row["id"] = pk
+
+
+def copy_rows(model, rows) -> None:
+    """
+    Insere ``rows`` (dicionários por ``attname``) com ``COPY``. Os campos
+    ausentes recebem o default do model.
+
+    Os valores já são gerados nos tipos do banco; apenas os JSON são
+    adaptados (``get_db_prep_save`` por campo e linha dominaria o tempo).
+    """
+    if not rows:
+        return
+    fields = model._meta.concrete_fields  # noqa: SLF001
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    table = connection.ops.quote_name(model._meta.db_table)  # noqa: SLF001
+    conversores = [
+        (
+            field.attname,
+            field.get_default,
+            functools.partial(connection.ops.adapt_json_value, encoder=field.encoder)
+            if isinstance(field, models.JSONField)
+            else None,
+        )
+        for field in fields
+    ]
+    with (
+        connection.cursor() as cursor,
+        cursor.cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy,
+    ):
+        for row in rows:
+            valores = []
+            for attname, default, converter in conversores:
+                valor = row[attname] if attname in row else default()
+                if converter is not None and valor is not None:
+                    valor = converter(valor)
+                valores.append(valor)
+            copy.write_row(valores)
+
+
+class SyntheticDataGenerator:
+    """
+    Gera os dados em lotes de ``batch_size`` requisições, distribuídas entre
+    os ``users`` ao longo dos últimos ``dias``.
+    """
+
+    def __init__(self, users, rng, *, dias=365, batch_size=SYNTHETIC_BATCH_SIZE):
+        self.users = list(users)
+        self.rng = rng
+        self.dias = dias
+        self.batch_size = batch_size
+        self.agora = timezone.now()
+        self.quentes = []
+        self.participantes = [
+            ((ispb, codigo, nome), peso) for ispb, codigo, nome, peso in PARTICIPANTES
+        ]
+
+    def generate(self, total, progress=None):
+        """Gera ``total`` requisições; retorna os totais por tabela."""
+        totais = {"requisicoes": 0, "chaves": 0, "eventos": 0, "tarefas": 0}
+        for inicio in range(0, total, self.batch_size):
+            quantidade = min(self.batch_size, total - inicio)
+            with transaction.atomic():
+                lote = self.generate_batch(quantidade)
+            for nome, valor in lote.items():
+                totais[nome] += valor
+            if progress:
+                progress(totais)
+        return totais
+
+    def generate_batch(self, quantidade):
+        requisicoes = [self._requisicao() for _ in range(quantidade)]
+        assign_ids(RequisicaoBacen, requisicoes)
+        chaves = list(
+            itertools.chain.from_iterable(self._chaves(r) for r in requisicoes),
+        )
+        assign_ids(ChavePix, chaves)
+        eventos = list(itertools.chain.from_iterable(self._eventos(c) for c in chaves))
+        assign_ids(EventoVinculo, eventos)
+        tarefas = [self._tarefa(r) for r in requisicoes if r["processada"]]
+        assign_ids(TaskResult, tarefas)
+
+        copy_rows(RequisicaoBacen, requisicoes)
+        copy_rows(ChavePix, chaves)
+        copy_rows(EventoVinculo, eventos)
+        copy_rows(TaskResult, tarefas)
+        return {
+            "requisicoes": len(requisicoes),
+            "chaves": len(chaves),
+            "eventos": len(eventos),
+            "tarefas": len(tarefas),
+        }
+
+    def _data(self, depois=None):
+        inicio = depois or self.agora - timedelta(days=self.dias)
+        segundos = max((self.agora - inicio).total_seconds(), 0)
+        return inicio + timedelta(seconds=self.rng.uniform(0, segundos))
+
+    def _documento(self):
+        if self.quentes and self.rng.random() < PROPORCAO_REPETIDA:
+            return self.rng.choice(self.quentes)
+        if self.rng.random() < PROPORCAO_CNPJ:
+            documento = generate_cnpj(self.rng)
+        else:
+            documento = generate_cpf(self.rng)
+        if len(self.quentes) < DOCUMENTOS_QUENTES:
+            self.quentes.append(documento)
+        return documento
+
+    def _requisicao(self):
+        analista = self.users[
+            (_pareto(self.rng, ALPHA_ANALISTAS, len(self.users)) - 1) % len(self.users)
+        ]
+        created = self._data()
+        processada = self.rng.random() < PROPORCAO_PROCESSADA
+        por_chave = self.rng.random() < PROPORCAO_CHAVE
+        return {
+            **(self._etapas(created) if processada else {}),
+            "created": created,
+            "modified": created,
+            "user_id": analista.id,
+            "tipo_requisicao": "2" if por_chave else "1",
+            "termo_busca": (
+                f"{uuid.UUID(int=self.rng.getrandbits(128))}"
+                if por_chave
+                else self._documento()
+            ),
+            "motivo": SYNTHETIC_MOTIVO,
+            "processada": processada,
+            "task_id": str(uuid.UUID(int=self.rng.getrandbits(128)))
+            if processada
+            else "",
+        }
+
+    def _etapas(self, created):
+        etapas = {"enfileirada_em": created}
+        momento = created
+        for campo, mediana, sigma in ETAPAS:
+            momento += timedelta(
+                seconds=self.rng.lognormvariate(math.log(mediana), sigma),
+            )
+            etapas[campo] = momento
+        return etapas
+
+    def _titular(self, documento):
+        if len(documento) == CNPJ_LENGTH:
+            return f"{self.rng.choice(SOBRENOMES)} COMERCIO LTDA"
+        return f"{self.rng.choice(NOMES)} {self.rng.choice(SOBRENOMES)}"
+
+    def _chaves(self, requisicao):
+        if not requisicao["processada"]:
+            return []
+        termo = requisicao["termo_busca"]
+        chave_buscada = None
+        if requisicao["tipo_requisicao"] == "2":
+            # Busca por chave aleatória: um único vínculo, com a própria chave
+            documento, quantidade, chave_buscada = generate_cpf(self.rng), 1, termo
+        elif self.rng.random() < PROPORCAO_SEM_RESULTADO:
+            return []
+        elif len(termo) == CNPJ_LENGTH:
+            documento = termo
+            quantidade = _pareto(self.rng, ALPHA_CHAVES_CNPJ, MAX_CHAVES_CNPJ)
+        else:
+            documento = termo
+            quantidade = _pareto(self.rng, ALPHA_CHAVES_CPF, MAX_CHAVES_CPF)
+
+        nome = self._titular(documento)
+        tipos = TIPOS_CHAVE_CNPJ if len(documento) == CNPJ_LENGTH else TIPOS_CHAVE_CPF
+        chaves = []
+        valores = set()
+        for _ in range(quantidade):
+            tipo_chave = (
+                "CHAVE_ALEATORIA" if chave_buscada else _weighted(self.rng, tipos)
+            )
+            valor = chave_buscada or self._valor_chave(tipo_chave, documento)
+            # O CPF/CNPJ é uma única chave por titular (ChavePix.natural_key_fields)
+            if valor in valores:
+                continue
+            valores.add(valor)
+            ispb, codigo, banco = _weighted(self.rng, self.participantes)
+            abertura = self._data()
+            criacao = self._data(depois=abertura)
+            chaves.append(
+                {
+                    "created": requisicao["created"],
+                    "modified": requisicao["created"],
+                    "requisicao_bacen_id": requisicao["id"],
+                    "chave": valor,
+                    "tipo_chave": tipo_chave,
+                    "status": "ATIVO",
+                    "cpf_cnpj": documento,
+                    "nome_proprietario": nome,
+                    "nome_fantasia": "",
+                    "participante": {
+                        "cnpj": ispb,
+                        "nome": banco,
+                        "codigoCompensacao": codigo,
+                    },
+                    "agencia": str(self.rng.randint(1, 9999)),
+                    "numero_conta": str(self.rng.randint(10000, 999999999)),
+                    "tipo_conta": _weighted(self.rng, TIPOS_CONTA),
+                    "data_abertura_conta": abertura,
+                    "proprietario_da_chave_desde": criacao,
+                    "data_criacao": criacao,
+                    "ultima_modificacao": criacao,
+                },
+            )
+        return chaves
+
+    def _valor_chave(self, tipo_chave, documento):
+        if tipo_chave in ("CPF", "CNPJ"):
+            return documento
+        if tipo_chave == "EMAIL":
+            return f"{self.rng.getrandbits(32):x}@email.com"
+        if tipo_chave == "TELEFONE":
+            return f"+55{self.rng.randint(11, 99)}9{self.rng.randint(10**7, 10**8 - 1)}"
+        return str(uuid.UUID(int=self.rng.getrandbits(128)))
+
+    def _eventos(self, chave):
+        campos = {
+            "chave_pix_id": chave["id"],
+            "chave": chave["chave"],
+            "tipo_chave": chave["tipo_chave"],
+            "cpf_cnpj": chave["cpf_cnpj"],
+            "nome_proprietario": chave["nome_proprietario"],
+            "nome_fantasia": "",
+            "participante": chave["participante"],
+            "agencia": chave["agencia"],
+            "numero_conta": chave["numero_conta"],
+            "tipo_conta": chave["tipo_conta"],
+            "data_abertura_conta": chave["data_abertura_conta"],
+            "created": chave["created"],
+            "modified": chave["created"],
+        }
+        data = chave["data_criacao"]
+        eventos = [
+            {
+                **campos,
+                "tipo_evento": "CRIADO",
+                "motivo_evento": "SOLICITADO_USUARIO",
+                "data_evento": data,
+            },
+        ]
+        # Cada troca de conta gera a exclusão do vínculo anterior e a criação
+        # do novo
+        while self.rng.random() < PROB_TROCA_CONTA:
+            data = self._data(depois=data)
+            motivo = self.rng.choice(MOTIVOS_TROCA)
+            eventos.extend(
+                {
+                    **campos,
+                    "tipo_evento": tipo_evento,
+                    "motivo_evento": motivo,
+                    "data_evento": data,
+                }
+                for tipo_evento in ("EXCLUIDO", "CRIADO")
+            )
+        return eventos
+
+    def _tarefa(self, requisicao):
+        falhou = self.rng.random() < PROPORCAO_FALHA
+        concluida = requisicao["persistida_em"]
+        if falhou:
+            # A falha interrompe o processamento logo após a consulta
+            requisicao["participantes_resolvidos_em"] = None
+            requisicao["persistida_em"] = None
+            concluida = requisicao["consulta_concluida_em"]
+        return {
+            "task_id": requisicao["task_id"],
+            "task_name": "request_bacen_pix",
+            "task_args": json.dumps([requisicao["id"]]),
+            "task_kwargs": "{}",
+            "status": "FAILURE" if falhou else "SUCCESS",
+            "content_type": "application/json",
+            "content_encoding": "utf-8",
+            "result": json.dumps(
+                {"exc_type": "TaskFailureError"} if falhou else {"status": "success"},
+            ),
+            "date_created": requisicao["created"],
+            "date_started": requisicao["iniciada_em"],
+            "date_done": concluida,
+        }
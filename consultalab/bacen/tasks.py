@@ -1,11 +1,31 @@
 import logging
+from itertools import batched
 
+from celery import group
 from celery import shared_task
+from celery.utils import uuid
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError
+from django.db import OperationalError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 
 from consultalab.bacen.api import BacenRequestApi
+from consultalab.bacen.forms import BulkRequestForm
+from consultalab.bacen.helpers import BULK_CREATE_BATCH_SIZE
+from consultalab.bacen.helpers import BULK_DISPATCH_BATCH_SIZE
+from consultalab.bacen.helpers import REQUEST_PIX_MAX_RETRIES
 from consultalab.bacen.helpers import clean_chave_pix_data
 from consultalab.bacen.models import ChavePix
+from consultalab.bacen.models import ErroImportacaoLote
+from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.models import ImportacaoLote
 from consultalab.bacen.models import RequisicaoBacen
+from consultalab.core.events import publish_user_event
+from consultalab.core.metrics import TASK_STAGE_DURATION
+from consultalab.core.tracing import traced_queries
+from consultalab.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +34,23 @@ class TaskFailureError(Exception):
     pass
 
 
-@shared_task(name="request_bacen_pix")
+class TransientTaskError(TaskFailureError):
+    """Falha temporária (rede, 429 ou 5xx do Bacen): a tarefa é repetida."""
+
+
+@shared_task(
+    name="request_bacen_pix",
+    # Confirmada apenas ao terminar, e devolvida à fila também quando o
+    # processo do worker morre no meio (SIGKILL, falta de memória), o que sem
+    # reject_on_worker_lost seria confirmado como falha. As chaves são gravadas
+    # por upsert (save_chaves_pix), então repetir a tarefa não duplica os
+    # resultados.
+    acks_late=True,
+    reject_on_worker_lost=True,
+    autoretry_for=(TransientTaskError, OperationalError),
+    retry_backoff=True,
+    max_retries=REQUEST_PIX_MAX_RETRIES,
+)
 def request_bacen_pix(requisicao_id: int) -> dict:
     """
     Tarefa Celery para buscar informações de PIX por CPF ou CNPJ.
@@ -28,24 +64,48 @@ def request_bacen_pix(requisicao_id: int) -> dict:
         logger.error(msg)
         raise TaskFailureError(msg)
 
-    logger.info("Iniciando consulta na API do Bacen...")
-    api = BacenRequestApi()
-    if requisicao.tipo_requisicao == "1":
-        search_type = "CPF/CNPJ"
-        response = api.get_pix_by_cpf_cnpj(value, reason)
-    else:
-        search_type = "chave"
-        response = api.get_pix_by_key(value, reason)
+    etapas = {"iniciada_em": timezone.now()}
+    concluida = False
+    try:
+        logger.info("Iniciando consulta na API do Bacen...")
+        api = BacenRequestApi()
+        with TASK_STAGE_DURATION.labels("request_bacen_pix", "consulta").time():
+            if requisicao.tipo_requisicao == "1":
+                search_type = "CPF/CNPJ"
+                response = api.get_pix_by_cpf_cnpj(value, reason)
+            else:
+                search_type = "chave"
+                response = api.get_pix_by_key(value, reason)
+        etapas.update(api.etapas)
 
-    logger.info("Concluído busca de PIX por %s: %s", search_type, value)
+        logger.info("Concluído busca de PIX por %s: %s", search_type, value)
 
-    if response.get("status") != "success":
-        raise TaskFailureError(response.get("message", "Erro desconhecido"))
+        if response.get("status") != "success":
+            error = (
+                TransientTaskError if response.get("transient") else TaskFailureError
+            )
+            raise error(response.get("message", "Erro desconhecido"))
 
-    logger.info('Tarefa de busca de PIX do valor "%s" concluída com sucesso.', value)
+        logger.info(
+            'Tarefa de busca de PIX do valor "%s" concluída com sucesso.',
+            value,
+        )
 
-    chaves = response.get("data", [])
-    [create_chave_pix(chave, requisicao) for chave in chaves]
+        chaves = response.get("data", [])
+        with (
+            TASK_STAGE_DURATION.labels("request_bacen_pix", "persistencia").time(),
+            tracer.start_as_current_span(
+                "request_bacen_pix.persistencia",
+                attributes={"chaves": len(chaves)},
+            ),
+            traced_queries(),
+        ):
+            save_chaves_pix(chaves, requisicao)
+        etapas["persistida_em"] = timezone.now()
+        concluida = True
+    finally:
+        # Gravadas também quando a consulta falha
+        _save_etapas(requisicao, etapas, raise_errors=concluida)
 
     return {
         "status": "success",
@@ -54,12 +114,196 @@ def request_bacen_pix(requisicao_id: int) -> dict:
     }
 
 
-def create_chave_pix(chave: dict, requisicao: RequisicaoBacen) -> None:
-    clean_data = clean_chave_pix_data(chave)
-    clean_data["requisicao_bacen"] = requisicao
-    eventos = clean_data.pop("eventos_vinculo", [])
+def _save_etapas(
+    requisicao: RequisicaoBacen,
+    etapas: dict,
+    *,
+    raise_errors: bool,
+) -> None:
+    """
+    Grava os horários das etapas da requisição. Se a tarefa já está falhando
+    (``raise_errors=False``), um erro do banco aqui só vai para o log, para não
+    esconder o erro original.
+    """
+    try:
+        # O update não passa pelo auditlog, e as etapas nem fazem parte do
+        # histórico da requisição
+        RequisicaoBacen.objects.filter(id=requisicao.id).update(**etapas)
+    except DatabaseError:
+        if raise_errors:
+            raise
+        logger.exception("Erro ao gravar as etapas da requisição %s", requisicao.id)
+
+
+def save_chaves_pix(chaves: list[dict], requisicao: RequisicaoBacen) -> None:
+    """
+    Grava as chaves da resposta do DICT e os eventos de cada uma com um upsert
+    por tabela, pelas chaves naturais (requisição + chave e chave + tipo,
+    motivo e data do evento). Uma nova tentativa da tarefa, após uma falha no
+    meio da gravação, completa e atualiza os dados já gravados.
+    """
+    por_chave = {}
+    for chave in chaves:
+        clean_data = clean_chave_pix_data(chave)
+        eventos = clean_data.pop("eventos_vinculo", [])
+        chave_pix = ChavePix(requisicao_bacen=requisicao, **clean_data)
+        por_chave[chave_pix.chave] = (chave_pix, eventos)
+
+    with transaction.atomic():
+        ChavePix.objects.upsert(chave_pix for chave_pix, _ in por_chave.values())
+        EventoVinculo.objects.upsert(
+            EventoVinculo(chave_pix=chave_pix, **evento)
+            for chave_pix, eventos in por_chave.values()
+            for evento in eventos
+        )
+
+
+def dispatch_requisicoes(
+    requisicoes: list[RequisicaoBacen],
+    batch_size: int = BULK_DISPATCH_BATCH_SIZE,
+) -> None:
+    """
+    Envia várias requisições para processamento em lotes de tarefas Celery.
+
+    Os ``task_id`` são gerados antes do envio para que ``task_id`` e
+    ``processada`` sejam gravados com um único UPDATE por lote, e cada grupo só
+    é publicado após o commit da transação, garantindo que o worker encontre as
+    requisições no banco.
+    """
+    for lote in batched(requisicoes, batch_size):
+        assinaturas = []
+        enfileirada_em = timezone.now()
+        for requisicao in lote:
+            requisicao.task_id = uuid()
+            requisicao.processada = True
+            requisicao.enfileirada_em = enfileirada_em
+            assinaturas.append(
+                request_bacen_pix.s(requisicao.id).set(task_id=requisicao.task_id),
+            )
+
+        RequisicaoBacen.objects.bulk_update(
+            lote,
+            ["task_id", "processada", "enfileirada_em"],
+        )
+
+        transaction.on_commit(group(assinaturas).apply_async)
+        logger.info("Lote de %s requisições agendado para processamento.", len(lote))
+
+
+@shared_task(name="process_bulk_upload")
+def process_bulk_upload(importacao_id: int) -> dict:
+    """
+    Tarefa Celery que valida o arquivo de uma importação em lote e cria as
+    requisições válidas e os erros encontrados, em lotes.
+
+    Cada lote é gravado (e despachado) em sua própria transação. Se um lote
+    posterior falhar, os anteriores são mantidos e a importação fica como
+    "concluída com falha", com os contadores do que foi criado. Ao final, o
+    arquivo enviado é removido do storage.
+    """
+    importacao = ImportacaoLote.objects.select_related("user").get(id=importacao_id)
+    importacao.status = ImportacaoLote.STATUS_PROCESSANDO
+    importacao.save(update_fields=["status", "modified"])
+
+    form = BulkRequestForm(files={"arquivo_txt": importacao.arquivo})
+    if not form.is_valid():
+        _finish_bulk_upload(importacao, form, " ".join(form.errors["arquivo_txt"]))
+        return {
+            "status": importacao.status,
+            "importacao": importacao_id,
+        }
+
+    mensagem_erro = ""
+    try:
+        lotes = batched(form.iter_file(importacao.user), BULK_CREATE_BATCH_SIZE)
+        for lote in lotes:
+            with transaction.atomic():
+                _save_bulk_upload_batch(importacao, lote)
+            _notify_bulk_upload(importacao)
+    except ValidationError as e:
+        logger.warning("Importação em lote %s inválida: %s", importacao_id, e)
+        mensagem_erro = " ".join(e.messages)
+    except Exception as e:
+        logger.exception("Erro ao processar a importação em lote %s", importacao_id)
+        _finish_bulk_upload(importacao, form, f"Erro ao processar arquivo: {e!s}")
+        raise
+
+    _finish_bulk_upload(importacao, form, mensagem_erro)
+    return {
+        "status": importacao.status,
+        "importacao": importacao_id,
+    }
+
+
+def _finish_bulk_upload(
+    importacao: ImportacaoLote,
+    form: BulkRequestForm,
+    mensagem_erro: str,
+) -> None:
+    """
+    Grava o status final e as métricas da validação da importação e remove o
+    arquivo enviado.
+    """
+    if mensagem_erro:
+        # Os contadores são atualizados por lote, direto no banco
+        importacao.refresh_from_db(
+            fields=["total_linhas", "requisicoes_validas", "requisicoes_invalidas"],
+        )
+        if importacao.total_linhas:
+            importacao.status = ImportacaoLote.STATUS_CONCLUIDA_COM_FALHA
+            mensagem_erro = (
+                f"{mensagem_erro} A importação parou após "
+                f"{importacao.total_linhas} linha(s); as "
+                f"{importacao.requisicoes_validas} requisição(ões) criada(s) "
+                "até esse ponto foram mantidas."
+            )
+        else:
+            importacao.status = ImportacaoLote.STATUS_FALHOU
+    else:
+        importacao.status = ImportacaoLote.STATUS_CONCLUIDA
+    importacao.mensagem_erro = mensagem_erro
+    importacao.tempo_validacao = form.tempo_validacao
+    importacao.linhas_por_segundo = form.linhas_por_segundo
+    importacao.arquivo.delete(save=False)
+    importacao.save(
+        update_fields=[
+            "status",
+            "mensagem_erro",
+            "tempo_validacao",
+            "linhas_por_segundo",
+            "arquivo",
+            "modified",
+        ],
+    )
+    _notify_bulk_upload(importacao)
+
+
+def _notify_bulk_upload(importacao: ImportacaoLote) -> None:
+    """Avisa o navegador do usuário para atualizar o progresso da importação."""
+    publish_user_event(
+        importacao.user_id,
+        "importacao",
+        {"importacao": importacao.id, "status": importacao.status},
+    )
+
+
+def _save_bulk_upload_batch(importacao: ImportacaoLote, lote) -> None:
+    requisicoes = []
+    erros = []
+    for req_data, erro in lote:
+        if erro:
+            erros.append(ErroImportacaoLote(importacao=importacao, **erro))
+        else:
+            requisicoes.append(RequisicaoBacen(**req_data))
 
-    chave_pix = ChavePix.objects.create(**clean_data)
+    RequisicaoBacen.objects.bulk_create_with_audit(requisicoes, actor=importacao.user)
+    ErroImportacaoLote.objects.bulk_create(erros)
+    if importacao.processar_imediatamente:
+        dispatch_requisicoes(requisicoes)
 
-    for evento in eventos:
-        chave_pix.eventos_vinculo.create(**evento)
+    # Atualiza o progresso sem sobrescrever os demais campos da importação
+    ImportacaoLote.objects.filter(id=importacao.id).update(
+        total_linhas=F("total_linhas") + len(lote),
+        requisicoes_validas=F("requisicoes_validas") + len(requisicoes),
+        requisicoes_invalidas=F("requisicoes_invalidas") + len(erros),
+    )
@@ -0,0 +1,69 @@
+"""
+Suíte de microbenchmarks (pytest-benchmark) dos caminhos críticos da ingestão
+das respostas do Bacen e da geração dos relatórios.
+
+Os benchmarks ficam fora da execução normal dos testes (``--benchmark-skip``
+no ``pyproject.toml``). Para executá-los e gravar uma linha de base::
+
+    pytest consultalab/bacen/tests/benchmarks --benchmark-only \\
+        --benchmark-save=baseline
+
+E para comparar com a última linha de base gravada, falhando se a média de
+algum benchmark piorar mais que 15%::
+
+    pytest consultalab/bacen/tests/benchmarks --benchmark-only \\
+        --benchmark-compare --benchmark-compare-fail=mean:15%
+
+As linhas de base ficam em ``.benchmarks/``, separadas por máquina/versão do
+Python, e só são comparáveis quando geradas no mesmo ambiente.
+"""
+
+import copy
+
+import pytest
+
+from consultalab.bacen.simulator import load_samples
+
+PARTICIPANTE = {
+    "nome": "ITAU UNIBANCO S.A.",
+    "cnpj": "60701190",
+    "codigoCompensacao": "341",
+}
+
+
+@pytest.fixture(scope="session")
+def vinculo_template():
+    """Um vínculo da resposta de exemplo do DICT, como devolvido pela API."""
+    vinculo = copy.deepcopy(load_samples()["cpf"]["vinculosPix"][0])
+    vinculo["participante"] = PARTICIPANTE
+    for evento in vinculo["eventosVinculo"]:
+        evento["participante"] = PARTICIPANTE
+    return vinculo
+
+
+@pytest.fixture(scope="session")
+def build_vinculos(vinculo_template):
+    """
+    Gera ``total`` vínculos distintos, cada um com ``eventos`` eventos, a
+    partir do vínculo de exemplo.
+    """
+
+    def build(total, eventos=1):
+        evento_template = vinculo_template["eventosVinculo"][0]
+        vinculos = []
+        for i in range(total):
+            vinculo = copy.deepcopy(vinculo_template)
+            vinculo["chave"] = f"{i:08d}-{vinculo_template['chave'][9:]}"
+            # Eventos distintos (EventoVinculo.natural_key_fields)
+            vinculo["eventosVinculo"] = [
+                {
+                    **evento_template,
+                    "chave": vinculo["chave"],
+                    "dataEvento": f"07/01/2024 21:{j // 60:02d}:{j % 60:02d}",
+                }
+                for j in range(eventos)
+            ]
+            vinculos.append(vinculo)
+        return vinculos
+
+    return build
@@ -0,0 +1,39 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from validate_docbr import CPF
+
+from consultalab.bacen.forms import BulkRequestForm
+
+LINHA_INVALIDA_A_CADA = 10
+
+
+def build_file(linhas):
+    cpf = CPF()
+    conteudo = "\n".join(
+        f"1,{cpf.generate()},BO {i}/2024,REF{i}"
+        if i % LINHA_INVALIDA_A_CADA
+        else f"1,{i:011d},BO {i}/2024"
+        for i in range(linhas)
+    )
+    return conteudo.encode()
+
+
+@pytest.mark.django_db
+@pytest.mark.benchmark(group="BulkRequestForm.process_file")
+@pytest.mark.parametrize("linhas", [100, 1000, 10000])
+def test_process_file(benchmark, user, linhas):
+    conteudo = build_file(linhas)
+
+    def setup():
+        arquivo = SimpleUploadedFile("lote.txt", conteudo, content_type="text/plain")
+        form = BulkRequestForm(files={"arquivo_txt": arquivo})
+        assert form.is_valid()
+        return (form, user), {}
+
+    validas, invalidas = benchmark.pedantic(
+        BulkRequestForm.process_file,
+        setup=setup,
+        rounds=5,
+    )
+
+    assert len(validas) + len(invalidas) == linhas
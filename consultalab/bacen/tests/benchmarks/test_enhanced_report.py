@@ -0,0 +1,60 @@
+import pytest
+from django.utils import timezone
+
+from consultalab.bacen.enhanced_report import EnhancedPixReportGenerator
+from consultalab.bacen.helpers import clean_chave_pix_data
+
+EVENTOS_POR_CHAVE = 5
+BANCO = "341 ITAU UNIBANCO S.A."
+
+
+@pytest.fixture(scope="module")
+def requisicao_data():
+    return {
+        "termo_busca": "00011122233",
+        "tipo_requisicao": "CPF/CNPJ",
+        "motivo": "BO 123/2024",
+        "processada": True,
+        "status": "SUCCESS",
+        "criado_em": timezone.now(),
+        "responsavel": "Analista",
+    }
+
+
+@pytest.fixture(scope="module")
+def build_chaves_pix(build_vinculos):
+    """Chaves no formato de ``RequisicaoBacen.to_dict``."""
+
+    def build(total):
+        chaves = []
+        for vinculo in build_vinculos(total, EVENTOS_POR_CHAVE):
+            chave = clean_chave_pix_data(vinculo)
+            chave["banco"] = BANCO
+            for evento in chave["eventos_vinculo"]:
+                evento["banco"] = BANCO
+            chaves.append(chave)
+        return chaves
+
+    return build
+
+
+@pytest.mark.benchmark(group="EnhancedPixReportGenerator.generate_summary_report")
+@pytest.mark.parametrize("chaves", [10, 100, 500])
+def test_generate_summary_report(benchmark, requisicao_data, build_chaves_pix, chaves):
+    generator = EnhancedPixReportGenerator(report_type="summary")
+    chaves_pix = build_chaves_pix(chaves)
+
+    story = benchmark(generator.generate_summary_report, requisicao_data, chaves_pix)
+
+    assert story
+
+
+@pytest.mark.benchmark(group="EnhancedPixReportGenerator.generate_detailed_report")
+@pytest.mark.parametrize("chaves", [10, 100, 500])
+def test_generate_detailed_report(benchmark, requisicao_data, build_chaves_pix, chaves):
+    generator = EnhancedPixReportGenerator(report_type="detailed")
+    chaves_pix = build_chaves_pix(chaves)
+
+    story = benchmark(generator.generate_detailed_report, requisicao_data, chaves_pix)
+
+    assert story
@@ -0,0 +1,42 @@
+import pytest
+
+from consultalab.bacen.helpers import camelcase_to_snake_case
+from consultalab.bacen.helpers import clean_chave_pix_data
+from consultalab.bacen.helpers import parse_datetime_br
+
+DATAS = {
+    "br": "07/01/2024 21:36:07",
+    "iso": "2024-01-07T21:36:07-03:00",
+    "invalida": "07-01-2024",
+}
+TOTAL_DATAS = 1000
+
+
+@pytest.mark.benchmark(group="parse_datetime_br")
+@pytest.mark.parametrize("formato", DATAS)
+def test_parse_datetime_br(benchmark, formato):
+    datas = [DATAS[formato]] * TOTAL_DATAS
+
+    resultado = benchmark(lambda: [parse_datetime_br(data) for data in datas])
+
+    assert len(resultado) == TOTAL_DATAS
+
+
+@pytest.mark.benchmark(group="camelcase_to_snake_case")
+@pytest.mark.parametrize("chaves", [15, 150, 1500])
+def test_camelcase_to_snake_case(benchmark, chaves):
+    data = {f"campoDoVinculo{i}PixBacen": i for i in range(chaves)}
+
+    resultado = benchmark(camelcase_to_snake_case, data)
+
+    assert len(resultado) == chaves
+
+
+@pytest.mark.benchmark(group="clean_chave_pix_data")
+@pytest.mark.parametrize("eventos", [1, 10, 100])
+def test_clean_chave_pix_data(benchmark, build_vinculos, eventos):
+    (vinculo,) = build_vinculos(1, eventos)
+
+    resultado = benchmark(clean_chave_pix_data, vinculo)
+
+    assert len(resultado["eventos_vinculo"]) == eventos
@@ -0,0 +1,30 @@
+import pytest
+
+from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.tasks import save_chaves_pix
+
+ROUNDS = 20
+
+
+@pytest.mark.django_db
+@pytest.mark.benchmark(group="save_chaves_pix")
+@pytest.mark.parametrize(("chaves", "eventos"), [(1, 1), (10, 10), (50, 5)])
+def test_save_chaves_pix(
+    benchmark,
+    build_vinculos,
+    requisicao_bacen_cpf,
+    chaves,
+    eventos,
+):
+    vinculos = build_vinculos(ROUNDS * chaves, eventos)
+    lotes = iter(
+        vinculos[inicio : inicio + chaves] for inicio in range(0, len(vinculos), chaves)
+    )
+
+    benchmark.pedantic(
+        save_chaves_pix,
+        setup=lambda: ((next(lotes), requisicao_bacen_cpf), {}),
+        rounds=ROUNDS,
+    )
+
+    assert EventoVinculo.objects.count() == ROUNDS * chaves * eventos
@@ -1,7 +1,13 @@
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
+import pytest
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from django.test import TestCase
 
 from consultalab.bacen.forms import BulkRequestForm
@@ -173,3 +179,90 @@ class BulkRequestFormTest(TestCase):
 
                 assert len(validas) == EXPECTED_VALID_COUNT
                 assert len(invalidas) == EXPECTED_INVALID_COUNT
+
+    def _form_with_temporary_file(self, content):
+        uploaded_file = TemporaryUploadedFile(
+            name="test.txt",
+            content_type="text/plain",
+            size=len(content),
+            charset=None,
+        )
+        uploaded_file.write(content)
+        uploaded_file.seek(0)
+        self.addCleanup(uploaded_file.close)
+
+        form = BulkRequestForm({}, {"arquivo_txt": uploaded_file})
+        assert form.is_valid(), form.errors
+        return form
+
+    def test_process_file_streams_chunks(self):
+        """Testa leitura em chunks com linhas quebradas entre os chunks"""
+        linhas = [f"2,usuario{i}@email.com,IPL {i}/2023" for i in range(50)]
+        content = "\r\n".join(linhas).encode()
+
+        with patch.object(File, "DEFAULT_CHUNK_SIZE", 7):
+            form = self._form_with_temporary_file(content)
+            validas, invalidas = form.process_file(self.user)
+
+        assert len(invalidas) == 0
+        assert [v["termo_busca"] for v in validas] == [
+            f"usuario{i}@email.com" for i in range(50)
+        ]
+
+    def test_process_file_latin1(self):
+        """Testa fallback para Latin-1 após trecho inicial ASCII"""
+        content = "2,usuario@email.com,IPL 456/2023\n2,joao@email.com,Investigação\n"
+        with patch.object(File, "DEFAULT_CHUNK_SIZE", 16):
+            form = self._form_with_temporary_file(content.encode("latin-1"))
+            validas, invalidas = form.process_file(self.user)
+
+        assert len(invalidas) == 0
+        assert validas[1]["motivo"] == "Investigação"
+
+    def test_process_file_mixed_encodings(self):
+        """Testa erro de decodificação quando UTF-8 e Latin-1 se misturam"""
+        content = (
+            "2,joao@email.com,Investigação\n".encode()
+            + b"2,maria@email.com,"
+            + "Investigação\n".encode("latin-1")
+        )
+        with patch.object(File, "DEFAULT_CHUNK_SIZE", 16):
+            form = self._form_with_temporary_file(content)
+            with pytest.raises(ValidationError):
+                form.process_file(self.user)
+
+    def test_process_file_mixed_encodings_in_one_chunk(self):
+        """Testa que UTF-8 não ASCII seguido de Latin-1 no mesmo chunk é recusado"""
+        content = "2,joao@email.com,Investigação ".encode() + "ação\n".encode(
+            "latin-1",
+        )
+        form = self._form_with_temporary_file(content)
+
+        with pytest.raises(ValidationError):
+            form.process_file(self.user)
+
+    def test_file_size_limit(self):
+        """Testa o limite de tamanho configurável do arquivo"""
+        content = b"2,usuario@email.com,IPL 456/2023"
+        uploaded_file = SimpleUploadedFile("test.txt", content)
+
+        with self.settings(BULK_REQUEST_MAX_FILE_SIZE=len(content) - 1):
+            form = BulkRequestForm({}, {"arquivo_txt": uploaded_file})
+            assert not form.is_valid()
+            assert "arquivo_txt" in form.errors
+
+    def test_process_file_reports_throughput(self):
+        """Testa a medição de desempenho da validação"""
+        content = "1,11144477735,BO 1\n1,11144477734,BO 2\n1,11222333000181,BO 3"
+        form = BulkRequestForm(
+            {},
+            {"arquivo_txt": SimpleUploadedFile("test.txt", content.encode())},
+        )
+        assert form.is_valid()
+
+        validas, invalidas = form.process_file(self.user)
+
+        assert [v["termo_busca"] for v in validas] == ["11144477735", "11222333000181"]
+        assert invalidas[0]["erro"] == "CPF inválido"
+        assert form.linhas_validadas == len(content.splitlines())
+        assert form.linhas_por_segundo > 0
@@ -1,8 +1,13 @@
 import pytest
 from django.conf import settings
+from validate_docbr import CNPJ
+from validate_docbr import CPF
 
 from consultalab.bacen.api import BacenRequestApi
+from consultalab.bacen.helpers import CPF_LENGTH
 from consultalab.bacen.helpers import camelcase_to_snake_case
+from consultalab.bacen.helpers import validate_cpf_cnpj
+from consultalab.bacen.helpers import validate_cpf_cnpj_batch
 
 
 class TestBacenRequestApi:
@@ -52,3 +57,40 @@ def test_camelcase_to_snake_case():
     assert isinstance(snake_case_data_instituicao, dict)
     assert "nome_banco" in snake_case_data_instituicao
     assert "codigo_banco" in snake_case_data_instituicao
+
+
+@pytest.mark.parametrize(
+    ("documento", "esperado"),
+    [
+        ("11144477735", True),
+        ("11222333000181", True),
+        ("11144477734", False),
+        ("11222333000180", False),
+        ("11111111111", False),
+        ("00000000000000", False),
+        ("1114447773", False),
+        ("1114447773a", False),
+    ],
+)
+def test_validate_cpf_cnpj(documento, esperado):
+    assert validate_cpf_cnpj(documento) is esperado
+
+
+def test_validate_cpf_cnpj_matches_validate_docbr():
+    cpfs = [CPF().generate() for _ in range(200)]
+    cnpjs = [CNPJ().generate() for _ in range(200)]
+    # Altera o último dígito para obter documentos inválidos
+    invalidos = [doc[:-1] + str((int(doc[-1]) + 1) % 10) for doc in cpfs + cnpjs]
+
+    for documento in cpfs + invalidos:
+        if len(documento) == CPF_LENGTH:
+            assert validate_cpf_cnpj(documento) == CPF().validate(documento)
+        else:
+            assert validate_cpf_cnpj(documento) == CNPJ().validate(documento)
+    assert all(validate_cpf_cnpj(documento) for documento in cnpjs)
+
+
+def test_validate_cpf_cnpj_batch():
+    documentos = ["11144477735", "11144477734", "11222333000181"] * 4
+
+    assert validate_cpf_cnpj_batch(documentos) == [True, False, True] * 4
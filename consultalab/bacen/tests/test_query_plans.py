@@ -0,0 +1,159 @@
+"""
+Testes de regressão de desempenho das views mais acessadas.
+
+Cada view é executada com um número fixo de consultas SQL, o orçamento
+declarado em ``query_budget``, independente da quantidade de requisições,
+chaves e eventos exibidos. Os planos (EXPLAIN) das consultas capturadas são
+gerados com ``enable_seqscan`` desligado: se alguma delas ainda recorrer a uma
+varredura sequencial, não há índice que a atenda.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+from consultalab.bacen.models import ChavePix
+from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.bacen.tests.factories import RequisicaoBacenFactory
+from consultalab.bacen.views import RequisicaoBacenDetailView
+from consultalab.bacen.views import RequisicaoBacenPDFView
+from consultalab.bacen.views import RequisicaoBacenStatusView
+from consultalab.core.views import HomeView
+
+pytestmark = pytest.mark.django_db
+
+# Tabelas da aplicação que nunca devem ser lidas por varredura sequencial
+APP_TABLES = ("REQUISICOES_BACEN", "CHAVES_PIX", "EVENTOS_VINCULO_PIX")
+
+
+def _create_requisicoes(user, total, chaves=2, eventos=2):
+    requisicoes = RequisicaoBacenFactory.create_batch(total, user=user)
+    agora = timezone.now()
+    for i, requisicao in enumerate(requisicoes):
+        requisicao.task_id = f"task-{requisicao.id}"
+        requisicao.processada = True
+        requisicao.save()
+        TaskResult.objects.create(
+            task_id=requisicao.task_id,
+            status="SUCCESS" if i % 2 else "STARTED",
+        )
+        for j in range(chaves):
+            chave = ChavePix.objects.create(
+                requisicao_bacen=requisicao,
+                chave=f"{requisicao.termo_busca}-{j}",
+            )
+            EventoVinculo.objects.bulk_create(
+                EventoVinculo(
+                    chave_pix=chave,
+                    tipo_evento="ABERTURA",
+                    data_evento=agora - timedelta(days=k),
+                )
+                for k in range(eventos)
+            )
+    return requisicoes
+
+
+def _explain_plans(captured_queries):
+    plans = []
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        for query in captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT"):
+                continue
+            cursor.execute(f"EXPLAIN {sql}")
+            plans.append("\n".join(row[0] for row in cursor.fetchall()))
+    return plans
+
+
+def _assert_no_seq_scan(captured_queries):
+    for plan in _explain_plans(captured_queries):
+        for table in APP_TABLES:
+            assert f'Seq Scan on "{table}"' not in plan, plan
+
+
+@pytest.fixture
+def user_pix(user):
+    user.user_permissions.add(Permission.objects.get(codename="can_request_pix"))
+    return user
+
+
+@pytest.mark.parametrize("total", [3, 15])
+def test_home_view(user_pix, rf: RequestFactory, total):
+    _create_requisicoes(user_pix, total, chaves=0)
+    request = rf.get("/", {"busca": ""})
+    request.user = user_pix
+
+    with CaptureQueriesContext(connection) as captured:
+        response = HomeView.as_view()(request)
+        response.render()
+
+    assert len(captured) == HomeView.query_budget.queries
+    _assert_no_seq_scan(captured.captured_queries)
+
+    list_query = next(
+        q["sql"] for q in captured.captured_queries if "ORDER BY" in q["sql"]
+    )
+    plan = _explain_plans([{"sql": list_query}])[0]
+    assert "req_bacen_user_created_idx" in plan
+
+
+@pytest.mark.parametrize("chaves", [1, 5])
+def test_detail_view(user_pix, rf: RequestFactory, chaves):
+    requisicao = _create_requisicoes(user_pix, 1, chaves=chaves)[0]
+    request = rf.get("/")
+    request.user = user_pix
+
+    with CaptureQueriesContext(connection) as captured:
+        response = RequisicaoBacenDetailView.as_view()(request, pk=requisicao.pk)
+        response.render()
+
+    assert len(captured) == RequisicaoBacenDetailView.query_budget.queries
+    _assert_no_seq_scan(captured.captured_queries)
+
+
+@pytest.mark.parametrize("chaves", [1, 5])
+def test_pdf_view(user_pix, rf: RequestFactory, chaves):
+    requisicao = _create_requisicoes(user_pix, 1, chaves=chaves)[0]
+    request = rf.get("/", {"report_type": "detailed"})
+    request.user = user_pix
+
+    with CaptureQueriesContext(connection) as captured:
+        RequisicaoBacenPDFView.as_view()(request, requisicao_id=requisicao.pk)
+
+    assert len(captured) == RequisicaoBacenPDFView.query_budget.queries
+    _assert_no_seq_scan(captured.captured_queries)
+
+
+def test_status_view(user_pix, rf: RequestFactory):
+    requisicao = _create_requisicoes(user_pix, 1, chaves=0)[0]
+    request = rf.get("/")
+    request.user = user_pix
+
+    with CaptureQueriesContext(connection) as captured:
+        RequisicaoBacenStatusView.as_view()(request, requisicao_id=requisicao.pk)
+
+    assert len(captured) == RequisicaoBacenStatusView.query_budget.queries
+    _assert_no_seq_scan(captured.captured_queries)
+
+
+def test_task_id_and_pending_indexes(user_pix):
+    _create_requisicoes(user_pix, 2, chaves=0)
+    RequisicaoBacenFactory(user=user_pix)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    por_task_id = RequisicaoBacen.objects.filter(task_id="task-1").explain()
+    pendentes = (
+        RequisicaoBacen.objects.filter(processada=False).order_by("-created").explain()
+    )
+
+    assert "req_bacen_task_id_idx" in por_task_id
+    assert "req_bacen_pendentes_idx" in pendentes
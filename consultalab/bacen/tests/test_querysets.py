@@ -0,0 +1,89 @@
+import pytest
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.db import connection
+
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.bacen.querysets import RequisicaoBacenQuerySet
+from consultalab.bacen.tests.factories import RequisicaoBacenFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _build_requisicoes(user, total):
+    return [
+        RequisicaoBacen(
+            user=user,
+            tipo_requisicao="2",
+            termo_busca=f"chave{i}@email.com",
+            motivo="BO 123/2023",
+        )
+        for i in range(total)
+    ]
+
+
+def test_bulk_create_with_audit(user, django_assert_max_num_queries):
+    total = 5
+    requisicoes = _build_requisicoes(user, total)
+
+    # savepoint + contenttype + INSERT das requisições + INSERT dos logs + release
+    with django_assert_max_num_queries(5):
+        RequisicaoBacen.objects.bulk_create_with_audit(requisicoes, actor=user)
+
+    assert RequisicaoBacen.objects.filter(user=user).count() == total
+    for requisicao in requisicoes:
+        log_entry = LogEntry.objects.get_for_object(requisicao).get()
+        assert log_entry.action == LogEntry.Action.CREATE
+        assert log_entry.actor == user
+        assert log_entry.changes["termo_busca"] == ["None", requisicao.termo_busca]
+
+
+def test_bulk_create_with_audit_batches(user, django_assert_num_queries):
+    requisicoes = _build_requisicoes(user, 5)
+    RequisicaoBacen.objects.bulk_create_with_audit(requisicoes[:1], actor=user)
+
+    # savepoint + 2 lotes de requisições + 2 lotes de logs + release
+    # (o contenttype já está em cache)
+    with django_assert_num_queries(6):
+        RequisicaoBacen.objects.bulk_create_with_audit(
+            requisicoes[1:],
+            actor=user,
+            batch_size=2,
+        )
+
+
+def test_bulk_create_with_audit_disabled(user):
+    requisicoes = _build_requisicoes(user, 3)
+
+    with disable_auditlog():
+        RequisicaoBacen.objects.bulk_create_with_audit(requisicoes, actor=user)
+
+    assert not LogEntry.objects.filter(actor=user).exists()
+
+
+def test_busca(user):
+    por_termo = RequisicaoBacenFactory(user=user, termo_busca="fulano@email.com")
+    por_motivo = RequisicaoBacenFactory(user=user, motivo="IPL 456/2023 - Fulano")
+    por_referencia = RequisicaoBacenFactory(user=user, referencia="Caso FULANO")
+    RequisicaoBacenFactory(user=user, termo_busca="ciclano@email.com")
+
+    assert set(RequisicaoBacen.objects.busca(" fulano ")) == {
+        por_termo,
+        por_motivo,
+        por_referencia,
+    }
+    assert RequisicaoBacen.objects.busca("50%").count() == 0
+    assert RequisicaoBacen.objects.busca("").count() == RequisicaoBacen.objects.count()
+
+
+def test_busca_uses_trigram_indexes(user):
+    RequisicaoBacenFactory.create_batch(3, user=user)
+
+    # Em tabelas pequenas o planejador prefere a varredura sequencial
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    plano = RequisicaoBacen.objects.busca("fulano").explain()
+
+    assert "BitmapOr" in plano
+    for field in RequisicaoBacenQuerySet.BUSCA_FIELDS:
+        assert f"req_bacen_{field}_trgm" in plano
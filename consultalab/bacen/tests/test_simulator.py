@@ -0,0 +1,218 @@
+import asyncio
+import json
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+import uvicorn
+from prometheus_client import REGISTRY
+
+from consultalab.bacen.api import BacenRequestApi
+from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.simulator import BacenSimulator
+from consultalab.bacen.tasks import request_bacen_pix
+
+CPF = "52998224725"
+CNPJ_PARTICIPANTE = "01858774000110"
+ESCALA = 3
+SERVER_START_TIMEOUT = 5
+
+
+def call(app, path, query=""):
+    """Executa uma requisição GET na aplicação ASGI e retorna status e corpo."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "path": path, "query_string": query.encode()}
+    asyncio.run(app(scope, receive, send))
+    start, body = messages
+    return start["status"], dict(start["headers"]), json.loads(body["body"])
+
+
+@pytest.fixture
+def simulator():
+    return BacenSimulator(latencia_mediana=0, seed=1)
+
+
+class TestBacenSimulator:
+    def test_vinculos_pix(self, simulator):
+        status, _, body = call(
+            simulator,
+            "/rest/consultar-vinculos-pix",
+            f"cpfCnpj={CPF}&motivo=teste",
+        )
+
+        assert status == HTTPStatus.OK
+        assert body["vinculosPix"]
+        assert {vinculo["cpfCnpj"] for vinculo in body["vinculosPix"]} == {CPF}
+
+    def test_escala_multiplies_unique_keys(self):
+        base = BacenSimulator(latencia_mediana=0)
+        escalado = BacenSimulator(latencia_mediana=0, escala=ESCALA, seed=1)
+
+        _, _, original = call(base, "/consultar-vinculos-pix", f"cpfCnpj={CPF}")
+        _, _, body = call(escalado, "/consultar-vinculos-pix", f"cpfCnpj={CPF}")
+
+        vinculos = body["vinculosPix"]
+        assert len(vinculos) == ESCALA * len(original["vinculosPix"])
+        assert len({vinculo["chave"] for vinculo in vinculos}) == len(vinculos)
+
+    def test_vinculo_pix(self, simulator):
+        _, _, body = call(simulator, "/consultar-vinculo-pix", "chave=a@b.com")
+
+        assert body["chave"] == "a@b.com"
+        assert {evento["chave"] for evento in body["eventosVinculo"]} == {"a@b.com"}
+
+    def test_pessoas_juridicas(self, simulator):
+        _, _, body = call(simulator, "/pessoasJuridicas", f"cnpj={CNPJ_PARTICIPANTE}")
+
+        assert body["cnpj"] == CNPJ_PARTICIPANTE
+        assert body["nome"]
+
+    def test_injects_429(self):
+        simulator = BacenSimulator(latencia_mediana=0, taxa_429=1.0)
+
+        status, headers, _ = call(simulator, "/consultar-vinculo-pix", "chave=x")
+
+        assert status == HTTPStatus.TOO_MANY_REQUESTS
+        assert b"retry-after" in headers
+
+    def test_injects_errors(self):
+        simulator = BacenSimulator(latencia_mediana=0, taxa_erro=1.0)
+
+        status, _, _ = call(simulator, "/consultar-vinculo-pix", "chave=x")
+
+        assert status == HTTPStatus.INTERNAL_SERVER_ERROR
+
+    def test_latency_distribution(self):
+        simulator = BacenSimulator(
+            latencia_mediana=0.1,
+            latencia_dispersao=0.5,
+            seed=1,
+        )
+        amostras = sorted(simulator.sample_latency() for _ in range(1001))
+
+        assert amostras[500] == pytest.approx(0.1, rel=0.2)
+        assert amostras[-1] > amostras[500]
+
+    def test_estatisticas(self, simulator):
+        call(simulator, "/consultar-vinculo-pix", "chave=x")
+
+        _, _, body = call(simulator, "/estatisticas")
+
+        assert body["requisicoes"] == 1
+        assert body["respostas"] == {"consultar-vinculo-pix 200": 1}
+
+
+@pytest.fixture
+def simulator_url(settings):
+    server = uvicorn.Server(
+        uvicorn.Config(
+            BacenSimulator(latencia_mediana=0),
+            host="127.0.0.1",
+            port=0,
+            log_level="warning",
+            lifespan="on",
+            ws="none",
+        ),
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    settings.BACEN_API_DICT_BASEURL = url
+    settings.BACEN_API_INFORMES = url
+    yield url
+    server.should_exit = True
+    thread.join()
+
+
+def test_bacen_api_against_simulator(simulator_url):
+    response = BacenRequestApi().get_pix_by_cpf_cnpj(CPF, "teste")
+
+    assert response["status"] == "success"
+    chave = response["data"][0]
+    assert chave["cpfCnpj"] == CPF
+    assert chave["participante"]["nome"].startswith("INSTITUICAO SIMULADA")
+
+
+@pytest.mark.django_db
+def test_request_bacen_pix_records_stages(simulator_url, requisicao_bacen_cpf):
+    request_bacen_pix(requisicao_bacen_cpf.id)
+
+    requisicao_bacen_cpf.refresh_from_db()
+    etapas = [
+        requisicao_bacen_cpf.iniciada_em,
+        requisicao_bacen_cpf.consulta_concluida_em,
+        requisicao_bacen_cpf.participantes_resolvidos_em,
+        requisicao_bacen_cpf.persistida_em,
+    ]
+    assert None not in etapas
+    assert etapas == sorted(etapas)
+
+
+@pytest.mark.django_db
+def test_request_bacen_pix_rerun_does_not_duplicate(
+    simulator_url,
+    requisicao_bacen_cpf,
+):
+    request_bacen_pix(requisicao_bacen_cpf.id)
+    chaves = requisicao_bacen_cpf.chaves_pix.count()
+    eventos = EventoVinculo.objects.filter(
+        chave_pix__requisicao_bacen=requisicao_bacen_cpf,
+    ).count()
+
+    request_bacen_pix(requisicao_bacen_cpf.id)
+
+    assert chaves
+    assert requisicao_bacen_cpf.chaves_pix.count() == chaves
+    assert (
+        EventoVinculo.objects.filter(
+            chave_pix__requisicao_bacen=requisicao_bacen_cpf,
+        ).count()
+        == eventos
+    )
+
+
+def sample(nome, **labels):
+    return REGISTRY.get_sample_value(nome, labels) or 0
+
+
+def test_bacen_api_metrics(simulator_url):
+    respostas = {"endpoint": "consultar-vinculos-pix", "status": "200"}
+    antes = sample("consultalab_bacen_api_responses_total", **respostas)
+    misses = sample("consultalab_bacen_participante_cache_total", resultado="miss")
+    hits = sample("consultalab_bacen_participante_cache_total", resultado="hit")
+
+    BacenRequestApi().get_pix_by_cpf_cnpj(CPF, "teste")
+
+    assert sample("consultalab_bacen_api_responses_total", **respostas) == antes + 1
+    assert (
+        sample(
+            "consultalab_bacen_vinculos_por_resposta_count",
+            endpoint="consultar-vinculos-pix",
+        )
+        > 0
+    )
+    assert (
+        sample("consultalab_bacen_participante_cache_total", resultado="miss") > misses
+    )
+    assert sample("consultalab_bacen_participante_cache_total", resultado="hit") > hits
+
+
+def test_request_bacen_pix_spans(simulator_url, requisicao_bacen_cpf, spans):
+    request_bacen_pix(requisicao_bacen_cpf.id)
+
+    nomes = [span.name for span in spans.get_finished_spans()]
+    assert "GET consultar-vinculos-pix" in nomes
+    assert "request_bacen_pix.persistencia" in nomes
+    assert "db.query" in nomes
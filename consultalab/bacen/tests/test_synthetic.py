@@ -0,0 +1,67 @@
+import random
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django_celery_results.models import TaskResult
+from validate_docbr import CNPJ
+from validate_docbr import CPF
+
+from consultalab.bacen.models import ChavePix
+from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.bacen.synthetic import SyntheticDataGenerator
+from consultalab.bacen.synthetic import generate_cnpj
+from consultalab.bacen.synthetic import generate_cpf
+
+pytestmark = pytest.mark.django_db
+
+TOTAL_REQUISICOES = 120
+BATCH_SIZE = 50
+
+
+def test_generate_documents_are_valid():
+    rng = random.Random(1)  # noqa: S311
+
+    assert all(CPF().validate(generate_cpf(rng)) for _ in range(100))
+    assert all(CNPJ().validate(generate_cnpj(rng)) for _ in range(100))
+
+
+def test_generate(user):
+    generator = SyntheticDataGenerator([user], random.Random(1), batch_size=BATCH_SIZE)  # noqa: S311
+    lotes = []
+
+    totais = generator.generate(TOTAL_REQUISICOES, progress=lotes.append)
+
+    assert len(lotes) == TOTAL_REQUISICOES // BATCH_SIZE + 1
+    assert RequisicaoBacen.objects.filter(user=user).count() == TOTAL_REQUISICOES
+    assert ChavePix.objects.count() == totais["chaves"]
+    assert EventoVinculo.objects.count() == totais["eventos"]
+    assert TaskResult.objects.count() == totais["tarefas"]
+    assert totais["eventos"] >= totais["chaves"] > 0
+
+    chave = ChavePix.objects.select_related("requisicao_bacen").first()
+    assert chave.get_bank_label() != "Desconhecido"
+    assert chave.eventos_vinculo.first().tipo_evento == "CRIADO"
+
+    # O status vem dos TaskResult gerados para as requisições processadas
+    processadas = RequisicaoBacen.objects.with_task_status().filter(processada=True)
+    assert {r.get_status()["text"] for r in processadas} <= {"Analisado", "Falhou"}
+
+
+def test_command(user):
+    out = StringIO()
+    call_command(
+        "gerar_dados_sinteticos",
+        requisicoes=10,
+        usuarios=2,
+        seed=1,
+        stdout=out,
+    )
+
+    assert RequisicaoBacen.objects.count() == 10  # noqa: PLR2004
+    assert out.getvalue().splitlines()[-1] == (
+        f"Gerados 10 requisições, {ChavePix.objects.count()} chaves Pix, "
+        f"{EventoVinculo.objects.count()} eventos e "
+        f"{TaskResult.objects.count()} resultados de tarefas."
+    )
@@ -1,14 +1,35 @@
+import copy
 import time
+from unittest.mock import patch
 
 import pytest
 from celery.result import AsyncResult
+from django.contrib.auth.models import Permission
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import OperationalError
 
+from consultalab.bacen.helpers import REQUEST_PIX_MAX_RETRIES
 from consultalab.bacen.models import ChavePix
+from consultalab.bacen.models import EventoVinculo
+from consultalab.bacen.models import ImportacaoLote
 from consultalab.bacen.models import RequisicaoBacen
+from consultalab.bacen.simulator import load_samples
+from consultalab.bacen.tasks import TaskFailureError
+from consultalab.bacen.tasks import TransientTaskError
+from consultalab.bacen.tasks import _save_bulk_upload_batch
+from consultalab.bacen.tasks import dispatch_requisicoes
+from consultalab.bacen.tasks import process_bulk_upload
 from consultalab.bacen.tasks import request_bacen_pix
+from consultalab.bacen.tasks import save_chaves_pix
+from consultalab.bacen.tests.factories import RequisicaoBacenFactory
 
 pytestmark = pytest.mark.django_db
 
+EXPECTED_TOTAL_LINHAS = 4
+EXPECTED_VALID_COUNT = 2
+EXPECTED_INVALID_COUNT = 2
+
 
 @pytest.mark.integrations_test
 def test_request_bacen_pix(settings, requisicao_bacen_cpf: RequisicaoBacen):
@@ -29,3 +50,227 @@ def test_request_bacen_pix(settings, requisicao_bacen_cpf: RequisicaoBacen):
         cpf_cnpj=requisicao_bacen_cpf.termo_busca,
     ).first()
     assert chave is not None, "Chave não encontrada no banco de dados"
+
+
+def test_dispatch_requisicoes(django_capture_on_commit_callbacks, user):
+    requisicoes = RequisicaoBacenFactory.create_batch(5, user=user)
+
+    with (
+        patch("consultalab.bacen.tasks.group") as group_mock,
+        django_capture_on_commit_callbacks(execute=True) as callbacks,
+    ):
+        dispatch_requisicoes(requisicoes, batch_size=2)
+
+    expected_batches = 3
+    assert len(callbacks) == expected_batches
+    assert group_mock.return_value.apply_async.call_count == expected_batches
+
+    assinaturas = [
+        assinatura
+        for chamada in group_mock.call_args_list
+        for assinatura in chamada.args[0]
+    ]
+    for requisicao, assinatura in zip(requisicoes, assinaturas, strict=True):
+        requisicao.refresh_from_db()
+        assert requisicao.processada
+        assert requisicao.task_id == assinatura.options["task_id"]
+        assert assinatura.args == (requisicao.id,)
+
+
+def _create_importacao(user, content, **kwargs):
+    user.user_permissions.add(Permission.objects.get(codename="can_request_pix"))
+    return ImportacaoLote.objects.create(
+        user=user,
+        arquivo=ContentFile(content, name="lote.txt"),
+        **kwargs,
+    )
+
+
+def test_process_bulk_upload(user):
+    importacao = _create_importacao(
+        user,
+        b"1,52998224725,BO 123/2023,REF001\n"
+        b"1,12345678901,BO 123/2023\n"
+        b"2,usuario@email.com,IPL 456/2023\n"
+        b"linha invalida\n",
+    )
+    arquivo = importacao.arquivo.name
+
+    with patch("consultalab.bacen.tasks.BULK_CREATE_BATCH_SIZE", 2):
+        result = process_bulk_upload(importacao.id)
+
+    importacao.refresh_from_db()
+    assert result["status"] == ImportacaoLote.STATUS_CONCLUIDA
+    assert importacao.status == ImportacaoLote.STATUS_CONCLUIDA
+    assert importacao.total_linhas == EXPECTED_TOTAL_LINHAS
+    assert importacao.requisicoes_validas == EXPECTED_VALID_COUNT
+    assert importacao.requisicoes_invalidas == EXPECTED_INVALID_COUNT
+    assert importacao.tempo_validacao is not None
+    assert list(importacao.erros.values_list("linha", flat=True)) == [2, 4]
+    requisicoes = RequisicaoBacen.objects.filter(user=user, processada=False)
+    assert requisicoes.count() == EXPECTED_VALID_COUNT
+    # O arquivo enviado não fica no storage depois da importação
+    assert not importacao.arquivo
+    assert not importacao.arquivo.storage.exists(arquivo)
+
+
+def test_process_bulk_upload_partial_failure(user):
+    importacao = _create_importacao(
+        user,
+        b"1,52998224725,BO 123/2023\n2,usuario@email.com,IPL 456/2023\n",
+    )
+    lotes = []
+
+    def save_batch(importacao, lote):
+        lotes.append(lote)
+        if len(lotes) > 1:
+            msg = "falha no segundo lote"
+            raise RuntimeError(msg)
+        _save_bulk_upload_batch(importacao, lote)
+
+    with (
+        patch("consultalab.bacen.tasks.BULK_CREATE_BATCH_SIZE", 1),
+        patch("consultalab.bacen.tasks._save_bulk_upload_batch", save_batch),
+        pytest.raises(RuntimeError),
+    ):
+        process_bulk_upload(importacao.id)
+
+    # O primeiro lote foi mantido e a importação registra a falha parcial
+    importacao.refresh_from_db()
+    assert importacao.status == ImportacaoLote.STATUS_CONCLUIDA_COM_FALHA
+    assert importacao.total_linhas == 1
+    assert importacao.requisicoes_validas == 1
+    assert "falha no segundo lote" in importacao.mensagem_erro
+    assert "foram mantidas" in importacao.mensagem_erro
+    assert importacao.tempo_validacao is not None
+    assert not importacao.arquivo
+    assert RequisicaoBacen.objects.filter(user=user).count() == 1
+
+
+def test_process_bulk_upload_dispatch(user):
+    importacao = _create_importacao(
+        user,
+        b"1,52998224725,BO 123/2023\n",
+        processar_imediatamente=True,
+    )
+
+    with patch("consultalab.bacen.tasks.dispatch_requisicoes") as dispatch_mock:
+        process_bulk_upload(importacao.id)
+
+    requisicao = RequisicaoBacen.objects.get(user=user)
+    dispatch_mock.assert_called_once_with([requisicao])
+
+
+def test_process_bulk_upload_publishes_progress(user):
+    importacao = _create_importacao(
+        user,
+        b"1,52998224725,BO 123/2023\n2,usuario@email.com,IPL 456/2023\n",
+    )
+
+    with (
+        patch("consultalab.bacen.tasks.BULK_CREATE_BATCH_SIZE", 1),
+        patch("consultalab.bacen.tasks.publish_user_event") as publish_mock,
+    ):
+        process_bulk_upload(importacao.id)
+
+    # Um evento por lote e um ao concluir
+    status = [call.args[2]["status"] for call in publish_mock.call_args_list]
+    assert status == [
+        ImportacaoLote.STATUS_PROCESSANDO,
+        ImportacaoLote.STATUS_PROCESSANDO,
+        ImportacaoLote.STATUS_CONCLUIDA,
+    ]
+    assert {call.args[:2] for call in publish_mock.call_args_list} == {
+        (user.id, "importacao"),
+    }
+
+
+def test_process_bulk_upload_invalid_encoding(user):
+    # UTF-8 válido no primeiro chunk e um byte Latin-1 no seguinte
+    importacao = _create_importacao(user, "é,abc\n".encode() + b"\xe9\n")
+
+    with patch.object(File, "DEFAULT_CHUNK_SIZE", 4):
+        process_bulk_upload(importacao.id)
+
+    importacao.refresh_from_db()
+    assert importacao.status == ImportacaoLote.STATUS_FALHOU
+    assert importacao.mensagem_erro
+    assert importacao.tempo_validacao is not None
+    assert not importacao.arquivo
+    assert not RequisicaoBacen.objects.filter(user=user).exists()
+
+
+@pytest.fixture
+def vinculos():
+    return copy.deepcopy(load_samples()["cpf"]["vinculosPix"])
+
+
+def test_save_chaves_pix_is_idempotent(requisicao_bacen_cpf, vinculos):
+    total_eventos = sum(len(vinculo["eventosVinculo"]) for vinculo in vinculos)
+    save_chaves_pix(vinculos[:2], requisicao_bacen_cpf)
+
+    # Nova tentativa após uma falha no meio da gravação, com dados atualizados
+    vinculos[0]["status"] = "EXCLUIDO"
+    save_chaves_pix(vinculos, requisicao_bacen_cpf)
+    save_chaves_pix(vinculos, requisicao_bacen_cpf)
+
+    chaves = ChavePix.objects.filter(requisicao_bacen=requisicao_bacen_cpf)
+    assert chaves.count() == len(vinculos)
+    assert EventoVinculo.objects.filter(chave_pix__in=chaves).count() == total_eventos
+    assert chaves.get(chave=vinculos[0]["chave"]).status == "EXCLUIDO"
+
+
+def test_save_chaves_pix_repeated_in_response(requisicao_bacen_cpf, vinculos):
+    vinculo = vinculos[1]
+    vinculo["eventosVinculo"] *= 2
+
+    save_chaves_pix([vinculo, vinculo], requisicao_bacen_cpf)
+
+    chave = ChavePix.objects.get(requisicao_bacen=requisicao_bacen_cpf)
+    assert chave.eventos_vinculo.count() == len(vinculo["eventosVinculo"]) // 2
+
+
+@pytest.mark.parametrize(
+    ("transient", "error", "calls"),
+    [
+        (True, TransientTaskError, REQUEST_PIX_MAX_RETRIES + 1),
+        (False, TaskFailureError, 1),
+    ],
+)
+def test_request_bacen_pix_retries_transient_errors(
+    requisicao_bacen_cpf,
+    transient,
+    error,
+    calls,
+):
+    response = {"status": "error", "message": "503", "transient": transient}
+
+    with patch(
+        "consultalab.bacen.tasks.BacenRequestApi.get_pix_by_cpf_cnpj",
+        return_value=response,
+    ) as api_mock:
+        result = request_bacen_pix.apply(args=(requisicao_bacen_cpf.id,))
+
+    assert isinstance(result.result, error)
+    assert api_mock.call_count == calls
+
+
+def test_request_bacen_pix_keeps_error_when_saving_etapas_fails(
+    requisicao_bacen_cpf,
+):
+    response = {"status": "error", "message": "Chave inválida"}
+
+    with (
+        patch(
+            "consultalab.bacen.tasks.BacenRequestApi.get_pix_by_cpf_cnpj",
+            return_value=response,
+        ),
+        patch(
+            "consultalab.bacen.tasks.RequisicaoBacen.objects.filter",
+            side_effect=OperationalError("conexão perdida"),
+        ),
+    ):
+        result = request_bacen_pix.apply(args=(requisicao_bacen_cpf.id,))
+
+    assert isinstance(result.result, TaskFailureError)
+    assert str(result.result) == "Chave inválida"
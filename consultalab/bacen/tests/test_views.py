@@ -0,0 +1,137 @@
+from http import HTTPStatus
+from unittest.mock import patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+
+from consultalab.bacen.models import ErroImportacaoLote
+from consultalab.bacen.models import ImportacaoLote
+from consultalab.bacen.views import BulkRequestErrorsCSVView
+from consultalab.bacen.views import BulkRequestErrorsView
+from consultalab.bacen.views import BulkRequestStatusView
+from consultalab.bacen.views import BulkRequestUploadView
+from consultalab.users.models import User
+from consultalab.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+HTMX_STOP_POLLING = 286
+
+
+@pytest.fixture
+def importacao(user: User) -> ImportacaoLote:
+    importacao = ImportacaoLote.objects.create(
+        user=user,
+        arquivo=ContentFile(b"linha invalida\n", name="lote.txt"),
+        status=ImportacaoLote.STATUS_CONCLUIDA,
+        total_linhas=3,
+        requisicoes_invalidas=3,
+    )
+    ErroImportacaoLote.objects.bulk_create(
+        ErroImportacaoLote(
+            importacao=importacao,
+            linha=linha,
+            conteudo=f"linha {linha}",
+            erro="Formato inválido",
+        )
+        for linha in range(1, 4)
+    )
+    return importacao
+
+
+class TestBulkRequestUploadView:
+    def test_post_enqueues_import(
+        self,
+        user: User,
+        rf: RequestFactory,
+        django_capture_on_commit_callbacks,
+    ):
+        arquivo = SimpleUploadedFile("lote.txt", b"1,52998224725,BO 123/2023\n")
+        request = rf.post(
+            "/fake-url/",
+            {"arquivo_txt": arquivo, "processar_imediatamente": "on"},
+        )
+        request.user = user
+
+        with (
+            patch("consultalab.bacen.views.process_bulk_upload") as task_mock,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            response = BulkRequestUploadView.as_view()(request)
+
+        importacao = ImportacaoLote.objects.get(user=user)
+        assert response.status_code == HTTPStatus.OK
+        assert importacao.status == ImportacaoLote.STATUS_PENDENTE
+        assert importacao.processar_imediatamente
+        assert importacao.arquivo.read() == b"1,52998224725,BO 123/2023\n"
+        task_mock.apply_async.assert_called_once_with(
+            (importacao.id,),
+            task_id=importacao.task_id,
+        )
+
+
+class TestBulkRequestStatusView:
+    def test_polling(self, importacao: ImportacaoLote, rf: RequestFactory):
+        request = rf.get("/fake-url/")
+        request.user = importacao.user
+
+        response = BulkRequestStatusView.as_view()(
+            request,
+            importacao_id=importacao.id,
+        )
+        assert response.status_code == HTMX_STOP_POLLING
+
+        importacao.status = ImportacaoLote.STATUS_PROCESSANDO
+        importacao.save()
+        response = BulkRequestStatusView.as_view()(
+            request,
+            importacao_id=importacao.id,
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert b"every 2s" in response.content
+
+    def test_other_user(self, importacao: ImportacaoLote, rf: RequestFactory):
+        request = rf.get("/fake-url/")
+        request.user = UserFactory()
+
+        response = BulkRequestStatusView.as_view()(
+            request,
+            importacao_id=importacao.id,
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+class TestBulkRequestErrorsView:
+    def test_pagination(self, importacao: ImportacaoLote, rf: RequestFactory):
+        request = rf.get("/fake-url/", {"page": 2})
+        request.user = importacao.user
+
+        with patch.object(BulkRequestErrorsView, "paginate_by", 2):
+            response = BulkRequestErrorsView.as_view()(
+                request,
+                importacao_id=importacao.id,
+            )
+
+        assert response.status_code == HTTPStatus.OK
+        assert b"linha 3" in response.content
+        assert b"linha 1" not in response.content
+
+    def test_csv(self, importacao: ImportacaoLote, rf: RequestFactory):
+        request = rf.get("/fake-url/")
+        request.user = importacao.user
+
+        response = BulkRequestErrorsCSVView.as_view()(
+            request,
+            importacao_id=importacao.id,
+        )
+
+        content = b"".join(response.streaming_content).decode()
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        assert content.splitlines() == [
+            "linha,conteudo,erro",
+            "1,linha 1,Formato inválido",
+            "2,linha 2,Formato inválido",
+            "3,linha 3,Formato inválido",
+        ]
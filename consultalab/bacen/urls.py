@@ -24,6 +24,11 @@ urlpatterns = [
         views.UpdateReferenciaView.as_view(),
         name="requisicao_bacen_referencia",
     ),
+    path(
+        "bulk-request/<int:importacao_id>/erros.csv",
+        views.BulkRequestErrorsCSVView.as_view(),
+        name="bulk_request_errors_csv",
+    ),
 ]
 htmx_urlpatterns = [
     path("cpf_cnpj/", views.CPFCNPJFormView.as_view(), name="cpf_cnpj"),
@@ -68,6 +73,16 @@ htmx_urlpatterns = [
         views.BulkRequestUploadView.as_view(),
         name="bulk_request_upload",
     ),
+    path(
+        "bulk-request/<int:importacao_id>/status/",
+        views.BulkRequestStatusView.as_view(),
+        name="bulk_request_status",
+    ),
+    path(
+        "bulk-request/<int:importacao_id>/erros/",
+        views.BulkRequestErrorsView.as_view(),
+        name="bulk_request_errors",
+    ),
 ]
 
 urlpatterns += htmx_urlpatterns
@@ -1,28 +1,37 @@
+import csv
 import logging
+from functools import partial
+from itertools import chain
 
+from celery.utils import uuid
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import EmptyPage
-from django.core.paginator import PageNotAnInteger
 from django.core.paginator import Paginator
 from django.db import transaction
 from django.http import FileResponse
 from django.http import HttpResponseForbidden
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.utils.text import slugify
 from django.views.generic import CreateView
 from django.views.generic import DetailView
 from django.views.generic import View
+from opentelemetry.trace import SpanKind
 
 from consultalab.bacen.enhanced_report import EnhancedPixReportGenerator
-from consultalab.bacen.filters import RequisicaoBacenFilter
 from consultalab.bacen.forms import BulkRequestForm
-from consultalab.bacen.forms import RequisicaoBacenFilterFormHelper
 from consultalab.bacen.forms import RequisicaoBacenForm
-from consultalab.bacen.helpers import LIST_PAGE_SIZE
+from consultalab.bacen.helpers import BULK_CREATE_BATCH_SIZE
+from consultalab.bacen.helpers import BULK_ERRORS_PAGE_SIZE
+from consultalab.bacen.models import ImportacaoLote
 from consultalab.bacen.models import RequisicaoBacen
 from consultalab.bacen.report_forms import ReportTypeForm
+from consultalab.bacen.tasks import process_bulk_upload
 from consultalab.bacen.tasks import request_bacen_pix
+from consultalab.core.query_budget import QueryBudget
+from consultalab.core.tracing import tracer
+from consultalab.core.views import RequisicoesListMixin
 
 logger = logging.getLogger(__name__)
 
@@ -47,13 +56,16 @@ class ChavePixFormView(LoginRequiredMixin, View):
         )
 
 
-class RequisicaoBacenCreateView(LoginRequiredMixin, CreateView):
+class RequisicaoBacenCreateView(
+    LoginRequiredMixin,
+    RequisicoesListMixin,
+    CreateView,
+):
     model = RequisicaoBacen
     form_class = RequisicaoBacenForm
     template_name = "pages/home.html"
     success_url = reverse_lazy("core:home")
     success_message = "Requisição Bacen criada com sucesso!"
-    page_size = LIST_PAGE_SIZE
 
     def form_valid(self, form):
         user = self.request.user
@@ -75,29 +87,7 @@ class RequisicaoBacenCreateView(LoginRequiredMixin, CreateView):
 
     def form_invalid(self, form):
         response = super().form_invalid(form)
-        requisicoes = RequisicaoBacen.objects.filter(user=self.request.user).order_by(
-            "-created",
-        )
-        requisicao_filter = RequisicaoBacenFilter(
-            self.request.GET,
-            queryset=requisicoes,
-        )
-
-        requisicao_filter.form.helper = RequisicaoBacenFilterFormHelper()
-        requisicao_filter_form = requisicao_filter.form
-        requisicao_filter_qs = requisicao_filter.qs
-
-        paginator = Paginator(requisicao_filter_qs, self.page_size)
-        page_number = self.request.GET.get("page")
-        try:
-            requisicao_object = paginator.page(page_number)
-        except PageNotAnInteger:
-            requisicao_object = paginator.page(1)
-        except EmptyPage:
-            requisicao_object = paginator.page(paginator.num_pages)
-
-        response.context_data["requisicoes"] = requisicao_object
-        response.context_data["requisicoes_filter_form"] = requisicao_filter_form
+        response.context_data.update(self.get_requisicoes_context())
         response.context_data["messages_toast"] = form.errors["__all__"]
         return response
 
@@ -105,12 +95,23 @@ class RequisicaoBacenCreateView(LoginRequiredMixin, CreateView):
 class ProcessarRequisicaoView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         requisicao_id = kwargs.get("requisicao_id")
-        requisicao = RequisicaoBacen.objects.get(id=requisicao_id)
+        # O contexto deste span segue nos cabeçalhos da tarefa até o worker
+        with tracer.start_as_current_span(
+            "ProcessarRequisicaoView",
+            kind=SpanKind.SERVER,
+            attributes={"requisicao.id": requisicao_id},
+        ):
+            requisicao = RequisicaoBacen.objects.get(id=requisicao_id)
 
-        task = request_bacen_pix.delay(requisicao.id)
-        requisicao.task_id = task.id
-        requisicao.processada = True
-        requisicao.save()
+            requisicao.enfileirada_em = timezone.now()
+            task = request_bacen_pix.delay(requisicao.id)
+            requisicao.task_id = task.id
+            requisicao.processada = True
+            # Só os campos alterados aqui, para não sobrescrever as etapas já
+            # gravadas pelo worker caso a tarefa termine antes deste save
+            requisicao.save(
+                update_fields=["task_id", "processada", "enfileirada_em", "modified"],
+            )
 
         return render(
             request,
@@ -120,9 +121,12 @@ class ProcessarRequisicaoView(LoginRequiredMixin, View):
 
 
 class RequisicaoBacenStatusView(LoginRequiredMixin, View):
+    # Requisição com status
+    query_budget = QueryBudget(queries=1, time=0.05)
+
     def get(self, request, *args, **kwargs):
         requisicao_id = kwargs.get("requisicao_id")
-        requisicao = RequisicaoBacen.objects.get(id=requisicao_id)
+        requisicao = RequisicaoBacen.objects.with_task_status().get(id=requisicao_id)
 
         if requisicao.get_status()["finished"]:
             response = render(
@@ -144,10 +148,15 @@ class RequisicaoBacenDetailView(LoginRequiredMixin, DetailView):
     model = RequisicaoBacen
     template_name = "bacen/partials/requisicao_bacen_detail.html"
     context_object_name = "requisicao"
+    # Requisição com status e usuário + chaves + eventos
+    query_budget = QueryBudget(queries=3, time=0.2)
 
     def get_queryset(self):
-        return RequisicaoBacen.objects.prefetch_related("chaves_pix").filter(
-            user=self.request.user,
+        return (
+            RequisicaoBacen.objects.filter(user=self.request.user)
+            .with_task_status()
+            .select_related("user")
+            .prefetch_related("chaves_pix__eventos_vinculo")
         )
 
 
@@ -173,9 +182,17 @@ class ReportTypeModalView(LoginRequiredMixin, View):
 
 
 class RequisicaoBacenPDFView(LoginRequiredMixin, View):
+    # Requisição com status e usuário + chaves + eventos
+    query_budget = QueryBudget(queries=3, time=0.2)
+
     def get(self, request, *args, **kwargs):
         requisicao_id = kwargs.get("requisicao_id")
-        requisicao = RequisicaoBacen.objects.get(id=requisicao_id)
+        requisicao = (
+            RequisicaoBacen.objects.with_task_status()
+            .select_related("user")
+            .prefetch_related("chaves_pix__eventos_vinculo")
+            .get(id=requisicao_id)
+        )
 
         # Verificar se o usuário tem permissão para acessar esta requisição
         if requisicao.user != request.user:
@@ -316,39 +333,116 @@ class BulkRequestUploadView(LoginRequiredMixin, View):
         form = BulkRequestForm(request.POST, request.FILES)
 
         if form.is_valid():
-            try:
-                requisicoes_validas, requisicoes_invalidas = form.process_file(
-                    request.user,
-                )
-
-                # Salva as requisições válidas no banco de dados
-                requisicoes_criadas = []
-                with transaction.atomic():
-                    for req_data in requisicoes_validas:
-                        requisicao = RequisicaoBacen.objects.create(**req_data)
-                        requisicoes_criadas.append(requisicao)
-
-                # Prepara dados para o template de resultado
-                resultado = {
-                    "total_linhas": len(requisicoes_validas)
-                    + len(requisicoes_invalidas),
-                    "requisicoes_validas": len(requisicoes_validas),
-                    "requisicoes_invalidas": len(requisicoes_invalidas),
-                    "requisicoes_criadas": requisicoes_criadas,
-                    "erros": requisicoes_invalidas,
-                }
-
-                return render(
-                    request,
-                    "bacen/partials/bulk_request_result.html",
-                    {"resultado": resultado},
-                )
-
-            except (ValueError, TypeError, AttributeError) as e:
-                form.add_error("arquivo_txt", f"Erro ao processar arquivo: {e!s}")
+            # O arquivo é apenas armazenado aqui; a validação das linhas e a
+            # criação das requisições acontecem na tarefa process_bulk_upload
+            importacao = ImportacaoLote.objects.create(
+                user=request.user,
+                arquivo=form.cleaned_data["arquivo_txt"],
+                processar_imediatamente=form.cleaned_data.get(
+                    "processar_imediatamente",
+                    False,
+                ),
+                task_id=uuid(),
+            )
+            transaction.on_commit(
+                partial(
+                    process_bulk_upload.apply_async,
+                    (importacao.id,),
+                    task_id=importacao.task_id,
+                ),
+            )
+
+            return render(
+                request,
+                "bacen/partials/bulk_request_result.html",
+                {"importacao": importacao},
+            )
 
         return render(
             request,
             "bacen/partials/bulk_request_modal.html",
             {"form": form},
         )
+
+
+class BulkRequestStatusView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        importacao_id = kwargs.get("importacao_id")
+
+        try:
+            importacao = ImportacaoLote.objects.get(
+                id=importacao_id,
+                user=request.user,
+            )
+        except ImportacaoLote.DoesNotExist:
+            return HttpResponseForbidden("Importação não encontrada ou acesso negado.")
+
+        response = render(
+            request,
+            "bacen/partials/bulk_request_result.html",
+            {"importacao": importacao},
+        )
+        if importacao.finalizada:
+            response.status_code = 286
+        return response
+
+
+class BulkRequestErrorsView(LoginRequiredMixin, View):
+    paginate_by = BULK_ERRORS_PAGE_SIZE
+
+    def get(self, request, *args, **kwargs):
+        importacao_id = kwargs.get("importacao_id")
+
+        try:
+            importacao = ImportacaoLote.objects.get(
+                id=importacao_id,
+                user=request.user,
+            )
+        except ImportacaoLote.DoesNotExist:
+            return HttpResponseForbidden("Importação não encontrada ou acesso negado.")
+
+        paginator = Paginator(importacao.erros.all(), self.paginate_by)
+        page_obj = paginator.get_page(request.GET.get("page"))
+
+        return render(
+            request,
+            "bacen/partials/bulk_request_errors.html",
+            {"importacao": importacao, "page_obj": page_obj},
+        )
+
+
+class Echo:
+    """Objeto com a interface de escrita usada pelo csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class BulkRequestErrorsCSVView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        importacao_id = kwargs.get("importacao_id")
+
+        try:
+            importacao = ImportacaoLote.objects.get(
+                id=importacao_id,
+                user=request.user,
+            )
+        except ImportacaoLote.DoesNotExist:
+            return HttpResponseForbidden("Importação não encontrada ou acesso negado.")
+
+        erros = importacao.erros.values_list("linha", "conteudo", "erro")
+        writer = csv.writer(Echo())
+        rows = chain(
+            [("linha", "conteudo", "erro")],
+            erros.iterator(chunk_size=BULK_CREATE_BATCH_SIZE),
+        )
+
+        return StreamingHttpResponse(
+            (writer.writerow(row) for row in rows),
+            content_type="text/csv; charset=utf-8",
+            headers={
+                "Content-Disposition": (
+                    f'attachment; filename="erros_importacao_{importacao.id}.csv"'
+                ),
+            },
+        )
@@ -1,13 +1,35 @@
 import pytest
+from django.core.files.storage import storages
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
 
+from consultalab.audit.models import ArquivoAuditoria
+from consultalab.audit.models import PerfilRequisicao
+from consultalab.bacen.models import ImportacaoLote
 from consultalab.bacen.tests.factories import RequisicaoBacenFactory
 from consultalab.users.models import User
 from consultalab.users.tests.factories import UserFactory
 
 
 @pytest.fixture(autouse=True)
-def _media_storage(settings, tmpdir) -> None:
+def _media_storage(settings, tmpdir, monkeypatch) -> None:
     settings.MEDIA_ROOT = tmpdir.strpath
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "private": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": tmpdir.mkdir("private").strpath},
+        },
+    }
+    # O storage de um FileField é resolvido na carga dos models
+    for model in (ImportacaoLote, ArquivoAuditoria, PerfilRequisicao):
+        monkeypatch.setattr(
+            model._meta.get_field("arquivo"),  # noqa: SLF001
+            "storage",
+            storages["private"],
+        )
 
 
 @pytest.fixture
@@ -23,3 +45,22 @@ def requisicao_bacen_cpf(db) -> RequisicaoBacenFactory:
 @pytest.fixture
 def requisicao_bacen_cnpj(db) -> RequisicaoBacenFactory:
     return RequisicaoBacenFactory(tipo_requisicao="1", termo_busca="12345678000100")
+
+
+@pytest.fixture(scope="session")
+def _span_exporter() -> InMemorySpanExporter:
+    # O TracerProvider global só pode ser definido uma vez por processo
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider()
+        trace.set_tracer_provider(provider)
+    exporter = InMemorySpanExporter()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return exporter
+
+
+@pytest.fixture
+def spans(_span_exporter) -> InMemorySpanExporter:
+    _span_exporter.clear()
+    yield _span_exporter
+    _span_exporter.clear()
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "consultalab.core"
+
+    def ready(self):
+        from consultalab.core.tracing import configure_tracing
+
+        configure_tracing()
@@ -1,130 +1,236 @@
 import logging
+import uuid
 
 from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.http import HttpResponseRedirect
 from django.shortcuts import redirect
 from django.urls import reverse
 
+from consultalab.core.query_budget import QueryStats
+from consultalab.core.query_budget import check_query_budget
+from consultalab.core.query_budget import get_query_budget
+
 logger = logging.getLogger(__name__)
 
 
-class ForceTwoFactorMiddleware:
+# Chave de sessão em que fica guardado que o usuário já configurou o 2FA
+MFA_SESSION_KEY = "_mfa_configured"
+MFA_VERSION_CACHE_KEY = "mfa_versao:{}"
+
+
+def mfa_version(user_id) -> str:
     """
-    Middleware que força todos os usuários autenticados a configurar 2FA.
-    Usuários sem 2FA são redirecionados para o fluxo de configuração MFA.
+    Versão atual dos autenticadores do usuário, guardada no cache.
+
+    A marca de 2FA de uma sessão só vale enquanto a versão que ela guardou for
+    a atual; remover um autenticador troca a versão e invalida as marcas de
+    todas as sessões do usuário. Se o valor sair do cache, uma nova versão é
+    criada e as sessões voltam a consultar o banco.
+    """
+    key = MFA_VERSION_CACHE_KEY.format(user_id)
+    cache.add(key, uuid.uuid4().hex, timeout=None)
+    return cache.get(key)
+
+
+def invalidate_mfa_version(user_id) -> None:
+    cache.delete(MFA_VERSION_CACHE_KEY.format(user_id))
+
+
+def mark_mfa_configured(session, user_id) -> None:
+    """Marca na sessão que o usuário tem 2FA, na versão atual."""
+    session[MFA_SESSION_KEY] = mfa_version(user_id)
+
+
+def mfa_marked(session, user_id) -> bool:
+    marca = session.get(MFA_SESSION_KEY)
+    return bool(marca) and marca == mfa_version(user_id)
+
+
+class ForceAccountSetupMiddleware:
     """
+    Middleware que bloqueia usuários autenticados com pendências na conta.
+
+    - Usuários sem 2FA são redirecionados para o fluxo de configuração MFA.
+    - Usuários com troca de senha obrigatória são redirecionados para o perfil.
+
+    As duas verificações usam o mesmo ``request.user`` (já carregado pelo
+    AuthenticationMiddleware) e apenas a de 2FA, que depende de uma consulta,
+    guarda o resultado na sessão.
+    """
+
+    # URLs que devem permanecer acessíveis sem 2FA
+    mfa_allowed_paths = (
+        "/contas/2fa/",  # URLs do allauth MFA
+        "/contas/logout/",  # Logout
+        "/contas/password/reset/",  # Reset de senha
+        "/static/",  # Arquivos estáticos
+        "/media/",  # Arquivos de mídia
+        "/admin/",  # Admin (pode ser necessário para recuperação)
+        "/__debug__/",  # Django Debug Toolbar
+        "/400/",  # Páginas de erro
+        "/403/",
+        "/404/",
+        "/500/",
+    )
+    # URLs que devem permanecer acessíveis com troca de senha pendente
+    password_allowed_paths = (
+        "/usuarios/",
+        "/contas/",
+        "/static/",
+        "/media/",
+        "/admin/",  # Permitir admin caso seja necessário
+        "/__debug__/",  # Django Debug Toolbar
+    )
+    mfa_setup_url = "/contas/2fa/totp/activate/"
 
     def __init__(self, get_response):
         self.get_response = get_response
+        # Se o allauth.mfa não está instalado, a verificação de 2FA é ignorada
+        self.mfa_installed = apps.is_installed("allauth.mfa")
 
     def __call__(self, request):
-        # Verificar se o usuário está autenticado
-        if request.user.is_authenticated:
-            logger.debug(
-                "User %s authenticated, checking MFA status",
-                request.user.email,
-            )
-
-            # Verificar se o usuário tem 2FA configurado
-            if not self._user_has_mfa(request.user):
-                logger.debug("User %s does not have MFA configured", request.user.email)
-
-                # URLs que devem permanecer acessíveis sem 2FA
-                allowed_paths = [
-                    "/contas/2fa/",  # URLs do allauth MFA (correto!)
-                    "/contas/logout/",  # Logout
-                    "/contas/password/reset/",  # Reset de senha
-                    "/static/",  # Arquivos estáticos
-                    "/media/",  # Arquivos de mídia
-                    "/admin/",  # Admin (pode ser necessário para recuperação)
-                    "/__debug__/",  # Django Debug Toolbar
-                    "/400/",  # Páginas de erro
-                    "/403/",
-                    "/404/",
-                    "/500/",
-                ]
-
-                # Verificar se a URL atual é permitida
-                path_allowed = any(
-                    request.path_info.startswith(path) for path in allowed_paths
-                )
-
-                logger.debug("Path %s allowed: %s", request.path_info, path_allowed)
-
-                # Se não é uma URL permitida, redirecionar para configuração MFA
-                if not path_allowed:
-                    # Preservar a URL de destino usando next
-                    next_url = request.get_full_path()
-                    mfa_setup_url = "/contas/2fa/totp/activate/"
-                    separator = "&" if "?" in mfa_setup_url else "?"
-                    redirect_url = f"{mfa_setup_url}{separator}next={next_url}"
-                    logger.debug("Redirecting to: %s", redirect_url)
-                    return redirect(redirect_url)
-            else:
-                logger.debug("User %s has MFA configured", request.user.email)
+        user = request.user
+        if user.is_authenticated:
+            path = request.path_info
+
+            if not path.startswith(self.mfa_allowed_paths) and not self._user_has_mfa(
+                request,
+            ):
+                # Preservar a URL de destino usando next
+                redirect_url = f"{self.mfa_setup_url}?next={request.get_full_path()}"
+                logger.debug("User without MFA redirected to: %s", redirect_url)
+                return redirect(redirect_url)
+
+            # Requisições HTMX não são redirecionadas
+            if (
+                user.force_password_change
+                and not user.is_superuser
+                and not path.startswith(self.password_allowed_paths)
+                and not request.headers.get("HX-Request")
+            ):
+                url = reverse("users:detail", kwargs={"pk": user.id})
+                return HttpResponseRedirect(f"{url}?force_password_change=true")
 
         return self.get_response(request)
 
-    def _user_has_mfa(self, user):
+    def _user_has_mfa(self, request):
         """
         Verifica se o usuário tem 2FA configurado.
-        Usa os modelos do allauth.mfa para verificar dispositivos ativos.
+
+        Apenas o resultado positivo fica em cache na sessão, já que usuários sem
+        2FA só navegam pelas URLs permitidas até concluírem a configuração. A
+        marca guarda a versão dos autenticadores do usuário (``mfa_version``),
+        trocada sempre que um deles é removido, inclusive pelo admin ou pelo
+        shell (ver ``consultalab.users.signals``).
         """
-        try:
-            # Verificar se o allauth.mfa está instalado
-            if not apps.is_installed("allauth.mfa"):
-                logger.debug("allauth.mfa not installed, skipping MFA check")
-                return True  # Se MFA não está configurado, pular verificação
-
-            # Importar dinamicamente para evitar erros de importação
-            from allauth.mfa.models import Authenticator
-
-            # Verificar se o usuário tem pelo menos um autenticador TOTP ativo
-            # (códigos de recuperação são opcionais e criados automaticamente)
-            has_mfa = Authenticator.objects.filter(
-                user=user,
-                type="totp",
-            ).exists()
-
-            logger.debug("User %s MFA status: %s", user.email, has_mfa)
-        except ImportError:
-            # Em caso de erro, assumir que não tem MFA configurado para ser seguro
-            logger.exception("Error checking MFA status for user %s", user.email)
-            return False
-        else:
-            return has_mfa
-
-
-class ForceChangePasswordMiddleware:
+        if not self.mfa_installed:
+            return True
+
+        if mfa_marked(request.session, request.user.id):
+            return True
+
+        from allauth.mfa.models import Authenticator
+
+        # Verificar se o usuário tem pelo menos um autenticador TOTP ativo
+        # (códigos de recuperação são opcionais e criados automaticamente)
+        has_mfa = Authenticator.objects.filter(
+            user=request.user,
+            type=Authenticator.Type.TOTP,
+        ).exists()
+        if has_mfa:
+            mark_mfa_configured(request.session, request.user.id)
+        return has_mfa
+
+
+class QueryCountHeaderMiddleware:
+    """
+    Informa nos cabeçalhos ``X-DB-Queries`` e ``X-DB-Time`` (em ms) quantas
+    consultas a requisição fez e quanto tempo passou nelas, medidos com o
+    ``QueryStats`` do orçamento de consultas.
+
+    Usado pelo teste de carga (``manage.py testar_carga``) para relatar o
+    número de consultas por endpoint. Só fica ativo com
+    ``QUERY_COUNT_HEADER``; fora disso é removido da pilha na inicialização.
+    """
+
     def __init__(self, get_response):
+        if not settings.QUERY_COUNT_HEADER:
+            raise MiddlewareNotUsed
         self.get_response = get_response
 
     def __call__(self, request):
-        # Verificar se o usuário precisa trocar senha
-        if (
-            request.user.is_authenticated
-            and not request.user.is_superuser
-            and request.user.force_password_change
-        ):
-            # Permitir apenas URLs essenciais
-            allowed_paths = [
-                "/usuarios/",
-                "/contas/",
-                "/static/",
-                "/media/",
-                "/admin/",  # Permitir admin caso seja necessário
-                "/__debug__/",  # Django Debug Toolbar
-            ]
-
-            # Verificar se a URL atual é permitida
-            path_allowed = any(
-                request.path_info.startswith(path) for path in allowed_paths
-            )
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        response["X-DB-Queries"] = stats.count
+        response["X-DB-Time"] = f"{stats.time * 1000:.2f}"
+        return response
 
-            # Se não é uma requisição HTMX e não está em uma URL permitida, redirecionar
-            if not request.headers.get("HX-Request") and not path_allowed:
-                url = reverse("users:detail", kwargs={"pk": request.user.id})
-                url = url + "?force_password_change=true"
-                return HttpResponseRedirect(url)
 
-        return self.get_response(request)
+class RequestProfilerMiddleware:
+    """
+    Perfil sob demanda da requisição, pedido por um administrador com o
+    cabeçalho ``X-Profile`` ou o parâmetro ``_perfil``
+    (ver ``consultalab.audit.profiling``).
+
+    Deve ficar depois do AuthenticationMiddleware. Desativado com
+    ``REQUEST_PROFILER``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILER:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from consultalab.audit.profiling import profile_request
+        from consultalab.audit.profiling import profile_requested
+
+        if not profile_requested(request):
+            return self.get_response(request)
+        return profile_request(request, self.get_response)
+
+
+class QueryBudgetMiddleware:
+    """
+    Verifica o orçamento de consultas (``query_budget``) das views que o
+    declaram; ver ``consultalab.core.query_budget``.
+
+    Com ``QUERY_BUDGET="log"`` as violações vão para o log e com ``"raise"``
+    levantam ``QueryBudgetExceededError``; vazio, o middleware é removido da pilha.
+    Deve ser o último da lista, para medir apenas a view e a renderização.
+    """
+
+    modes = ("log", "raise")
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET:
+            raise MiddlewareNotUsed
+        if settings.QUERY_BUDGET not in self.modes:
+            msg = f"QUERY_BUDGET inválido: {settings.QUERY_BUDGET!r}"
+            raise ImproperlyConfigured(msg)
+        self.get_response = get_response
+        self.raise_exception = settings.QUERY_BUDGET == "raise"
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        budget = getattr(request, "_query_budget", None)
+        if budget is not None:
+            check_query_budget(
+                *budget,
+                stats,
+                raise_exception=self.raise_exception,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = get_query_budget(view_func)
+        if budget is not None:
+            request._query_budget = (view_func.view_class.__name__, budget)  # noqa: SLF001
@@ -0,0 +1,63 @@
+"""
+Eventos enviados aos navegadores pelo websocket (``config.websocket``).
+
+Cada usuário tem um canal no Redis (``user_channel``): os workers publicam
+nele e cada processo ASGI repassa as mensagens às conexões abertas daquele
+usuário. A publicação é de melhor esforço: sem Redis o evento é descartado e
+as telas continuam sendo atualizadas pelo polling do htmx.
+"""
+
+import functools
+import json
+import logging
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+USER_CHANNEL_PREFIX = "consultalab:usuario:"
+PUBLISH_TIMEOUT = 1  # Segundos para conectar/publicar antes de desistir
+
+
+def user_channel(user_id) -> str:
+    return f"{USER_CHANNEL_PREFIX}{user_id}"
+
+
+def user_id_from_channel(channel: str) -> int:
+    return int(channel.removeprefix(USER_CHANNEL_PREFIX))
+
+
+def encode_event(event: str, data: dict | None = None) -> str:
+    return json.dumps({"event": event, "data": data or {}}, cls=DjangoJSONEncoder)
+
+
+def events_enabled() -> bool:
+    return bool(settings.WEBSOCKET_REDIS_URL)
+
+
+@functools.cache
+def _redis_client(url):
+    return redis.Redis.from_url(
+        url,
+        socket_connect_timeout=PUBLISH_TIMEOUT,
+        socket_timeout=PUBLISH_TIMEOUT,
+    )
+
+
+def publish_user_event(user_id, event: str, data: dict | None = None) -> bool:
+    """
+    Publica ``event`` para as conexões do usuário. Retorna se foi publicado.
+    """
+    if not events_enabled():
+        return False
+    try:
+        _redis_client(settings.WEBSOCKET_REDIS_URL).publish(
+            user_channel(user_id),
+            encode_event(event, data),
+        )
+    except redis.RedisError as e:
+        logger.warning("Evento %s do usuário %s descartado: %s", event, user_id, e)
+        return False
+    return True
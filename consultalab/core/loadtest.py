@@ -0,0 +1,282 @@
+"""
+Teste de carga das telas htmx (``manage.py testar_carga``).
+
+Usuários sintéticos navegam em paralelo contra um servidor em execução: tela
+inicial, importação em lote, processamento de uma requisição, polling do
+status até a conclusão e geração do relatório em PDF. Para cada endpoint são
+medidos vazão, latência (p50/p95/p99) e o número de consultas ao banco,
+informado pelo servidor no cabeçalho ``X-DB-Queries`` quando ele roda com
+``QUERY_COUNT_HEADER=True`` (ver ``QueryCountHeaderMiddleware``).
+
+Os usuários sintéticos não passam pelo login: as sessões são criadas
+diretamente no banco, já com a marca de 2FA configurado, então o servidor
+precisa usar o mesmo banco que o comando, e o comando só roda com
+``LOAD_TEST_ENABLED``. Para o processamento não depender do Bacen, os workers
+devem apontar para o simulador (``manage.py simular_bacen``).
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from importlib import import_module
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth import HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth import get_user_model
+from django.contrib.auth import load_backend
+from django.contrib.auth.models import Permission
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from validate_docbr import CPF
+
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.core.custom_middlewares import mark_mfa_configured
+
+User = get_user_model()
+
+SYNTHETIC_EMAIL = "carga-{}@consultalab.local"
+SYNTHETIC_MOTIVO = "Teste de carga"
+HTTP_TIMEOUT = 60
+STATUS_CONNECTION_ERROR = 599  # Registrado quando não há resposta HTTP
+CSRF_TOKEN_LENGTH = 32
+
+
+def percentile(values, p):
+    """Percentil ``p`` (0-100) pelo método nearest-rank."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def create_session(user) -> str:
+    """Sessão autenticada (e com 2FA) do usuário, sem passar pelo login."""
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)  # noqa: SLF001
+    # O primeiro backend que autentica sessões (o do axes só bloqueia logins)
+    session[BACKEND_SESSION_KEY] = next(
+        path
+        for path in settings.AUTHENTICATION_BACKENDS
+        if hasattr(load_backend(path), "get_user")
+    )
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    mark_mfa_configured(session, user.id)
+    session.create()
+    return session.session_key
+
+
+def prepare_users(total, requisicoes_por_usuario):
+    """
+    Cria (ou reaproveita) os usuários sintéticos, com permissão para consultas
+    Pix, cada um com ``requisicoes_por_usuario`` requisições novas a processar.
+
+    Retorna uma lista de ``(chave da sessão, ids das requisições)``.
+    """
+    cpf = CPF()
+    # Sem a permissão, todas as linhas da importação em lote seriam recusadas
+    permissao = Permission.objects.get(
+        content_type__app_label="users",
+        codename="can_request_pix",
+    )
+    preparados = []
+    for i in range(total):
+        user, _ = User.objects.get_or_create(
+            email=SYNTHETIC_EMAIL.format(i),
+            defaults={"name": f"Usuário de carga {i}"},
+        )
+        user.user_permissions.add(permissao)
+        requisicoes = RequisicaoBacen.objects.bulk_create_with_audit(
+            [
+                RequisicaoBacen(
+                    user=user,
+                    tipo_requisicao="1",
+                    termo_busca=cpf.generate(),
+                    motivo=SYNTHETIC_MOTIVO,
+                )
+                for _ in range(requisicoes_por_usuario)
+            ],
+            actor=user,
+        )
+        preparados.append((create_session(user), [r.id for r in requisicoes]))
+    return preparados
+
+
+class LoadTestMetrics:
+    """Amostras por endpoint, coletadas de várias threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.amostras = defaultdict(list)
+        self.inicio = time.monotonic()
+        self.fim = None
+
+    def record(self, endpoint, elapsed, status, queries):
+        with self._lock:
+            self.amostras[endpoint].append((elapsed, status, queries))
+
+    def finish(self):
+        self.fim = time.monotonic()
+
+    def report(self):
+        duracao = (self.fim or time.monotonic()) - self.inicio
+        linhas = []
+        for endpoint, amostras in sorted(self.amostras.items()):
+            latencias = [elapsed * 1000 for elapsed, _, _ in amostras]
+            queries = [q for _, _, q in amostras if q is not None]
+            linhas.append(
+                {
+                    "endpoint": endpoint,
+                    "requisicoes": len(amostras),
+                    "erros": sum(
+                        1
+                        for _, status, _ in amostras
+                        if status >= HTTPStatus.BAD_REQUEST
+                    ),
+                    "por_segundo": len(amostras) / duracao if duracao else 0,
+                    "p50_ms": percentile(latencias, 50),
+                    "p95_ms": percentile(latencias, 95),
+                    "p99_ms": percentile(latencias, 99),
+                    "queries_media": sum(queries) / len(queries) if queries else None,
+                    "queries_max": max(queries, default=None),
+                },
+            )
+        return linhas
+
+
+class VirtualUser:
+    """Um analista sintético, com a própria sessão HTTP."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        base_url,
+        session_key,
+        requisicoes,
+        metrics,
+        *,
+        linhas_upload=20,
+        poll_interval=1.0,
+        max_polls=30,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.requisicoes = list(requisicoes)
+        self.metrics = metrics
+        self.linhas_upload = linhas_upload
+        self.poll_interval = poll_interval
+        self.max_polls = max_polls
+
+        csrf_token = get_random_string(CSRF_TOKEN_LENGTH)
+        self.http = requests.Session()
+        self.http.cookies.set(settings.SESSION_COOKIE_NAME, session_key)
+        self.http.cookies.set(settings.CSRF_COOKIE_NAME, csrf_token)
+        self.http.headers.update({"X-CSRFToken": csrf_token, "HX-Request": "true"})
+
+    def request(self, endpoint, method, path, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            response = self.http.request(
+                method,
+                f"{self.base_url}{path}",
+                timeout=HTTP_TIMEOUT,
+                allow_redirects=False,
+                **kwargs,
+            )
+        except requests.RequestException:
+            self.metrics.record(
+                endpoint,
+                time.perf_counter() - inicio,
+                STATUS_CONNECTION_ERROR,
+                None,
+            )
+            return None
+        queries = response.headers.get("X-DB-Queries")
+        self.metrics.record(
+            endpoint,
+            time.perf_counter() - inicio,
+            response.status_code,
+            int(queries) if queries is not None else None,
+        )
+        return response
+
+    def bulk_file(self):
+        cpf = CPF()
+        linhas = (
+            f"1,{cpf.generate()},{SYNTHETIC_MOTIVO}" for _ in range(self.linhas_upload)
+        )
+        return "\n".join(linhas).encode()
+
+    def run_iteration(self):
+        self.request("home", "GET", reverse("core:home"))
+        self.request(
+            "bulk_upload",
+            "POST",
+            reverse("bacen:bulk_request_upload"),
+            files={"arquivo_txt": ("carga.txt", self.bulk_file(), "text/plain")},
+        )
+        if not self.requisicoes:
+            return
+
+        requisicao_id = self.requisicoes.pop(0)
+        kwargs = {"requisicao_id": requisicao_id}
+        self.request(
+            "processar",
+            "POST",
+            reverse("bacen:processar_requisicao", kwargs=kwargs),
+        )
+        for _ in range(self.max_polls):
+            response = self.request(
+                "status",
+                "GET",
+                reverse("bacen:requisicao_status", kwargs=kwargs),
+            )
+            # O status 286 (concluída) encerra o polling, como no htmx
+            if response is None or response.status_code != HTTPStatus.OK:
+                break
+            time.sleep(self.poll_interval)
+        self.request(
+            "relatorio_pdf",
+            "GET",
+            reverse("bacen:requisicao_bacen_relatorio", kwargs=kwargs),
+        )
+
+    def run(self, deadline, iteracoes=None):
+        feitas = 0
+        while time.monotonic() < deadline and (iteracoes is None or feitas < iteracoes):
+            self.run_iteration()
+            feitas += 1
+
+
+def run_load_test(
+    base_url,
+    usuarios,
+    *,
+    duracao,
+    iteracoes=None,
+    requisicoes_por_usuario=20,
+    **options,
+):
+    """
+    Executa o teste com ``usuarios`` em paralelo por até ``duracao`` segundos
+    (ou ``iteracoes`` por usuário) e retorna as métricas coletadas. Cada
+    usuário processa uma das ``requisicoes_por_usuario`` por iteração.
+    """
+    preparados = prepare_users(usuarios, requisicoes_por_usuario)
+    metrics = LoadTestMetrics()
+    deadline = time.monotonic() + duracao
+    virtual_users = [
+        VirtualUser(base_url, session_key, requisicoes, metrics, **options)
+        for session_key, requisicoes in preparados
+    ]
+    with ThreadPoolExecutor(max_workers=usuarios) as executor:
+        futures = [executor.submit(vu.run, deadline, iteracoes) for vu in virtual_users]
+        for future in futures:
+            future.result()
+    metrics.finish()
+    return metrics
@@ -0,0 +1,85 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from consultalab.core.loadtest import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa o teste de carga das telas htmx contra um servidor em execução "
+        "e relata vazão, latência (p50/p95/p99) e consultas ao banco por endpoint. "
+        "O servidor deve usar o mesmo banco e rodar com QUERY_COUNT_HEADER=True "
+        "para que as consultas sejam contadas. Exige LOAD_TEST_ENABLED, pois cria "
+        "sessões autenticadas (e com 2FA) direto no banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000")
+        parser.add_argument("--usuarios", type=int, default=10)
+        parser.add_argument(
+            "--duracao",
+            type=float,
+            default=60,
+            help="Duração máxima do teste, em segundos.",
+        )
+        parser.add_argument(
+            "--iteracoes",
+            type=int,
+            default=None,
+            help="Iterações por usuário (sem limite por padrão).",
+        )
+        parser.add_argument("--requisicoes-por-usuario", type=int, default=20)
+        parser.add_argument(
+            "--linhas-upload",
+            type=int,
+            default=20,
+            help="Linhas do arquivo enviado na importação em lote.",
+        )
+        parser.add_argument(
+            "--intervalo-polling",
+            type=float,
+            default=1.0,
+            help="Intervalo entre as consultas de status, em segundos.",
+        )
+        parser.add_argument("--json", action="store_true", help="Saída em JSON.")
+
+    def handle(self, *args, **options):
+        if not settings.LOAD_TEST_ENABLED:
+            msg = (
+                "O teste de carga cria sessões autenticadas sem login nem 2FA e "
+                "só pode ser executado com LOAD_TEST_ENABLED=True, em um "
+                "ambiente descartável."
+            )
+            raise CommandError(msg)
+
+        metrics = run_load_test(
+            options["url"],
+            options["usuarios"],
+            duracao=options["duracao"],
+            iteracoes=options["iteracoes"],
+            requisicoes_por_usuario=options["requisicoes_por_usuario"],
+            linhas_upload=options["linhas_upload"],
+            poll_interval=options["intervalo_polling"],
+        )
+        linhas = metrics.report()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(linhas, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'endpoint':<15}{'reqs':>7}{'erros':>7}{'req/s':>10}"
+            f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}",
+        )
+        for linha in linhas:
+            queries = linha["queries_media"]
+            self.stdout.write(
+                f"{linha['endpoint']:<15}{linha['requisicoes']:>7}"
+                f"{linha['erros']:>7}{linha['por_segundo']:>10.2f}"
+                f"{linha['p50_ms']:>10.1f}{linha['p95_ms']:>10.1f}"
+                f"{linha['p99_ms']:>10.1f}"
+                f"{'-' if queries is None else f'{queries:.1f}':>9}",
+            )
@@ -0,0 +1,99 @@
+"""
+Métricas Prometheus da aplicação.
+
+A web expõe as métricas em ``/metrics`` (ver ``MetricsView``) e cada worker do
+Celery sobe um servidor HTTP próprio na porta ``WORKER_METRICS_PORT``. Com
+vários processos (workers do gunicorn, pool prefork do Celery) a variável de
+ambiente ``PROMETHEUS_MULTIPROC_DIR`` deve apontar para um diretório vazio
+antes de os processos iniciarem, para que as amostras de todos eles sejam
+somadas na coleta.
+
+As métricas das consultas ao Bacen ficam em ``consultalab.bacen.metrics``.
+"""
+
+import functools
+import logging
+import os
+
+from kombu.exceptions import OperationalError
+from prometheus_client import REGISTRY
+from prometheus_client import CollectorRegistry
+from prometheus_client import Counter
+from prometheus_client import Histogram
+from prometheus_client import multiprocess
+from prometheus_client import start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+TASK_STAGE_DURATION = Histogram(
+    "consultalab_task_stage_seconds",
+    "Duração de cada etapa das tarefas do Celery.",
+    ["task", "stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+TASK_FAILURES = Counter(
+    "consultalab_task_failures",
+    "Tarefas do Celery que falharam, por motivo (classe da exceção).",
+    ["task", "reason"],
+)
+
+
+class CeleryQueueCollector:
+    """
+    Mensagens aguardando em cada fila do Celery, lidas do broker a cada
+    coleta. Com o broker fora do ar a métrica é omitida.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+
+    def collect(self):
+        from config.celery_app import app as celery_app
+
+        app = self.app or celery_app
+        gauge = GaugeMetricFamily(
+            "consultalab_celery_queue_length",
+            "Mensagens aguardando nas filas do Celery.",
+            labels=["queue"],
+        )
+        with app.connection_for_read() as conn:
+            try:
+                conn.ensure_connection(max_retries=1, interval_start=0)
+                channel = conn.default_channel
+            except (OperationalError, *conn.connection_errors):
+                logger.warning("Broker indisponível para medir as filas do Celery.")
+                return
+            for queue in app.amqp.queues:
+                try:
+                    _, tamanho, _ = channel.queue_declare(queue=queue, passive=True)
+                except conn.channel_errors:
+                    # No Redis a fila vazia não existe
+                    tamanho = 0
+                gauge.add_metric([queue], tamanho)
+        yield gauge
+
+
+def multiprocess_enabled() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+@functools.cache
+def metrics_registry() -> CollectorRegistry:
+    """Registro usado na coleta, somando os processos quando necessário."""
+    registry = CollectorRegistry()
+    if multiprocess_enabled():
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(CeleryQueueCollector())
+    return registry
+
+
+def start_worker_metrics_server(port: int) -> None:
+    """
+    Servidor de métricas do worker. Deve ser iniciado no processo principal,
+    antes do pool criar os filhos.
+    """
+    start_http_server(port, registry=metrics_registry())
+    logger.info("Métricas do worker disponíveis na porta %s.", port)
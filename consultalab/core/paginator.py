@@ -0,0 +1,115 @@
+import base64
+import binascii
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class KeysetPage(Sequence):
+    """Página de resultados devolvida pelo ``KeysetPaginator``."""
+
+    def __init__(self, object_list, paginator, *, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f"<KeysetPage {len(self)} itens>"
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0])
+        return None
+
+
+class KeysetPaginator:
+    """
+    Paginação por chave (keyset) sobre ``(date_field, id)`` em ordem decrescente.
+
+    Em vez de ``OFFSET``, cada página começa logo após (ou antes) da linha
+    indicada pelo cursor, então o custo de uma página é o mesmo em qualquer
+    profundidade desde que exista um índice com a mesma ordenação. Os cursores
+    são opacos para o usuário, mas não são assinados: um cursor alterado apenas
+    desloca a página dentro do queryset já filtrado.
+    """
+
+    def __init__(self, queryset, per_page, date_field="created"):
+        self.date_field = date_field
+        self.queryset = queryset.order_by(f"-{date_field}", "-id")
+        self.per_page = per_page
+
+    def page(self, after=None, before=None):
+        """
+        Retorna a página seguinte a ``after`` ou anterior a ``before``.
+
+        Sem cursor (ou com um cursor inválido) retorna a primeira página.
+        """
+        if after_key := self.decode_cursor(after):
+            return self._page_after(after_key)
+        if before_key := self.decode_cursor(before):
+            return self._page_before(before_key)
+        return self._page_after(None)
+
+    def _page_after(self, key):
+        queryset = self.queryset
+        if key:
+            value, pk = key
+            queryset = queryset.filter(
+                Q(**{f"{self.date_field}__lt": value}) | Q(id__lt=pk),
+                **{f"{self.date_field}__lte": value},
+            )
+        objects = list(queryset[: self.per_page + 1])
+        return KeysetPage(
+            objects[: self.per_page],
+            self,
+            has_next=len(objects) > self.per_page,
+            has_previous=key is not None,
+        )
+
+    def _page_before(self, key):
+        value, pk = key
+        queryset = self.queryset.filter(
+            Q(**{f"{self.date_field}__gt": value}) | Q(id__gt=pk),
+            **{f"{self.date_field}__gte": value},
+        ).reverse()
+        objects = list(queryset[: self.per_page + 1])
+        return KeysetPage(
+            objects[: self.per_page][::-1],
+            self,
+            has_next=True,
+            has_previous=len(objects) > self.per_page,
+        )
+
+    def encode_cursor(self, obj):
+        valor = f"{getattr(obj, self.date_field).isoformat()}|{obj.id}"
+        return base64.urlsafe_b64encode(valor.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            valor = base64.urlsafe_b64decode(cursor + padding).decode()
+            created, pk = valor.split("|")
+            return datetime.fromisoformat(created), int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            return None
@@ -0,0 +1,119 @@
+"""
+Orçamento de consultas SQL por view.
+
+As views mais acessadas declaram quantas consultas (e quanto tempo no banco)
+uma requisição pode gastar, com o atributo ``query_budget``. O
+``QueryBudgetMiddleware`` mede cada requisição a essas views, da view até a
+renderização do template, e conforme ``QUERY_BUDGET``:
+
+- ``"log"`` (homologação): registra as violações no log;
+- ``"raise"`` (testes): levanta ``QueryBudgetExceededError``.
+
+Nos testes com ``RequestFactory``, que não passam pelos middlewares, o mesmo
+limite é verificado com ``assert_query_budget``. O tempo varia com a máquina e
+por isso só é registrado no log, nunca falha a requisição ou o teste.
+"""
+
+import contextlib
+import logging
+import time
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Controle de transação (ATOMIC_REQUESTS dentro dos testes) não conta
+TRANSACTION_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryBudgetExceededError(AssertionError):
+    pass
+
+
+class QueryBudget:
+    """Limite de consultas e, opcionalmente, de tempo no banco (em segundos)."""
+
+    def __init__(self, queries, time=None):
+        self.queries = queries
+        self.time = time
+
+    def __repr__(self):
+        return f"QueryBudget(queries={self.queries}, time={self.time})"
+
+
+class QueryStats:
+    """
+    ``execute_wrapper`` que conta as consultas e soma o tempo gasto nelas.
+
+    É a mesma medida do orçamento, do cabeçalho ``X-DB-Queries`` e do profiler
+    (que guarda também a duração de cada consulta, em ``record``).
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(TRANSACTION_STATEMENTS):
+            return execute(sql, params, many, context)
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - inicio)
+
+    def record(self, sql, duracao):
+        self.queries.append(sql)
+        self.time += duracao
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+
+def get_query_budget(view_func):
+    """Orçamento declarado na class-based view, se houver."""
+    view_class = getattr(view_func, "view_class", None)
+    return getattr(view_class, "query_budget", None)
+
+
+def check_query_budget(name, budget, stats, *, raise_exception):
+    """
+    Compara as consultas medidas com o orçamento. O excesso de consultas
+    levanta ``QueryBudgetExceededError`` com ``raise_exception``; os demais casos
+    vão para o log.
+    """
+    if stats.count > budget.queries:
+        msg = (
+            f"{name} fez {stats.count} consultas SQL "
+            f"(orçamento: {budget.queries}):\n" + "\n".join(stats.queries)
+        )
+        if raise_exception:
+            raise QueryBudgetExceededError(msg)
+        logger.warning(msg)
+    if budget.time is not None and stats.time > budget.time:
+        logger.warning(
+            "%s passou %.3f s no banco (orçamento: %.3f s).",
+            name,
+            stats.time,
+            budget.time,
+        )
+
+
+@contextlib.contextmanager
+def assert_query_budget(view_class, using=DEFAULT_DB_ALIAS):
+    """
+    Falha se o bloco fizer mais consultas que o orçamento da view. Usado nos
+    testes que chamam a view diretamente; a renderização de uma
+    ``TemplateResponse`` deve ficar dentro do bloco.
+    """
+    stats = QueryStats()
+    with connections[using].execute_wrapper(stats):
+        yield stats
+    check_query_budget(
+        view_class.__name__,
+        view_class.query_budget,
+        stats,
+        raise_exception=True,
+    )
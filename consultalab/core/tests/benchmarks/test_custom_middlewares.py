@@ -0,0 +1,33 @@
+from http import HTTPStatus
+
+import pytest
+from allauth.mfa.models import Authenticator
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+
+from consultalab.core.custom_middlewares import ForceAccountSetupMiddleware
+
+
+def dummy_get_response(request):
+    return HttpResponse()
+
+
+@pytest.mark.django_db
+@pytest.mark.benchmark(group="ForceAccountSetupMiddleware")
+@pytest.mark.parametrize("com_middleware", [False, True])
+def test_request_overhead(benchmark, rf, user, com_middleware):
+    """
+    Custo do middleware por requisição, com o status de 2FA já em cache na
+    sessão, comparado à chamada direta da view (``com_middleware=False``).
+    """
+    Authenticator.objects.create(user=user, type=Authenticator.Type.TOTP, data={})
+    request = rf.get("/bacen/requisicao/1/status/")
+    SessionMiddleware(dummy_get_response).process_request(request)
+    request.user = user
+    middleware = ForceAccountSetupMiddleware(dummy_get_response)
+    middleware(request)
+
+    handler = middleware if com_middleware else dummy_get_response
+    response = benchmark(handler, request)
+
+    assert response.status_code == HTTPStatus.OK
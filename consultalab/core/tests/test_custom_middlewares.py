@@ -0,0 +1,150 @@
+from http import HTTPStatus
+
+import pytest
+from allauth.mfa.models import Authenticator
+from allauth.mfa.signals import authenticator_added
+from allauth.mfa.signals import authenticator_removed
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from consultalab.core.custom_middlewares import MFA_SESSION_KEY
+from consultalab.core.custom_middlewares import ForceAccountSetupMiddleware
+from consultalab.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def dummy_get_response(request):
+    return HttpResponse()
+
+
+@pytest.fixture
+def request_factory(rf: RequestFactory, user: User):
+    def make_request(path="/"):
+        request = rf.get(path)
+        SessionMiddleware(dummy_get_response).process_request(request)
+        request.user = user
+        return request
+
+    return make_request
+
+
+@pytest.fixture
+def totp(user: User) -> Authenticator:
+    return Authenticator.objects.create(
+        user=user,
+        type=Authenticator.Type.TOTP,
+        data={},
+    )
+
+
+class TestForceAccountSetupMiddleware:
+    middleware = ForceAccountSetupMiddleware(dummy_get_response)
+
+    def test_redirects_without_mfa(self, request_factory):
+        response = self.middleware(request_factory("/bacen/requisicao/"))
+
+        assert response.status_code == HTTPStatus.FOUND
+        assert response.url == "/contas/2fa/totp/activate/?next=/bacen/requisicao/"
+
+    def test_allowed_path_without_query(
+        self,
+        request_factory,
+        django_assert_num_queries,
+    ):
+        request = request_factory("/contas/2fa/totp/activate/")
+
+        with django_assert_num_queries(0):
+            response = self.middleware(request)
+
+        assert response.status_code == HTTPStatus.OK
+
+    def test_mfa_flag_cached_in_session(
+        self,
+        request_factory,
+        totp,
+        django_assert_num_queries,
+    ):
+        request = request_factory()
+        with django_assert_num_queries(1):
+            assert self.middleware(request).status_code == HTTPStatus.OK
+        assert request.session[MFA_SESSION_KEY]
+
+        with django_assert_num_queries(0):
+            assert self.middleware(request).status_code == HTTPStatus.OK
+
+    def test_signals_update_session(self, request_factory, user, totp):
+        request = request_factory()
+
+        authenticator_added.send(
+            sender=Authenticator,
+            request=request,
+            user=user,
+            authenticator=totp,
+        )
+        assert request.session[MFA_SESSION_KEY]
+
+        totp.delete()
+        authenticator_removed.send(
+            sender=Authenticator,
+            request=request,
+            user=user,
+            authenticator=totp,
+        )
+        assert MFA_SESSION_KEY not in request.session
+        assert self.middleware(request).status_code == HTTPStatus.FOUND
+
+    def test_removal_invalidates_other_sessions(
+        self,
+        request_factory,
+        totp,
+        django_capture_on_commit_callbacks,
+    ):
+        outra_sessao = request_factory()
+        assert self.middleware(outra_sessao).status_code == HTTPStatus.OK
+
+        # Removido fora das views do allauth (admin, shell)
+        with django_capture_on_commit_callbacks(execute=True):
+            totp.delete()
+
+        assert self.middleware(outra_sessao).status_code == HTTPStatus.FOUND
+
+    def test_force_password_change(self, request_factory, user, totp):
+        user.force_password_change = True
+
+        response = self.middleware(request_factory("/bacen/requisicao/"))
+        assert response.status_code == HTTPStatus.FOUND
+        assert response.url == f"/usuarios/{user.pk}/?force_password_change=true"
+
+        assert self.middleware(request_factory("/contas/")).status_code == HTTPStatus.OK
+
+        request = request_factory("/bacen/requisicao/")
+        request.META["HTTP_HX_REQUEST"] = "true"
+        assert self.middleware(request).status_code == HTTPStatus.OK
+
+    def test_mfa_checked_before_password(self, request_factory, user):
+        user.force_password_change = True
+
+        response = self.middleware(request_factory("/bacen/requisicao/"))
+
+        assert response.url.startswith("/contas/2fa/totp/activate/")
+
+    def test_cached_mfa_check_makes_no_queries(
+        self,
+        request_factory,
+        totp,
+        django_assert_num_queries,
+    ):
+        """
+        Com o status de 2FA já em cache na sessão, o middleware não consulta o
+        banco (o custo por requisição é medido em
+        ``core/tests/benchmarks``).
+        """
+        request = request_factory("/bacen/requisicao/1/status/")
+        self.middleware(request)
+
+        with django_assert_num_queries(0):
+            response = self.middleware(request)
+
+        assert response.status_code == HTTPStatus.OK
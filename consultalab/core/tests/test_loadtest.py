@@ -0,0 +1,100 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.http import HttpResponse
+
+from consultalab.bacen.models import ImportacaoLote
+from consultalab.bacen.tasks import process_bulk_upload
+from consultalab.core.custom_middlewares import QueryCountHeaderMiddleware
+from consultalab.core.loadtest import percentile
+from consultalab.core.loadtest import run_load_test
+from consultalab.users.models import User
+
+P50 = 50
+P95 = 95
+P99 = 99
+USUARIOS = 2
+LINHAS_UPLOAD = 2
+ENDPOINTS = {"home", "bulk_upload", "processar", "status", "relatorio_pdf"}
+
+
+def test_percentile():
+    valores = list(range(1, 101))
+
+    assert percentile(valores, P50) == P50
+    assert percentile(valores, P95) == P95
+    assert percentile(valores, P99) == P99
+    assert percentile([], P50) is None
+
+
+class TestQueryCountHeaderMiddleware:
+    def test_disabled_by_default(self, settings):
+        settings.QUERY_COUNT_HEADER = False
+
+        with pytest.raises(MiddlewareNotUsed):
+            QueryCountHeaderMiddleware(HttpResponse)
+
+    @pytest.mark.django_db
+    def test_counts_queries(self, settings, rf):
+        settings.QUERY_COUNT_HEADER = True
+
+        def get_response(request):
+            User.objects.count()
+            # Como no orçamento de consultas, os SAVEPOINTs não contam
+            with transaction.atomic():
+                User.objects.exists()
+            return HttpResponse()
+
+        response = QueryCountHeaderMiddleware(get_response)(rf.get("/"))
+
+        assert response["X-DB-Queries"] == "2"
+        assert float(response["X-DB-Time"]) >= 0
+
+
+def test_run_load_test(live_server):
+    task = MagicMock(id="tarefa-carga")
+    with (
+        patch("consultalab.bacen.views.request_bacen_pix.delay", return_value=task),
+        # A importação roda no próprio servidor de testes, sem o Celery
+        patch(
+            "consultalab.bacen.views.process_bulk_upload.apply_async",
+            side_effect=lambda args, **kwargs: process_bulk_upload(*args),
+        ),
+    ):
+        metrics = run_load_test(
+            live_server.url,
+            USUARIOS,
+            duracao=30,
+            iteracoes=1,
+            requisicoes_por_usuario=1,
+            linhas_upload=LINHAS_UPLOAD,
+            poll_interval=0,
+            max_polls=1,
+        )
+
+    linhas = {linha["endpoint"]: linha for linha in metrics.report()}
+    assert set(linhas) == ENDPOINTS
+    assert all(linha["requisicoes"] == USUARIOS for linha in linhas.values())
+    assert all(linha["erros"] == 0 for linha in linhas.values())
+    assert User.objects.filter(email__startswith="carga-").count() == USUARIOS
+    # As linhas enviadas viram requisições válidas, não erros de permissão
+    importacoes = ImportacaoLote.objects.filter(user__email__startswith="carga-")
+    assert [
+        (importacao.requisicoes_validas, importacao.requisicoes_invalidas)
+        for importacao in importacoes
+    ] == [(LINHAS_UPLOAD, 0)] * USUARIOS
+
+
+@pytest.mark.django_db
+def test_command_requires_load_test_enabled(settings):
+    settings.LOAD_TEST_ENABLED = False
+
+    with pytest.raises(CommandError, match="LOAD_TEST_ENABLED"):
+        call_command("testar_carga", usuarios=1, iteracoes=1)
+
+    assert not User.objects.filter(email__startswith="carga-").exists()
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+from celery import Celery
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from config.celery_app import count_task_failure
+from consultalab.core.metrics import CeleryQueueCollector
+
+TOKEN = "segredo"  # noqa: S105
+MENSAGENS = 3
+
+
+@pytest.mark.django_db
+class TestMetricsView:
+    def test_disabled_without_token(self, client, settings):
+        settings.METRICS_TOKEN = ""
+        settings.DEBUG = False
+
+        response = client.get(reverse("core:metrics"))
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_rejects_wrong_token(self, client, settings):
+        settings.METRICS_TOKEN = TOKEN
+
+        response = client.get(
+            reverse("core:metrics"),
+            headers={"Authorization": "Bearer outro"},
+        )
+
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+    def test_exposes_metrics(self, client, settings):
+        settings.METRICS_TOKEN = TOKEN
+
+        response = client.get(
+            reverse("core:metrics"),
+            headers={"Authorization": f"Bearer {TOKEN}"},
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert b"consultalab_bacen_api_request_seconds" in response.content
+        assert b"consultalab_task_stage_seconds" in response.content
+
+
+def test_celery_queue_collector():
+    app = Celery(broker="memory://")
+    with app.connection_for_write() as conn:
+        producer = conn.Producer()
+        for _ in range(MENSAGENS):
+            producer.publish(
+                {},
+                routing_key="celery",
+                declare=[app.amqp.queues["celery"]],
+            )
+
+    (gauge,) = CeleryQueueCollector(app).collect()
+
+    assert [(s.labels, s.value) for s in gauge.samples] == [
+        ({"queue": "celery"}, MENSAGENS),
+    ]
+
+
+@pytest.mark.parametrize("exception", [ValueError(), KeyError()])
+def test_count_task_failure(exception):
+    labels = {"task": "tarefa_teste", "reason": type(exception).__name__}
+    antes = REGISTRY.get_sample_value("consultalab_task_failures_total", labels) or 0
+
+    count_task_failure(
+        sender=type("Tarefa", (), {"name": "tarefa_teste"}),
+        exception=exception,
+    )
+
+    assert (
+        REGISTRY.get_sample_value("consultalab_task_failures_total", labels)
+        == antes + 1
+    )
@@ -0,0 +1,56 @@
+import pytest
+from django.utils import timezone
+
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.bacen.tests.factories import RequisicaoBacenFactory
+from consultalab.core.paginator import KeysetPaginator
+
+pytestmark = pytest.mark.django_db
+
+PER_PAGE = 3
+
+
+@pytest.fixture
+def requisicoes(user):
+    requisicoes = RequisicaoBacenFactory.create_batch(8, user=user)
+    # Metade com o mesmo "created", para exercitar o desempate pelo id
+    agora = timezone.now()
+    RequisicaoBacen.objects.filter(id__in=[r.id for r in requisicoes[:4]]).update(
+        created=agora,
+    )
+    return list(RequisicaoBacen.objects.filter(user=user).order_by("-created", "-id"))
+
+
+def test_page_forward_and_backward(requisicoes):
+    paginator = KeysetPaginator(RequisicaoBacen.objects.all(), PER_PAGE)
+
+    pages = [paginator.page()]
+    while pages[-1].has_next:
+        pages.append(paginator.page(after=pages[-1].next_cursor))
+
+    assert [list(page) for page in pages] == [
+        requisicoes[0:3],
+        requisicoes[3:6],
+        requisicoes[6:8],
+    ]
+    assert not pages[0].has_previous
+    assert pages[-1].has_previous
+
+    anterior = paginator.page(before=pages[-1].previous_cursor)
+    assert list(anterior) == requisicoes[3:6]
+    assert anterior.has_next
+    assert anterior.has_previous
+
+    primeira = paginator.page(before=anterior.previous_cursor)
+    assert list(primeira) == requisicoes[0:3]
+    assert not primeira.has_previous
+
+
+@pytest.mark.parametrize("cursor", ["invalido", "MjAyNHxh", ""])
+def test_invalid_cursor_returns_first_page(requisicoes, cursor):
+    paginator = KeysetPaginator(RequisicaoBacen.objects.all(), PER_PAGE)
+
+    page = paginator.page(after=cursor)
+
+    assert list(page) == requisicoes[:PER_PAGE]
+    assert not page.has_previous
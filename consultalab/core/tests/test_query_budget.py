@@ -0,0 +1,88 @@
+import logging
+
+import pytest
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.views.generic import View
+
+from consultalab.core.custom_middlewares import QueryBudgetMiddleware
+from consultalab.core.custom_middlewares import mark_mfa_configured
+from consultalab.core.query_budget import QueryBudget
+from consultalab.core.query_budget import QueryBudgetExceededError
+from consultalab.core.query_budget import assert_query_budget
+from consultalab.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+class UsersCountView(View):
+    query_budget = QueryBudget(queries=1, time=0)
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(User.objects.count())
+
+
+class NPlusOneView(UsersCountView):
+    def get(self, request, *args, **kwargs):
+        for _ in range(3):
+            User.objects.count()
+        return HttpResponse()
+
+
+def call(view_class, rf: RequestFactory):
+    """Passa a requisição pelo middleware como o handler do Django faria."""
+    view = view_class.as_view()
+
+    def get_response(request):
+        middleware.process_view(request, view, (), {})
+        return view(request)
+
+    middleware = QueryBudgetMiddleware(get_response)
+    return middleware(rf.get("/"))
+
+
+def test_within_budget(settings, rf: RequestFactory, caplog):
+    settings.QUERY_BUDGET = "raise"
+
+    with caplog.at_level(logging.WARNING, logger="consultalab.core.query_budget"):
+        response = call(UsersCountView, rf)
+
+    assert response.content == b"0"
+    # O tempo nunca falha a requisição, apenas é registrado
+    assert "passou" in caplog.text
+
+
+def test_exceeded_raises(settings, rf: RequestFactory):
+    settings.QUERY_BUDGET = "raise"
+
+    with pytest.raises(QueryBudgetExceededError, match="NPlusOneView fez 3 consultas"):
+        call(NPlusOneView, rf)
+
+
+def test_exceeded_logs(settings, rf: RequestFactory, caplog):
+    settings.QUERY_BUDGET = "log"
+
+    with caplog.at_level(logging.WARNING, logger="consultalab.core.query_budget"):
+        call(NPlusOneView, rf)
+
+    assert "NPlusOneView fez 3 consultas SQL (orçamento: 1)" in caplog.text
+
+
+def test_assert_query_budget():
+    with pytest.raises(QueryBudgetExceededError), assert_query_budget(NPlusOneView):
+        NPlusOneView().get(None)
+
+
+def test_home_view_through_middleware(client, user: User):
+    """O orçamento vale também com a pilha completa de middlewares."""
+    assert settings.QUERY_BUDGET == "raise"
+    client.force_login(user)
+    session = client.session
+    mark_mfa_configured(session, user.id)
+    session.save()
+
+    response = client.get(reverse("core:home"))
+
+    assert response.status_code == 200  # noqa: PLR2004
@@ -0,0 +1,95 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+from consultalab.core.tracing import _span_exporter
+from consultalab.core.tracing import end_task_span
+from consultalab.core.tracing import inject_trace_context
+from consultalab.core.tracing import record_task_failure
+from consultalab.core.tracing import start_task_span
+from consultalab.core.tracing import traced_queries
+from consultalab.core.tracing import tracer
+
+TASK = "consultalab.bacen.tasks.request_bacen_pix"
+
+
+def run_task(headers, task_id="task-1", exception=None):
+    """Simula o worker: os cabeçalhos da mensagem viram ``task.request``."""
+    task = SimpleNamespace(name=TASK, request=SimpleNamespace(**headers))
+    start_task_span(task_id=task_id, task=task)
+    with tracer.start_as_current_span("trabalho"):
+        pass
+    if exception:
+        record_task_failure(task_id=task_id, exception=exception)
+    end_task_span(task_id=task_id, state="FAILURE" if exception else "SUCCESS")
+
+
+def test_trace_context_propagates_to_task(spans):
+    headers = {}
+    with tracer.start_as_current_span("view"):
+        inject_trace_context(sender=TASK, headers=headers, routing_key="celery")
+
+    run_task(headers)
+
+    by_name = {span.name: span for span in spans.get_finished_spans()}
+    publish = by_name[f"celery.publish {TASK}"]
+    run = by_name[f"celery.run {TASK}"]
+    assert "traceparent" in headers
+    assert len({span.context.trace_id for span in by_name.values()}) == 1
+    assert publish.parent.span_id == by_name["view"].context.span_id
+    assert run.parent.span_id == publish.context.span_id
+    assert by_name["trabalho"].parent.span_id == run.context.span_id
+    assert run.attributes["celery.state"] == "SUCCESS"
+
+
+def test_task_without_trace_context_starts_new_trace(spans):
+    run_task({})
+
+    run = next(s for s in spans.get_finished_spans() if s.name.startswith("celery."))
+    assert run.parent is None
+
+
+def test_task_failure_marks_span_as_error(spans):
+    run_task({}, exception=ValueError("falhou"))
+
+    run = next(s for s in spans.get_finished_spans() if s.name.startswith("celery."))
+    assert not run.status.is_ok
+    assert run.events[0].name == "exception"
+
+
+@pytest.mark.django_db
+def test_traced_queries(spans):
+    with (
+        tracer.start_as_current_span("bloco"),
+        traced_queries(),
+        connection.cursor() as cursor,
+    ):
+        cursor.execute("SELECT 1")
+
+    queries = [s for s in spans.get_finished_spans() if s.name == "db.query"]
+    assert [s.attributes["db.statement"] for s in queries] == ["SELECT 1"]
+    assert queries[0].attributes["db.system"] == "postgresql"
+
+
+def test_file_exporter_writes_json_lines(settings, tmp_path, spans):
+    settings.TRACING_EXPORTER = "arquivo"
+    settings.TRACING_FILE = tmp_path / "traces.jsonl"
+    with tracer.start_as_current_span("exportado"):
+        pass
+
+    exporter = _span_exporter()
+    exporter.export(spans.get_finished_spans())
+    exporter.out.close()
+
+    linhas = settings.TRACING_FILE.read_text().splitlines()
+    assert [json.loads(linha)["name"] for linha in linhas] == ["exportado"]
+
+
+def test_invalid_exporter(settings):
+    settings.TRACING_EXPORTER = "zipkin"
+
+    with pytest.raises(ImproperlyConfigured):
+        _span_exporter()
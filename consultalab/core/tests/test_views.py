@@ -1,15 +1,22 @@
 from http import HTTPStatus
+from unittest.mock import patch
 
 import pytest
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.test import RequestFactory
 
+from consultalab.bacen.models import RequisicaoBacen
+from consultalab.bacen.tests.factories import RequisicaoBacenFactory
 from consultalab.core.views import HomeView
 from consultalab.users.models import User
 from consultalab.users.tests.factories import UserFactory
 
 pytestmark = pytest.mark.django_db
 
+PAGE_SIZE = 2
+TOTAL_REQUISICOES = 3
+
 
 class TestHomeView:
     def test_non_authenticated_user(self, user: User, rf: RequestFactory):
@@ -25,3 +32,41 @@ class TestHomeView:
         response = HomeView.as_view()(request, pk=user.pk)
 
         assert response.status_code == HTTPStatus.OK
+
+    def test_pagination(self, user: User, rf: RequestFactory):
+        RequisicaoBacenFactory.create_batch(TOTAL_REQUISICOES, user=user)
+        request = rf.get("/", {"busca": ""})
+        request.user = user
+
+        with patch.object(HomeView, "page_size", PAGE_SIZE):
+            response = HomeView.as_view()(request)
+            response.render()
+
+        requisicoes = response.context_data["requisicoes"]
+        assert len(requisicoes) == PAGE_SIZE
+        assert response.context_data["requisicoes_total"] == TOTAL_REQUISICOES
+        assert requisicoes.has_next
+        assert f"after={requisicoes.next_cursor}" in response.content.decode()
+        assert "busca=" in response.content.decode()
+
+    def test_total_is_cached(
+        self,
+        user: User,
+        rf: RequestFactory,
+        django_capture_on_commit_callbacks,
+    ):
+        cache.clear()
+        RequisicaoBacenFactory.create_batch(TOTAL_REQUISICOES, user=user)
+        request = rf.get("/")
+        request.user = user
+        view = HomeView(request=request)
+        requisicoes = RequisicaoBacen.objects.filter(user=user)
+
+        assert view.get_requisicoes_total(requisicoes) == TOTAL_REQUISICOES
+        RequisicaoBacen.objects.update(user=UserFactory())
+        assert view.get_requisicoes_total(requisicoes) == TOTAL_REQUISICOES
+
+        # Uma nova requisição do usuário invalida o total em cache
+        with django_capture_on_commit_callbacks(execute=True):
+            RequisicaoBacenFactory(user=user)
+        assert view.get_requisicoes_total(requisicoes) == 1
@@ -0,0 +1,217 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from django.conf import settings
+
+from config import websocket
+from consultalab.core.custom_middlewares import mark_mfa_configured
+from consultalab.core.events import encode_event
+from consultalab.core.events import publish_user_event
+from consultalab.core.events import user_channel
+from consultalab.users.models import User
+
+QUEUE_SIZE = 2
+RESPONSE_TIMEOUT = 1
+
+
+class FakeHub:
+    """Hub em memória, no lugar da assinatura Redis."""
+
+    def __init__(self):
+        self.connections = {}
+
+    async def subscribe(self, connection):
+        self.connections[connection.user_id] = connection
+
+    async def unsubscribe(self, connection):
+        self.connections.pop(connection.user_id, None)
+
+
+class WebsocketClient:
+    def __init__(self, cookies=None, origin=None):
+        scope = self.scope(cookies, origin)
+        self.inbound = asyncio.Queue()
+        self.outbound = asyncio.Queue()
+        self.task = asyncio.create_task(
+            websocket.websocket_application(scope, self.inbound.get, self.outbound.put),
+        )
+
+    @staticmethod
+    def scope(cookies=None, origin=None):
+        headers = []
+        if cookies:
+            cookie = "; ".join(f"{name}={value}" for name, value in cookies.items())
+            headers.append((b"cookie", cookie.encode()))
+        if origin:
+            headers.append((b"origin", origin.encode()))
+        return {"type": "websocket", "path": "/ws/eventos/", "headers": headers}
+
+    async def connect(self):
+        await self.inbound.put({"type": "websocket.connect"})
+        return await self.receive()
+
+    async def receive(self):
+        return await asyncio.wait_for(self.outbound.get(), RESPONSE_TIMEOUT)
+
+    async def send_text(self, text):
+        await self.inbound.put({"type": "websocket.receive", "text": text})
+
+    async def disconnect(self):
+        await self.inbound.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, RESPONSE_TIMEOUT)
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    fake_hub = FakeHub()
+    monkeypatch.setattr(websocket, "hub", fake_hub)
+    return fake_hub
+
+
+@pytest.fixture
+def session_cookies(client, user: User):
+    client.force_login(user)
+    session = client.session
+    mark_mfa_configured(session, user.id)
+    session.save()
+    return {settings.SESSION_COOKIE_NAME: session.session_key}
+
+
+class TestUserConnection:
+    def test_push_drops_oldest_when_full(self):
+        connection = websocket.UserConnection(1, QUEUE_SIZE)
+
+        for message in ["a", "b", "c"]:
+            connection.push(message)
+
+        assert connection.descartadas == 1
+        assert [connection.queue.get_nowait() for _ in range(QUEUE_SIZE)] == [
+            "b",
+            "c",
+        ]
+
+
+class TestUserEventHub:
+    def test_dispatch_to_user_connections(self):
+        hub = websocket.UserEventHub()
+        connection = websocket.UserConnection(1, QUEUE_SIZE)
+        other = websocket.UserConnection(2, QUEUE_SIZE)
+        hub.connections[1].add(connection)
+        hub.connections[2].add(other)
+
+        hub.dispatch(user_channel(1).encode(), b'{"event": "requisicao"}')
+
+        assert connection.queue.get_nowait() == '{"event": "requisicao"}'
+        assert other.queue.empty()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWebsocketApplication:
+    def test_rejects_anonymous(self, hub):
+        async def scenario():
+            client = WebsocketClient()
+            return await client.connect()
+
+        assert asyncio.run(scenario()) == {"type": "websocket.close"}
+        assert not hub.connections
+
+    def test_rejects_without_mfa(self, hub, client, user):
+        client.force_login(user)
+        cookies = {settings.SESSION_COOKIE_NAME: client.session.session_key}
+
+        async def scenario():
+            return await WebsocketClient(cookies).connect()
+
+        assert asyncio.run(scenario()) == {"type": "websocket.close"}
+
+    def test_closes_old_db_connections(self, hub, session_cookies):
+        async def scenario():
+            return await websocket.get_user_id(WebsocketClient.scope(session_cookies))
+
+        with patch("config.websocket.close_old_connections") as close_mock:
+            user_id = asyncio.run(scenario())
+
+        assert user_id is not None
+        assert close_mock.call_count == 2  # noqa: PLR2004
+
+    def test_rejects_foreign_origin(self, hub, session_cookies):
+        async def scenario():
+            client = WebsocketClient(session_cookies, origin="https://evil.example")
+            return await client.connect()
+
+        assert asyncio.run(scenario()) == {"type": "websocket.close"}
+
+    def test_delivers_user_events(self, hub, session_cookies, user):
+        async def scenario():
+            client = WebsocketClient(session_cookies, origin="http://testserver")
+            accepted = await client.connect()
+            await client.send_text("ping")
+            pong = await client.receive()
+            hub.connections[user.id].push(encode_event("requisicao", {"id": 1}))
+            event = await client.receive()
+            await client.disconnect()
+            return accepted, pong, event
+
+        accepted, pong, event = asyncio.run(scenario())
+
+        assert accepted == {"type": "websocket.accept"}
+        assert pong == {"type": "websocket.send", "text": "pong!"}
+        assert json.loads(event["text"]) == {
+            "event": "requisicao",
+            "data": {"id": 1},
+        }
+        assert not hub.connections
+
+    def test_closes_silent_connection(self, hub, session_cookies, settings):
+        settings.WEBSOCKET_HEARTBEAT_INTERVAL = 0.01
+        settings.WEBSOCKET_HEARTBEAT_TIMEOUT = 0.05
+
+        async def scenario():
+            client = WebsocketClient(session_cookies)
+            await client.connect()
+            messages = []
+            while (message := await client.receive())["type"] == "websocket.send":
+                messages.append(json.loads(message["text"])["event"])
+            await asyncio.wait_for(client.task, RESPONSE_TIMEOUT)
+            return messages, message
+
+        heartbeats, close = asyncio.run(scenario())
+
+        assert set(heartbeats) == {"heartbeat"}
+        assert close == {
+            "type": "websocket.close",
+            "code": websocket.CLOSE_HEARTBEAT_TIMEOUT,
+        }
+
+    def test_events_disabled_without_redis_url(self, session_cookies, settings):
+        # O hub real, sem Redis configurado (como nos testes)
+        settings.WEBSOCKET_REDIS_URL = ""
+
+        async def scenario():
+            client = WebsocketClient(session_cookies)
+            accepted = await client.connect()
+            await client.send_text("ping")
+            pong = await client.receive()
+            await client.disconnect()
+            return accepted, pong
+
+        accepted, pong = asyncio.run(scenario())
+
+        assert accepted == {"type": "websocket.accept"}
+        assert pong == {"type": "websocket.send", "text": "pong!"}
+        assert not websocket.hub.connections
+
+
+class TestPublishUserEvent:
+    def test_disabled_without_redis_url(self, settings):
+        settings.WEBSOCKET_REDIS_URL = ""
+
+        assert publish_user_event(1, "requisicao") is False
+
+    def test_redis_unavailable(self, settings, caplog):
+        settings.WEBSOCKET_REDIS_URL = "redis://127.0.0.1:1/0"
+
+        assert publish_user_event(1, "requisicao") is False
+        assert "descartado" in caplog.text
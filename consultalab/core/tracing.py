@@ -0,0 +1,162 @@
+"""
+Rastreamento distribuído (OpenTelemetry) do processamento das requisições.
+
+O contexto do trace segue da view que envia a requisição para processamento,
+pelos cabeçalhos da mensagem do Celery, até a tarefa no worker, com spans das
+chamadas HTTP ao Bacen (``BacenRequestApi``) e das gravações no banco. Assim o
+caminho crítico de uma consulta lenta aparece em um único trace.
+
+Os spans são exportados para um coletor OTLP/HTTP (``TRACING_EXPORTER="otlp"``
+e ``TRACING_OTLP_ENDPOINT``) ou para um arquivo, um span JSON por linha
+(``TRACING_EXPORTER="arquivo"`` e ``TRACING_FILE``). Sem exportador, a API do
+OpenTelemetry usa um tracer que não registra nada.
+"""
+
+import contextlib
+import os
+from pathlib import Path
+
+from celery.signals import before_task_publish
+from celery.signals import task_failure
+from celery.signals import task_postrun
+from celery.signals import task_prerun
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from opentelemetry import context
+from opentelemetry import propagate
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+from opentelemetry.trace import SpanKind
+from opentelemetry.trace import Status
+from opentelemetry.trace import StatusCode
+
+tracer = trace.get_tracer("consultalab")
+
+SQL_MAX_LENGTH = 2000  # Caracteres do SQL guardados em cada span do banco
+
+# Span e token do contexto de cada tarefa em execução neste processo
+_task_spans = {}
+
+
+def _span_exporter():
+    if settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT or None)
+    if settings.TRACING_EXPORTER == "arquivo":
+        return ConsoleSpanExporter(
+            # Aberto durante toda a vida do processo
+            out=Path(settings.TRACING_FILE).open("a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+    msg = f"TRACING_EXPORTER inválido: {settings.TRACING_EXPORTER!r}"
+    raise ImproperlyConfigured(msg)
+
+
+def configure_tracing():
+    """
+    Instala o ``TracerProvider`` do processo, se houver exportador configurado.
+
+    O ``BatchSpanProcessor`` reinicia a própria thread após um fork, então a
+    configuração feita no processo principal vale para os filhos (workers do
+    gunicorn e do pool prefork do Celery).
+    """
+    if not settings.TRACING_EXPORTER:
+        return None
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+    )
+    provider.add_span_processor(BatchSpanProcessor(_span_exporter()))
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+def tracing_enabled() -> bool:
+    return isinstance(trace.get_tracer_provider(), TracerProvider)
+
+
+@contextlib.contextmanager
+def traced_queries(using=DEFAULT_DB_ALIAS):
+    """Um span por consulta ao banco executada dentro do bloco."""
+    if not tracing_enabled():
+        yield
+        return
+
+    def trace_query(execute, sql, params, many, context):
+        with tracer.start_as_current_span(
+            "db.query",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": connections[using].vendor,
+                "db.statement": sql[:SQL_MAX_LENGTH],
+            },
+        ):
+            return execute(sql, params, many, context)
+
+    with connections[using].execute_wrapper(trace_query):
+        yield
+
+
+class _TaskRequestGetter:
+    """Lê o contexto propagado nos cabeçalhos da mensagem (``task.request``)."""
+
+    def get(self, carrier, key):
+        value = getattr(carrier, key, None)
+        return [value] if value is not None else None
+
+    def keys(self, carrier):
+        return []
+
+
+@before_task_publish.connect
+def inject_trace_context(sender=None, headers=None, routing_key=None, **kwargs):
+    if headers is None:
+        return
+    with tracer.start_as_current_span(
+        f"celery.publish {sender}",
+        kind=SpanKind.PRODUCER,
+        attributes={
+            "messaging.system": "celery",
+            "messaging.destination.name": routing_key or "",
+        },
+    ):
+        propagate.inject(headers)
+
+
+@task_prerun.connect
+def start_task_span(task_id=None, task=None, **kwargs):
+    parent = propagate.extract(task.request, getter=_TaskRequestGetter())
+    span = tracer.start_span(
+        f"celery.run {task.name}",
+        context=parent,
+        kind=SpanKind.CONSUMER,
+        attributes={"messaging.system": "celery", "celery.task_id": task_id},
+    )
+    token = context.attach(trace.set_span_in_context(span))
+    _task_spans[task_id] = (span, token)
+
+
+@task_failure.connect
+def record_task_failure(task_id=None, exception=None, **kwargs):
+    if task_id not in _task_spans:
+        return
+    span, _ = _task_spans[task_id]
+    span.record_exception(exception)
+    span.set_status(Status(StatusCode.ERROR, type(exception).__name__))
+
+
+@task_postrun.connect
+def end_task_span(task_id=None, state=None, **kwargs):
+    if task_id not in _task_spans:
+        return
+    span, token = _task_spans.pop(task_id)
+    span.set_attribute("celery.state", state or "")
+    context.detach(token)
+    span.end()
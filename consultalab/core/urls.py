@@ -2,9 +2,11 @@ from django.urls import path
 
 from consultalab.core.views import AboutView
 from consultalab.core.views import HomeView
+from consultalab.core.views import MetricsView
 
 app_name = "core"
 urlpatterns = [
     path("", HomeView.as_view(), name="home"),
     path("sobre/", AboutView.as_view(), name="about"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]
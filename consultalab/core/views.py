@@ -1,43 +1,111 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import EmptyPage
-from django.core.paginator import PageNotAnInteger
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.http import Http404
+from django.http import HttpResponse
+from django.http import HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views import View
 from django.views.generic import TemplateView
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest
 
 from consultalab.bacen.filters import RequisicaoBacenFilter
 from consultalab.bacen.forms import RequisicaoBacenFilterFormHelper
 from consultalab.bacen.helpers import LIST_PAGE_SIZE
+from consultalab.bacen.helpers import REQUISICOES_COUNT_CACHE_TIMEOUT
+from consultalab.bacen.helpers import requisicoes_cache_version
 from consultalab.bacen.models import RequisicaoBacen
+from consultalab.core.metrics import metrics_registry
+from consultalab.core.paginator import KeysetPaginator
+from consultalab.core.query_budget import QueryBudget
 
 
-class HomeView(LoginRequiredMixin, TemplateView):
-    template_name = "pages/home.html"
+class RequisicoesListMixin:
+    """
+    Monta a listagem paginada e filtrada das requisições do usuário.
+
+    A paginação é por chave sobre ``(created, id)`` (parâmetros ``after`` e
+    ``before``) e o total de resultados de cada combinação de filtros fica em
+    cache até que as requisições do usuário mudem.
+    """
+
     page_size = LIST_PAGE_SIZE
+    cursor_params = ("after", "before")
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        qs = RequisicaoBacen.objects.filter(user=self.request.user).order_by("-created")
+    def get_requisicoes_context(self):
+        qs = RequisicaoBacen.objects.filter(user=self.request.user).with_task_status()
         requisicao_filter = RequisicaoBacenFilter(self.request.GET, queryset=qs)
-
         requisicao_filter.form.helper = RequisicaoBacenFilterFormHelper()
-        requisicao_filter_form = requisicao_filter.form
-        requisicao_filter_qs = requisicao_filter.qs
-
-        paginator = Paginator(requisicao_filter_qs, self.page_size)
-        page_number = self.request.GET.get("page")
-        try:
-            requisicao_object = paginator.page(page_number)
-        except PageNotAnInteger:
-            requisicao_object = paginator.page(1)
-        except EmptyPage:
-            requisicao_object = paginator.page(paginator.num_pages)
-
-        context["requisicoes"] = requisicao_object
-        context["requisicoes_filter_form"] = requisicao_filter_form
-        context["requisicoes_total"] = requisicao_filter.qs.count()
 
+        paginator = KeysetPaginator(requisicao_filter.qs, self.page_size)
+        requisicao_object = paginator.page(
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+
+        return {
+            "requisicoes": requisicao_object,
+            "requisicoes_filter_form": requisicao_filter.form,
+            "requisicoes_total": self.get_requisicoes_total(requisicao_filter.qs),
+        }
+
+    def get_requisicoes_total(self, queryset):
+        filtros = urlencode(
+            sorted(
+                (key, value)
+                for key, values in self.request.GET.lists()
+                if key not in self.cursor_params
+                for value in values
+            ),
+        )
+        assinatura = hashlib.md5(filtros.encode(), usedforsecurity=False).hexdigest()
+        user_id = self.request.user.id
+        cache_key = (
+            f"requisicoes_total:{user_id}:"
+            f"{requisicoes_cache_version(user_id)}:{assinatura}"
+        )
+
+        total = cache.get(cache_key)
+        if total is None:
+            total = queryset.count()
+            cache.set(cache_key, total, REQUISICOES_COUNT_CACHE_TIMEOUT)
+        return total
+
+
+class HomeView(LoginRequiredMixin, RequisicoesListMixin, TemplateView):
+    template_name = "pages/home.html"
+    # Permissões do usuário (2) + página + total
+    query_budget = QueryBudget(queries=4, time=0.2)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(self.get_requisicoes_context())
         return context
 
 
 class AboutView(LoginRequiredMixin, TemplateView):
     template_name = "pages/about.html"
+
+
+class MetricsView(View):
+    """
+    Métricas no formato do Prometheus. O coletor se autentica com o cabeçalho
+    ``Authorization: Bearer <METRICS_TOKEN>``; sem token configurado, o
+    endpoint só existe com DEBUG ativo.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_TOKEN
+        if not token and not settings.DEBUG:
+            raise Http404
+        authorization = request.headers.get("Authorization", "")
+        if token and not constant_time_compare(authorization, f"Bearer {token}"):
+            return HttpResponseForbidden()
+        return HttpResponse(
+            generate_latest(metrics_registry()),
+            content_type=CONTENT_TYPE_LATEST,
+        )
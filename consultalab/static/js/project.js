@@ -124,3 +124,47 @@ document.body.addEventListener("showMessage", function (evt) {
 // Export functions for global access
 window.showToast = showToast;
 window.initializeToasts = initializeToasts;
+
+// Eventos do usuário pelo websocket (config/websocket.py). Cada evento vira um
+// evento "ws:<nome>" no body, usado nos hx-trigger; o polling continua como
+// alternativa quando a conexão cai.
+function connectUserEvents() {
+  const path = document.body.dataset.wsEvents;
+  if (!path) {
+    return;
+  }
+  const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+  let retryDelay = 1000;
+
+  function connect() {
+    const socket = new WebSocket(`${scheme}://${window.location.host}${path}`);
+
+    socket.addEventListener('open', () => {
+      retryDelay = 1000;
+    });
+
+    socket.addEventListener('message', (message) => {
+      if (message.data === 'pong!') {
+        return;
+      }
+      const { event, data } = JSON.parse(message.data);
+      if (event === 'heartbeat') {
+        socket.send('ping');
+        return;
+      }
+      if (event === 'requisicao' && data.status === 'SUCCESS') {
+        showToast('Consulta concluída. O relatório já está disponível.', 'success');
+      }
+      document.body.dispatchEvent(new CustomEvent(`ws:${event}`, { detail: data }));
+    });
+
+    socket.addEventListener('close', () => {
+      setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 30000);
+    });
+  }
+
+  connect();
+}
+
+document.addEventListener('DOMContentLoaded', connectUserEvents);
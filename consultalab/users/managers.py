@@ -1,3 +1,4 @@
+from collections import defaultdict
 from typing import TYPE_CHECKING
 
 from django.contrib.auth.hashers import make_password
@@ -40,3 +41,53 @@ class UserManager(DjangoUserManager["User"]):
             raise ValueError(msg)
 
         return self._create_user(email, password, **extra_fields)
+
+    def prefetch_permissions(self, users):
+        """
+        Carrega as permissões de vários usuários em duas consultas.
+
+        Preenche nos usuários os mesmos caches que o ``ModelBackend`` cria na
+        primeira chamada a ``has_perm`` (permissões diretas, dos grupos e a
+        união das duas), então ``has_perm`` e ``get_user_permissions`` deixam
+        de consultar o banco para cada usuário. Superusuários e inativos são
+        resolvidos pelo próprio ``has_perm``, sem consultas, e ficam de fora.
+        """
+        users = list(users)
+        pendentes = {
+            user.pk: user
+            for user in users
+            if user.is_active
+            and not user.is_superuser
+            and not hasattr(user, "_perm_cache")
+        }
+        if not pendentes:
+            return users
+
+        diretas = self.model.user_permissions.through.objects.filter(
+            user_id__in=pendentes,
+        ).values_list(
+            "user_id",
+            "permission__content_type__app_label",
+            "permission__codename",
+        )
+        dos_grupos = self.model.groups.through.objects.filter(
+            user_id__in=pendentes,
+            group__permissions__isnull=False,
+        ).values_list(
+            "user_id",
+            "group__permissions__content_type__app_label",
+            "group__permissions__codename",
+        )
+
+        user_perms = defaultdict(set)
+        for user_id, app_label, codename in diretas:
+            user_perms[user_id].add(f"{app_label}.{codename}")
+        group_perms = defaultdict(set)
+        for user_id, app_label, codename in dos_grupos:
+            group_perms[user_id].add(f"{app_label}.{codename}")
+
+        for user_id, user in pendentes.items():
+            user._user_perm_cache = user_perms[user_id]  # noqa: SLF001
+            user._group_perm_cache = group_perms[user_id]  # noqa: SLF001
+            user._perm_cache = user_perms[user_id] | group_perms[user_id]  # noqa: SLF001
+        return users
@@ -1,6 +1,15 @@
 from allauth.account.signals import password_changed
+from allauth.mfa.models import Authenticator
+from allauth.mfa.signals import authenticator_added
+from allauth.mfa.signals import authenticator_removed
+from django.db import transaction
+from django.db.models.signals import post_delete
 from django.dispatch import receiver
 
+from consultalab.core.custom_middlewares import MFA_SESSION_KEY
+from consultalab.core.custom_middlewares import invalidate_mfa_version
+from consultalab.core.custom_middlewares import mark_mfa_configured
+
 
 @receiver(password_changed)
 def reset_force_password_change(sender, request, user, **kwargs):
@@ -10,3 +19,33 @@ def reset_force_password_change(sender, request, user, **kwargs):
     if user.force_password_change:
         user.force_password_change = False
         user.save(update_fields=["force_password_change"])
+
+
+@receiver(authenticator_added)
+def cache_mfa_configured(sender, request, user, authenticator, **kwargs):
+    """
+    Marca na sessão que o usuário configurou o 2FA (ForceAccountSetupMiddleware).
+    """
+    if authenticator.type == Authenticator.Type.TOTP:
+        mark_mfa_configured(request.session, user.id)
+
+
+@receiver(authenticator_removed)
+def clear_mfa_configured(sender, request, user, authenticator, **kwargs):
+    """
+    Remove da sessão a marcação de 2FA configurado quando um autenticador é
+    removido, para que o ForceAccountSetupMiddleware volte a consultar o banco.
+    As demais sessões do usuário são invalidadas por ``invalidate_mfa``.
+    """
+    request.session.pop(MFA_SESSION_KEY, None)
+
+
+@receiver(post_delete, sender=Authenticator)
+def invalidate_mfa(sender, instance, **kwargs):
+    """
+    Troca a versão dos autenticadores do usuário quando um deles é removido,
+    por qualquer caminho (allauth, admin, shell), invalidando a marca de 2FA de
+    todas as sessões dele. Só depois do commit, para que uma requisição
+    concorrente não volte a marcar a sessão com o autenticador ainda no banco.
+    """
+    transaction.on_commit(lambda: invalidate_mfa_version(instance.user_id))
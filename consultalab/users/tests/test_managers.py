@@ -1,9 +1,12 @@
 from io import StringIO
 
 import pytest
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import Permission
 from django.core.management import call_command
 
 from consultalab.users.models import User
+from consultalab.users.tests.factories import UserFactory
 
 
 @pytest.mark.django_db
@@ -53,3 +56,42 @@ def test_createsuperuser_command():
     assert out.getvalue() == "Superuser created successfully.\n"
     user = User.objects.get(email="henry@example.com")
     assert not user.has_usable_password()
+
+
+@pytest.mark.django_db
+class TestPrefetchPermissions:
+    def test_matches_has_perm(self, django_assert_num_queries):
+        admin_perm = Permission.objects.get(codename="access_admin_section")
+        pix_perm = Permission.objects.get(codename="can_request_pix")
+        grupo = Group.objects.create(name="Consultas PIX")
+        grupo.permissions.add(pix_perm)
+
+        direta = UserFactory()
+        direta.user_permissions.add(admin_perm)
+        por_grupo = UserFactory()
+        por_grupo.groups.add(grupo)
+        sem_permissao = UserFactory()
+        superuser = UserFactory(is_superuser=True)
+
+        users = [direta, por_grupo, sem_permissao, superuser]
+        with django_assert_num_queries(2):
+            User.objects.prefetch_permissions(users)
+
+        esperado = {
+            direta.pk: ["admin"],
+            por_grupo.pk: ["pix"],
+            sem_permissao.pk: [],
+            superuser.pk: ["admin", "pix", "ccs"],
+        }
+        with django_assert_num_queries(0):
+            resolvido = {
+                user.pk: [perm["text"] for perm in user.get_user_permissions()]
+                for user in users
+            }
+        assert resolvido == esperado
+
+    def test_without_pending_users(self, django_assert_num_queries):
+        users = [UserFactory(is_superuser=True), UserFactory(is_active=False)]
+
+        with django_assert_num_queries(0):
+            assert User.objects.prefetch_permissions(users) == users